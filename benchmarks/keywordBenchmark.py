@@ -0,0 +1,117 @@
+import os
+import random
+import re
+import sys
+import time
+
+srcPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, os.path.normpath(srcPath)) # Must come first, as languages.py finds the grammar files from sys.path[0]
+
+from tokenizer import Lexer, tokenize
+from languages import getGrammars, getLexer
+
+
+"""
+Micro-benchmark of keyword recognition on identifier-dense code, for each language.
+
+Compares the lexer used by the highlighter, which matches each identifier once and then classifies it with a frozenset lookup and the character after it (See tokenizer.Lexer),
+with a lexer that recognizes keywords with a rule of its own, i.e a regex alternation of every keyword, tried (along with a rule for functions) before the identifier rule at every identifier.
+Both lexers are run by tokenizer.tokenize(), so only the way keywords are recognized differs.
+
+Usage: python benchmarks/keywordBenchmark.py
+"""
+
+LINE_COUNT = 3000 # Number of lines of code tokenized for each language
+
+REPEATS = 15 # Number of times the code is tokenized by each lexer. The fastest time is reported, as the slower ones are slowed down by other work on the machine
+
+
+"""
+Returns a Lexer for a language that recognizes keywords and functions with rules of their own, as the highlighter did before keywords were looked up in a frozenset.
+
+PARAMETERS:
+    grammar - The language's grammar (See languages.py).
+"""
+def makeAlternationLexer(grammar):
+
+    rules = {}
+
+    for tokenType, regex in grammar["rules"]:
+
+        if tokenType == "identifier":
+            rules["keyword"] = "(?:" + "|".join(re.escape(keyword) for keyword in grammar["keywords"]) + r")(?=\s|:)"
+            rules["function"] = r"[_A-Za-z][_A-Za-z0-9]*(?=\()"
+
+        rules[tokenType] = regex
+
+    regions = {opener: tuple(region) for opener, region in grammar["regions"].items()}
+
+    return Lexer(rules, regions) # No keywords set, so identifiers aren't classified again by tokenize()
+
+
+"""
+Returns lines of identifier-dense code for a language, made up of its keywords, identifiers and function calls.
+
+PARAMETERS:
+    grammar - The language's grammar.
+"""
+def makeLines(grammar):
+
+    randomGenerator = random.Random(0) # Seeded, so that every run tokenizes the same code
+    keywords = grammar["keywords"]
+    identifiers = ["value", "count", "first_item", "nextNode", "buffer", "index", "total", "result", "options", "handler"]
+
+    lines = []
+    for lineNumber in range(LINE_COUNT):
+
+        words = []
+        for wordNumber in range(8):
+            choice = randomGenerator.random()
+            if choice < 0.35:
+                words.append(randomGenerator.choice(keywords))
+            elif choice < 0.5:
+                words.append(randomGenerator.choice(identifiers) + "(" + randomGenerator.choice(identifiers) + ")")
+            else:
+                words.append(randomGenerator.choice(identifiers))
+
+        lines.append("    " + " ".join(words) + ":")
+
+    return lines
+
+
+"""
+Returns the fastest of REPEATS times (in seconds) taken to tokenize lines with a lexer.
+
+PARAMETERS:
+    lines - The lines to tokenize.
+    lexer - The Lexer.
+"""
+def timeLexer(lines, lexer):
+
+    times = []
+
+    for repeat in range(REPEATS):
+
+        startTime = time.perf_counter()
+
+        state = 0
+        for line in lines:
+            spans, state = tokenize(line, lexer, state)
+
+        times.append(time.perf_counter() - startTime)
+
+    return min(times)
+
+
+if __name__ == "__main__":
+
+    print(f"{'Language':<12}{'Alternation':>12}{'frozenset':>12}{'Speedup':>10}")
+
+    for language, grammar in getGrammars().items():
+
+        lines = makeLines(grammar)
+
+        alternationTime = timeLexer(lines, makeAlternationLexer(grammar))
+        frozensetTime = timeLexer(lines, getLexer(language))
+
+        print(f"{language:<12}{1000 * alternationTime:>10.1f}ms{1000 * frozensetTime:>10.1f}ms{alternationTime / frozensetTime:>9.2f}x")
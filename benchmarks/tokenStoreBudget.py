@@ -0,0 +1,84 @@
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+srcPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, os.path.normpath(srcPath)) # Must come first, as languages.py finds the grammar files from sys.path[0]
+
+from tokenizer import tokenize
+from languages import getLexer
+from tokenStore import packTokens
+
+
+"""
+Checks that the token store (See tokenStore.TokenStore) stays within MEMORY_BUDGET times the size of the source text, for a file of SOURCE_SIZE.
+
+The source is made by repeating the repository's own Python files until it reaches SOURCE_SIZE. Each line is tokenized and its tokens packed as the highlighter records them
+(i.e without whitespace, See highlighter.Highlighter), into a list with 1 entry per line, which is what TokenStore.lines holds.
+The memory taken by the list is measured with tracemalloc. The source text itself is never held in memory all at once, so it isn't part of the measurement.
+
+Usage: python benchmarks/tokenStoreBudget.py [SIZE IN MB]
+Exits with status 1 if the store takes more than MEMORY_BUDGET times the size of the source.
+"""
+
+SOURCE_SIZE = 100 * 1024 * 1024 # Size (in bytes) of the source tokenized, unless another size is given on the command line
+
+MEMORY_BUDGET = 3 # Maximum memory taken by the token store, in bytes per byte of source
+
+
+"""
+Yields the lines of the source, repeating the repository's Python files until SOURCE_SIZE bytes of source have been yielded.
+
+PARAMETERS:
+    size - Size of the source, in bytes.
+"""
+def generateLines(size):
+
+    lines = []
+    for path in sorted(glob.glob(os.path.join(srcPath, "*.py"))):
+        with open(path, 'r', encoding="utf-8") as file:
+            lines.extend(file.read().split("\n"))
+
+    lineSizes = [len(line.encode("utf-8")) + 1 for line in lines] # Including the line break
+
+    produced = 0
+    while True:
+        for line, lineSize in zip(lines, lineSizes):
+            if produced >= size:
+                return
+            produced += lineSize
+            yield line
+
+
+if __name__ == "__main__":
+
+    size = int(float(sys.argv[1]) * 1024 * 1024) if len(sys.argv) > 1 else SOURCE_SIZE
+    lexer = getLexer("python")
+
+    startTime = time.perf_counter()
+    tracemalloc.start()
+
+    store = []
+    state = 0
+    sourceSize = 0
+
+    for line in generateLines(size):
+        spans, state = tokenize(line, lexer, state)
+        store.append(packTokens([span for span in spans if span[2] != "whitespace"]))
+        sourceSize += len(line.encode("utf-8")) + 1
+
+    del spans
+    storeSize, peakSize = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    ratio = storeSize / sourceSize
+
+    print(f"Source: {sourceSize / (1024 * 1024):.1f} MB in {len(store)} lines")
+    print(f"Token store: {storeSize / (1024 * 1024):.1f} MB ({ratio:.2f} bytes per byte of source, budget {MEMORY_BUDGET})")
+    print(f"Tokenized and stored in {time.perf_counter() - startTime:.1f} s")
+
+    if ratio > MEMORY_BUDGET:
+        print("Token store is over budget")
+        sys.exit(1)
@@ -0,0 +1,288 @@
+import glob
+import os
+import re
+import sys
+import time
+
+srcPath = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, os.path.normpath(srcPath)) # Must come first, as languages.py finds the grammar files from sys.path[0]
+
+from tokenizer import tokenize
+from languages import getGrammars, getLexer
+
+
+"""
+Checks that tokenizer.tokenize() gives the same tokens as the highlighter's original rules, tried 1 after another at each position of a line (See BaselineLexer),
+then times how long tokenizing a C file takes at 2 sizes, to show that the time grows linearly with the size of the file.
+
+The tokens of every language are checked against the repository's own files and SAMPLE_TEXT, tokenizing each file 1 line at a time as the highlighter does.
+
+Some differences from the original rules are intended, and the original tokens are corrected for them before being compared (See correctBaseline()):
+    - "=": The original dbl_char_operator rule's "(^=)" alternative was meant to match "^=", but the unescaped "^" anchored it instead,
+      so every "=" that wasn't part of a longer operator was a dbl_char_operator, and "^=" was split into an operator and a dbl_char_operator.
+    - Keywords at the end of a line: The original keyword rule required a keyword to be followed by whitespace or a colon, so a keyword ending a line (e.g "else") was an identifier.
+    - C++ "volatile": The original C++ keyword list held "volatile " (with a trailing space), so "volatile" was an identifier, unless followed by 2 whitespace characters.
+Lines tokenized as part of a region (e.g block comments and triple-quoted strings, which the original rules didn't know of, and which span several lines) aren't compared,
+nor are lines containing the start of a region.
+
+Usage: python benchmarks/tokenizerCheck.py
+Exits with status 1 if any line is tokenized differently, other than by the intended differences.
+"""
+
+# Keywords of each language, as the highlighter originally listed them
+BASELINE_KEYWORDS = {
+    "python": ["False", "await", "else", "import", "pass", "None", "break", "except", "in", "raise", "True", "class", "finally", "is", "return",
+               "and", "continue", "for", "lambda", "as", "def", "from", "nonlocal", "try", "assert", "del", "global", "not", "while",
+               "async", "elif", "if", "or", "with", "yield"],
+
+    "c": ["auto", "break", "case", "char", "const", "continue", "default", "do", "double", "else", "enum", "extern", "float", "for", "goto", "if",
+          "int", "long", "register", "return", "short", "signed", "sizeof", "static", "struct", "switch", "typedef", "union",
+          "unsigned", "void", "volatile", "while"],
+
+    "c++": ["asm", "double", "new", "switch", "auto", "else", "operator", "template", "break", "enum", "private", "this", "case", "extern", "protected", "throw",
+            "catch", "float", "public", "try", "char", "for", "register", "typedef", "class", "friend", "return", "union", "const", "goto", "short", "unsigned",
+            "continue", "if", "signed", "virtual", "default", "inline", "sizeof", "void", "delete", "int", "static", "volatile ", "do", "long", "struct", "while"],
+
+    "javascript": ["abstract", "arguments", "await", "boolean", "break", "byte", "case", "catch", "char", "class", "const", "continue",
+                   "debugger", "default", "delete", "do", "double", "else", "enum", "eval", "export", "extends", "false", "final",
+                   "finally", "float", "for", "function", "goto", "if", "implements", "import", "in", "instanceof", "int", "interface",
+                   "let", "long", "native", "new", "null", "package", "private", "protected", "public", "return", "short", "static",
+                   "super", "switch", "synchronized", "throw", "throws", "transient", "true", "try", "typeof", "var", "void",
+                   "volatile", "while", "with", "yield"],
+
+    "java": ["abstract", "continue", "for", "new", "switch", "assert", "default", "goto", "package", "synchronized", "boolean", "do", "if", "private",
+             "break", "double", "implements", "protected", "throw", "byte", "else", "import", "public", "throws", "case", "enum", "instanceof", "return", "transient",
+             "catch", "extends", "int", "short", "try", "char", "final", "interface", "static", "void", "class", "finally", "long", "strictfp", "volatile",
+             "const", "float", "native", "super", "while"],
+
+    "go": ["const", "chan", "break", "defer", "var", "interface", "case", "go", "func", "map", "continue", "type", "struct", "default",
+           "import", "else", "package", "fallthrough", "for", "goto", "if", "range", "return", "select", "switch"]
+}
+
+# Text in the style of the C-like languages, so that their block comments, strings and (for C and C++) continued macros are all covered
+SAMPLE_TEXT = r"""#include <stdio.h>
+#define MAX(a, b) \
+    ((a) > (b) ? (a) : (b))
+/* A block comment
+   spanning 2 lines */ int x = 1; /* and one on 1 line */
+static volatile int counter = 0;
+int main(int argc, char **argv) {
+    char *s = "a string with \"escapes\" // not a comment";
+    char c = '\'';
+    for (int i = 0; i < argc; i++) { counter += MAX(i, 2) << 1; }
+    if (x >= 1 && x != 2) return 0; // trailing comment
+    return x ^= 3;
+}
+func main() { fmt.Println(`raw`) }
+public class Main { public static void main(String[] args) {} }
+const f = (a) => a ** 2 === 4 ? "yes" : 'no';
+"""
+
+TIMING_SIZES = (1024 * 1024, 2 * 1024 * 1024) # Sizes (in bytes) of the C files tokenized for timing
+
+
+"""
+Tokenizes text with the highlighter's original rules, exactly as it originally did: each rule is tried in turn (in the same order) with re.match() on the rest of the line, and the first that matches is taken.
+
+CONSTRUCTOR PARAMETERS:
+    language - The name of the language.
+
+ATTRIBUTES:
+    rules - List of (tokenType, regex) tuples, ordered from highest to lowest precedence.
+"""
+class BaselineLexer():
+
+
+    def __init__(self, language):
+
+        commentRegex = "^(#.*)" if language == "python" else "^(//.*)"
+        keywordRegex = "^(" + "|".join(BASELINE_KEYWORDS[language]) + r")(?=(\s|:))"
+
+        self.rules = [
+            ("whitespace", r"^\s"),
+            ("comment", commentRegex),
+            ("delimiter", r"^[\(\)\[\]\{\}@,:`;.]"),
+            ("dbl_char_operator", r"^((==)|(!=)|(\<=)|(\>=)|(<>)|(\<\<)|(\>\>)|(//)|(\*\*)|(\+=)|(\-=)|(\*=)|(%=)|(/=)|(\|=)|(^=))"),
+            ("operator", r"^[\+\-\*/%\|^&~<>!=\?]"),
+            ("keyword", keywordRegex),
+            ("function", r"^[_A-Za-z][_A-Za-z0-9]*(?=\()"),
+            ("identifier", "^[_A-Za-z][_A-Za-z0-9]*"),
+            ("dbl_quote_string", r"^(\"[^\"\n]*\")"),
+            ("single_quote_string", r"^('[^'\n]*')"),
+            ("number", r"^\d+")
+        ]
+
+        if language == "c" or language == "c++":
+            self.rules.append(("preprocessor_directive", r"^#(include|define|undef|if|ifdef|ifndef|error)(?=\s)"))
+
+        self.rules.append(("unknown", r"^."))
+
+
+    """
+    Returns a list of (start, length, tokenType) tuples for the tokens on a line.
+
+    PARAMETERS:
+        text - The line of text to tokenize.
+    """
+    def tokenize(self, text):
+
+        spans = []
+        i = 0
+
+        while i < len(text):
+            for tokenType, regex in self.rules:
+                match = re.match(regex, text[i:])
+                if match:
+                    spans.append((i, match.end(), tokenType))
+                    i += match.end()
+                    break
+
+        return spans
+
+
+"""
+Corrects the original rules' tokens for a line for the intended differences (See the top of this file).
+
+PARAMETERS:
+    spans - The original rules' tokens for the line.
+    text - The line of text.
+    language - The name of the language.
+    keywords - frozenset of the language's keywords.
+
+RETURNS:
+    A (spans, corrections) tuple, where corrections is the set of names of the intended differences that changed the tokens.
+"""
+def correctBaseline(spans, text, language, keywords):
+
+    corrected = []
+    corrections = set()
+
+    for start, length, tokenType in spans:
+
+        word = text[start:start + length]
+        end = start + length
+
+        if tokenType == "dbl_char_operator" and word == "=":
+            if corrected and corrected[-1] == (start - 1, 1, "operator") and text[start - 1] == "^":
+                corrected[-1] = (start - 1, 2, "dbl_char_operator")
+            else:
+                corrected.append((start, 1, "operator"))
+            corrections.add("=")
+            continue
+
+        if language == "c++" and tokenType == "keyword" and word == "volatile ":
+            corrected.extend([(start, 8, "keyword"), (start + 8, 1, "whitespace")])
+            corrections.add("C++ volatile")
+            continue
+
+        if tokenType == "identifier" and word in keywords and (end == len(text) or text[end].isspace() or text[end] == ":"):
+            corrected.append((start, length, "keyword"))
+            corrections.add("C++ volatile" if language == "c++" and word == "volatile" else "keyword at end of line")
+            continue
+
+        corrected.append((start, length, tokenType))
+
+    return corrected, corrections
+
+
+"""
+Returns a list of (name, lines) tuples for the texts the tokens are checked against: the repository's own files, and SAMPLE_TEXT.
+"""
+def getCorpus():
+
+    repoPath = os.path.join(srcPath, os.pardir)
+    paths = sorted(glob.glob(os.path.join(srcPath, "*.py")) + glob.glob(os.path.join(srcPath, "grammars", "*.json")) + glob.glob(os.path.join(repoPath, "*.md")))
+
+    corpus = []
+    for path in paths:
+        with open(path, 'r', encoding="utf-8") as file:
+            corpus.append((os.path.basename(path), file.read().split("\n")))
+
+    corpus.append(("SAMPLE_TEXT", SAMPLE_TEXT.split("\n")))
+
+    return corpus
+
+
+"""
+Checks the tokens of every line of the corpus in every language against the original rules' tokens, and prints how many lines each intended difference changed.
+
+RETURNS:
+    The number of lines that were tokenized differently, other than by the intended differences.
+"""
+def checkTokens():
+
+    corpus = getCorpus()
+    mismatches = 0
+
+    for language, grammar in getGrammars().items():
+
+        lexer = getLexer(language)
+        baseline = BaselineLexer(language)
+        rules = dict(grammar["rules"])
+        regionOpeners = [re.compile(rules[opener]) for opener in grammar["regions"]]
+
+        lineCount = 0
+        regionLines = 0
+        corrected = {}
+
+        for name, lines in corpus:
+
+            state = 0
+
+            for lineNumber, line in enumerate(lines):
+
+                previousState = state
+                spans, state = tokenize(line, lexer, state)
+
+                if previousState != 0 or state != 0 or any(opener.search(line) for opener in regionOpeners):
+                    regionLines += 1
+                    continue
+
+                expected, corrections = correctBaseline(baseline.tokenize(line), line, language, lexer.keywords)
+                lineCount += 1
+
+                for correction in corrections:
+                    corrected[correction] = corrected.get(correction, 0) + 1
+
+                if spans != expected:
+                    mismatches += 1
+                    if mismatches <= 10:
+                        print(f"{language}: {name} line {lineNumber + 1} differs:\n    tokenize():  {spans}\n    original:    {expected}")
+
+        differences = ", ".join(f"{count} for {correction}" for correction, count in sorted(corrected.items()))
+        print(f"{language:<12}{lineCount} lines checked, {regionLines} in regions skipped. Intended differences: {differences or 'none'}")
+
+    return mismatches
+
+
+"""
+Tokenizes C files of each of TIMING_SIZES (made by repeating SAMPLE_TEXT) and prints how long each took.
+"""
+def timeTokenize():
+
+    lexer = getLexer("c")
+
+    for size in TIMING_SIZES:
+
+        lines = (SAMPLE_TEXT * (size // len(SAMPLE_TEXT) + 1))[:size].split("\n")
+
+        startTime = time.perf_counter()
+
+        state = 0
+        for line in lines:
+            spans, state = tokenize(line, lexer, state)
+
+        elapsed = time.perf_counter() - startTime
+        print(f"Tokenized {size / (1024 * 1024):.0f} MB of C in {1000 * elapsed:.0f} ms ({size / (1024 * 1024) / elapsed:.1f} MB/s)")
+
+
+if __name__ == "__main__":
+
+    mismatches = checkTokens()
+
+    if mismatches != 0:
+        print(f"{mismatches} lines were tokenized differently from the original rules")
+        sys.exit(1)
+
+    print("All lines were tokenized the same, other than by the intended differences")
+    timeTokenize()
@@ -0,0 +1,65 @@
+import os
+import stat
+import tempfile
+
+
+"""
+Atomic file writing, shared by saving (See saveWorker.writeFile()), Find in Files' Replace All (See fileSearch.replaceBatch()) and the highlight cache (See highlightCache.store()).
+This module only uses the standard library, so that it can be imported by Find in Files' worker processes.
+"""
+
+UMASK = os.umask(0) # os.umask() can only be read by setting it, so it is set back straight away. Read once, here, as setting it isn't thread-safe
+os.umask(UMASK)
+
+
+"""
+Writes a file atomically, so that the file either has its old contents or its new contents, even if the editor (or the computer) crashes part way through writing it.
+
+The contents are written to a temporary file in the same directory, which is flushed to disk (with os.fsync()) and then renamed over the file with os.replace(), which is atomic.
+The temporary file is given the file's permissions before it is renamed (or, for a new file, the permissions open() would have given it).
+If the path is a symbolic link, the file it points to is replaced, rather than the link.
+
+Raises OSError if the file can't be written, or any exception raised by write (in either case, the file is left as it was).
+
+PARAMETERS:
+    path - Path of the file.
+    write - Function that writes the file's new contents to the file object it is given (a temporary file, opened for writing bytes). Any file it reads from must be closed by the time it returns.
+
+RETURNS:
+    The value returned by write.
+"""
+def writeAtomically(path, write):
+
+    path = os.path.realpath(path)
+    directory = os.path.dirname(path)
+
+    try:
+        mode = stat.S_IMODE(os.stat(path).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~UMASK
+
+    fileDescriptor, tempPath = tempfile.mkstemp(dir=directory, prefix="." + os.path.basename(path) + ".", suffix=".tmp")
+
+    try:
+        with os.fdopen(fileDescriptor, 'wb') as file:
+            result = write(file)
+            file.flush()
+            os.fsync(file.fileno())
+
+        os.chmod(tempPath, mode) # mkstemp() creates files that only the owner can read and write
+        os.replace(tempPath, path)
+
+    except BaseException:
+        if os.path.exists(tempPath):
+            os.remove(tempPath)
+        raise
+
+    # The rename is only certain to survive a crash once the directory has been flushed to disk too (Directories can't be opened like this on Windows, where this isn't needed)
+    if hasattr(os, "O_DIRECTORY"):
+        directoryDescriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+        try:
+            os.fsync(directoryDescriptor)
+        finally:
+            os.close(directoryDescriptor)
+
+    return result
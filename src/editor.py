@@ -2,13 +2,12 @@ from PyQt6.QtWidgets import QPlainTextEdit, QPlainTextDocumentLayout
 from PyQt6.QtGui import QTextDocument, QTextCursor, QTextCharFormat, QColor
 from PyQt6.QtCore import Qt, QRect
 
-import json
-import os
-import sys
 import re
 
 from lineNumberArea import LineNumberArea
 from highlighter import Highlighter
+import settings
+import startup
 
 
 """
@@ -17,17 +16,20 @@ Represents the code editor textbox.
 CONSTRUCTOR PARAMETERS:
     fileText - The text of the file to open.
     language - The string for the name of the programming language the user is editing.
+    loading - Whether fileText is only the start of the file, with the rest still to be loaded (See fileLoader.FileLoader). (Optional; defaults to False).
 
 ATTRIBUTES:
     language - The string for the name of the programming language the user is editing.
+    loading - Whether the file is still being loaded into the editor. Whilst it is, the highlighter only highlights the lines in view, and the whole file is highlighted once it has been loaded.
+    firstLineNumber - Number (starting from 0) of the line of the file that the document's first line is. This is always 0, except in large-file mode, where the document only holds part of the file (See largeFile.LargeFileEditor).
     lineNumberArea - The LineNumberArea representing the line number space on the left margin of the editor textbox.
-    settings - Dictionary containing the settings loaded from BEditSettings.json.
+    settings - The SettingsStore holding the settings loaded from BEditSettings.json (See settings.getSettings()). Settings changed whilst the editor is open are applied straight away.
     highlighter - The Highlighter object representing the editor's syntax highlighter. (If syntax highlighting is not to be applied to the file, then this attribute will equal None).
 """
 class Editor(QPlainTextEdit):
 
 
-    def __init__(self, fileText, language):
+    def __init__(self, fileText, language, loading=False):
 
         super().__init__()
 
@@ -37,12 +39,17 @@ class Editor(QPlainTextEdit):
                                 font-family: Consolas, Menlo, monospace; 
                                 font-size: 13pt;""")
 
-        document = QTextDocument(fileText)
+        document = QTextDocument()
+        document.setPlainText(fileText) # Unlike passing the text to QTextDocument(), this doesn't add the text to the undo stack, so opening the file can't be undone
+        document.setModified(False)
         plainTextLayout = QPlainTextDocumentLayout(document) # Document being edited in QPlainTextEdit must have a QPlainTextDocumentLayout.
         document.setDocumentLayout(plainTextLayout)
         self.setDocument(document)
+        startup.mark("document build")
 
         self.language = language
+        self.loading = loading
+        self.firstLineNumber = 0
 
         self.setLineWrapMode(QPlainTextEdit.LineWrapMode.NoWrap)
 
@@ -51,23 +58,65 @@ class Editor(QPlainTextEdit):
         self.updateRequest.connect(self.lineNumberArea.updateRect) # When editor is scrolled, the line number section needs to be scrolled too.
         self.lineNumberArea.updateWidth()
 
-        # Loading settings file into a dictionary
-        sFilePath = os.path.join(sys.path[0], "BEditSettings.json")
-        with open(sFilePath, 'r+') as file:
-            self.settings = json.load(file)
+        # The settings file is only read once per process, by the settings store shared by every editor
+        self.settings = settings.getSettings()
+        self.settings.changed.connect(self.__onSettingChanged)
+
+        self.highlighter = None
+        self.__updateHighlighter()
+        startup.mark("highlight")
 
-        # Only highlight syntax for supported languages and if appropriate setting is enabled.
-        if self.language == "unknown" or not self.settings["syntaxHighlighting"]:
-            self.highlighter = None
 
-        else:
+    """
+    Attaches a highlighter to the editor, or detaches it, depending on whether syntax highlighting is enabled in the settings.
+    Syntax is only highlighted for supported languages and if appropriate setting is enabled.
+    """
+    def __updateHighlighter(self):
+
+        enabled = self.language != "unknown" and self.settings["syntaxHighlighting"]
+
+        if enabled and self.highlighter is None:
             self.highlighter = Highlighter(self)
-            self.highlighter.highlightAll()
+
+            if self.loading: # Started once the file has been loaded
+                self.highlighter.highlightVisible()
+            else:
+                self.highlighter.start()
+
+        elif not enabled and self.highlighter is not None:
+            self.highlighter.detach()
+            self.highlighter = None
+
+
+    """
+    Stops the editor's background work (i.e its highlighting) for good, and stops it following changes to the settings. To be called when the editor is closed.
+    """
+    def stop(self):
+
+        self.settings.changed.disconnect(self.__onSettingChanged)
+
+        if self.highlighter is not None:
+            self.highlighter.close()
+            self.highlighter = None
+
+
+    """
+    Called when a setting is changed, to apply it to the editor without reopening the file.
+    Only syntax highlighting needs applying, as the other settings are read whenever they are used (e.g auto indent is read on every key press).
+
+    PARAMETERS:
+        name - The name of the setting.
+        value - The setting's new value.
+    """
+    def __onSettingChanged(self, name, value):
+
+        if name == "syntaxHighlighting":
+            self.__updateHighlighter()
 
 
     """
     Reimplemenation of Qwidget.resizeEvent. 
-    When the editor is resized, this resizes the LineNumberArea proportionally.
+    When the editor is resized, this resizes the LineNumberArea proportionally, and highlights any lines that have come into view.
     """
     def resizeEvent(self, event):
 
@@ -76,10 +125,13 @@ class Editor(QPlainTextEdit):
         cr = self.contentsRect()
         self.lineNumberArea.setGeometry(QRect(cr.left(), cr.top(), self.lineNumberArea.getWidth(), cr.height()))
 
+        # More lines may have come into view
+        if self.highlighter != None:
+            self.highlighter.highlightVisible()
+
 
     """
-    Reimplementation of QWidget.keyPressEvent() signal, to perform syntax highlighting and
-    to check if automatic indentation and/or automatic bracket & quotation mark closure is required after a key press.
+    Reimplementation of QWidget.keyPressEvent() signal, to check if automatic indentation and/or automatic bracket & quotation mark closure is required after a key press.
     """
     def keyPressEvent(self, event):
 
@@ -117,10 +169,6 @@ class Editor(QPlainTextEdit):
                 self.textCursor().insertText('"')
                 self.moveCursor(QTextCursor.MoveOperation.PreviousCharacter)
 
-        # Syntax highlighting
-        if self.highlighter != None:
-            self.highlighter.highlightLine()
-
 
     """
     Checks if additional indentation is required at the beginning of a new line, and indents however many times is necessary:
@@ -0,0 +1,420 @@
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal
+
+import codecs
+import hashlib
+import os
+import time
+
+from saveWorker import TEXT_HASH_SIZE
+
+
+FIRST_CHUNK = 64 * 1024 # Number of bytes read before the editor is shown, which is enough to fill the first screen
+
+LOAD_CHUNK = 65536 # Number of bytes read and added to the document at a time, between checks of whether the time slice is over
+
+SLICE_TIME = 0.01 # Maximum time (in seconds) spent loading before control is given back to the event loop, so that the editor can be used whilst the file is still being loaded
+
+
+"""
+Works out the encoding of a file from its first bytes.
+A byte order mark is used if there is one. Otherwise, the file is taken to be UTF-8 if its first bytes are valid UTF-8, and Latin-1 if they aren't
+(Every sequence of bytes is valid Latin-1, so a file in an unknown 8-bit encoding can still be opened).
+As only the first bytes are checked, a file taken to be UTF-8 is decoded strictly, and falls back to Latin-1 if the rest of it turns out not to be valid UTF-8 (See readFile() and FileLoader).
+
+PARAMETERS:
+    data - The first bytes of the file.
+
+RETURNS:
+    The name of the encoding, as used by the codecs module.
+"""
+def detectEncoding(data):
+
+    if data.startswith(codecs.BOM_UTF8):
+        return "utf-8-sig"
+
+    if data.startswith(codecs.BOM_UTF16_LE) or data.startswith(codecs.BOM_UTF16_BE):
+        return "utf-16"
+
+    try:
+        codecs.getincrementaldecoder("utf-8")().decode(data) # Incremental, so that a character cut off at the end of data isn't an error
+        return "utf-8"
+    except UnicodeDecodeError:
+        return "latin-1"
+
+
+"""
+Works out the newline style of a file from the first line break in its text.
+
+PARAMETERS:
+    text - The first part of the file's text.
+
+RETURNS:
+    "\\r\\n" (Windows), "\\r" (classic Mac OS) or "\\n" (Unix, which is also returned if text has no line breaks).
+"""
+def detectNewline(text):
+
+    newline = text.find("\n")
+    carriageReturn = text.find("\r")
+
+    if carriageReturn == -1 or (newline != -1 and newline < carriageReturn):
+        return "\n"
+
+    if carriageReturn + 1 < len(text) and text[carriageReturn + 1] == "\n":
+        return "\r\n"
+
+    return "\r"
+
+
+"""
+Reads the whole of a file at once, in the same way as FileLoader (e.g to reload it after it has been changed by another program).
+
+PARAMETERS:
+    filePath - Path of the file to read (Raises OSError if the file can't be read).
+
+RETURNS:
+    A tuple of the file's text (with "\\n" line breaks), its encoding (See detectEncoding()) and its newline style (See detectNewline()).
+"""
+def readFile(filePath):
+
+    with open(filePath, 'rb') as file:
+        data = file.read()
+
+    encoding = detectEncoding(data[:FIRST_CHUNK])
+
+    try:
+        text = data.decode(encoding, "strict" if encoding == "utf-8" else "replace")
+    except UnicodeDecodeError: # Not UTF-8 after all, only its first bytes are
+        encoding = "latin-1"
+        text = data.decode(encoding)
+
+    newline = detectNewline(text[:FIRST_CHUNK])
+
+    return text.replace("\r\n", "\n").replace("\r", "\n"), encoding, newline
+
+
+"""
+Loads a file into an editor a chunk at a time, so that the editor can be shown (and used) as soon as the first screen of the file has been read, however large the file is.
+
+The first FIRST_CHUNK bytes are read when the FileLoader is created, and their text is what the editor is to be created with (See firstText).
+The encoding and newline style of the file are worked out from these first bytes.
+Once start() is called, the rest of the file is read in chunks of LOAD_CHUNK bytes and appended to the document, in time slices of at most SLICE_TIME.
+Line breaks of every style are changed to "\\n", as the document only uses "\\n".
+
+If the encoding was taken to be UTF-8 but a later chunk isn't valid UTF-8, the encoding is changed to Latin-1 and the text loaded so far is decoded again, unless the user has already edited it (See __fallBack()).
+
+The editor can be edited whilst the file is being loaded. Each chunk is inserted at the end of the text loaded so far (See loadedEnd), rather than at the end of the document,
+so text the user types after the loaded text stays after the rest of the file, instead of ending up in the middle of it.
+Whilst the file is being loaded, the document's undo stack is disabled, so that loading the file can't be undone (This means that edits made whilst the file is being loaded can't be undone either),
+and the editor's loading attribute is set, so that the editor's highlighter leaves the lines being added until the whole file has been loaded.
+Once the file has been loaded, the document is marked as unmodified, unless the user edited it whilst it was being loaded.
+
+The text of the file is hashed as it is loaded (in the same way as saveWorker.hashText()), so that the editor can tell whether its text is the same as the file's without reading the file again.
+
+CONSTRUCTOR PARAMETERS:
+    filePath - Path of the file to load (Raises OSError if the file can't be opened).
+
+ATTRIBUTES:
+    file - The open file object (None once the whole file has been read).
+    size - Size of the file, in bytes.
+    bytesRead - Number of bytes of the file read so far.
+    encoding - The encoding of the file (See detectEncoding()), which may change from UTF-8 to Latin-1 whilst the file is being loaded.
+    newline - The newline style of the file (See detectNewline()).
+    decoder - Incremental decoder for the file's encoding, which holds on to any bytes of a character that has been cut off at the end of a chunk (strict for UTF-8, so that a chunk that isn't valid UTF-8 is noticed).
+    pendingCR - Whether the text read so far ended with a carriage return, which is held back until the next chunk, as it may be the first half of a "\\r\\n".
+    firstText - The text of the first FIRST_CHUNK bytes of the file.
+    textHash - hashlib hash object that the text of the file is added to as it is loaded.
+    edited - Whether the document has been edited by the user whilst the file was being loaded.
+    inserting - Whether the text of a chunk is being inserted, so that the insertion isn't taken to be an edit by the user.
+    editor - The editor the file is being loaded into (None until start() is called).
+    cursor - QTextCursor that the text of each chunk is inserted with.
+    loadedEnd - Position in the document just after the text loaded so far, where the next chunk is inserted. It is moved by edits made before it, but not by text inserted at it (See __onContentsChange()).
+    loadTimer - Zero-interval QTimer that loads the file, 1 time slice per timeout.
+
+SIGNALS:
+    progressChanged(percent) - Emitted after each time slice, with the percentage of the file that has been loaded.
+    finished() - Emitted once the whole file has been loaded.
+"""
+class FileLoader(QObject):
+
+    progressChanged = pyqtSignal(int)
+    finished = pyqtSignal()
+
+
+    def __init__(self, filePath):
+
+        super().__init__()
+
+        self.file = open(filePath, 'rb')
+        self.size = os.fstat(self.file.fileno()).st_size
+
+        data = self.file.read(FIRST_CHUNK)
+        self.bytesRead = len(data)
+
+        self.encoding = detectEncoding(data)
+        self.decoder = codecs.getincrementaldecoder(self.encoding)(errors="strict" if self.encoding == "utf-8" else "replace")
+        self.pendingCR = False
+        self.textHash = hashlib.blake2b(digest_size=TEXT_HASH_SIZE)
+
+        final = self.bytesRead >= self.size
+
+        try:
+            text = self.decoder.decode(data, final)
+        except UnicodeDecodeError: # Only possible at the end of a file that is cut off part way through a character
+            self.encoding = "latin-1"
+            self.decoder = codecs.getincrementaldecoder(self.encoding)()
+            text = self.decoder.decode(data, final)
+
+        self.newline = detectNewline(text)
+        self.firstText = self.__normalize(text, final)
+
+        self.editor = None
+        self.cursor = None
+        self.loadedEnd = 0
+        self.edited = False
+        self.inserting = False
+
+        self.loadTimer = QTimer(self)
+        self.loadTimer.setInterval(0) # A zero-interval timer times out whenever the event loop has no other events to process
+        self.loadTimer.timeout.connect(self.__loadSlice)
+
+
+    """
+    Returns whether the whole file has been read.
+    """
+    def isFinished(self):
+        return self.file is None
+
+
+    """
+    Starts loading the rest of the file into an editor, which must have been created with firstText.
+    If the whole file has already been read, finished is emitted straight away.
+
+    PARAMETERS:
+        editor - The editor to load the file into.
+    """
+    def start(self, editor):
+
+        self.editor = editor
+
+        editor.document().contentsChange.connect(self.__onContentsChange)
+
+        if self.bytesRead >= self.size:
+            self.__finish()
+            return
+
+        editor.loading = True
+        editor.document().setUndoRedoEnabled(False)
+
+        self.cursor = QTextCursor(editor.document())
+        self.loadedEnd = editor.document().characterCount() - 1 # The document's last character is its closing paragraph separator, which isn't part of the text
+
+        self.loadTimer.start()
+
+
+    """
+    Loads the rest of the file straight away, without splitting it into time slices.
+    To be called before anything that needs the whole of the file's text (e.g saving it).
+    """
+    def finish(self):
+
+        if self.editor is None or self.isFinished():
+            return
+
+        while not self.isFinished():
+            self.__loadChunk()
+
+
+    """
+    Stops loading the file and closes it, without loading the rest of it. To be called when the editor is closed whilst the file is still being loaded.
+    """
+    def cancel(self):
+
+        self.loadTimer.stop()
+
+        if self.file is None:
+            return
+
+        if self.editor is not None:
+            self.editor.document().contentsChange.disconnect(self.__onContentsChange)
+
+        self.file.close()
+        self.file = None
+
+
+    """
+    Called by loadTimer. Loads chunks of the file until SLICE_TIME has passed or the end of the file is reached.
+    """
+    def __loadSlice(self):
+
+        deadline = time.perf_counter() + SLICE_TIME
+
+        while not self.isFinished() and time.perf_counter() < deadline:
+            self.__loadChunk()
+
+        self.progressChanged.emit(100 * self.bytesRead // max(1, self.size))
+
+
+    """
+    Reads the next chunk of the file and appends its text to the document.
+    Once the end of the file is reached, the file is closed and the editor is told that it has been loaded.
+    """
+    def __loadChunk(self):
+
+        data = self.file.read(LOAD_CHUNK)
+        self.bytesRead += len(data)
+
+        final = len(data) < LOAD_CHUNK
+        decoderState = self.decoder.getstate() # So that the chunk can be decoded again if it isn't valid UTF-8
+
+        try:
+            text = self.__normalize(self.decoder.decode(data, final), final)
+        except UnicodeDecodeError:
+            text = self.__fallBack(data, decoderState, final)
+
+        self.__insert(text)
+
+        if final:
+            self.__finish()
+
+
+    """
+    Inserts text at the end of the text loaded so far, and moves loadedEnd to the end of it.
+
+    PARAMETERS:
+        text - The text to insert.
+        replace - Whether to replace the text loaded so far, rather than adding to it. (Optional; defaults to False).
+    """
+    def __insert(self, text, replace=False):
+
+        if text == "" and not replace:
+            return
+
+        self.loadedEnd = min(self.loadedEnd, self.editor.document().characterCount() - 1)
+
+        if replace:
+            self.cursor.setPosition(0)
+            self.cursor.setPosition(self.loadedEnd, QTextCursor.MoveMode.KeepAnchor)
+        else:
+            self.cursor.setPosition(self.loadedEnd)
+
+        self.inserting = True
+        self.cursor.insertText(text)
+        self.inserting = False
+
+        self.loadedEnd = self.cursor.position() # Not len(text), as positions count UTF-16 code units rather than characters
+
+
+    """
+    Called when a chunk of a file taken to be UTF-8 isn't valid UTF-8.
+
+    If the user hasn't edited the document yet, the encoding is changed to Latin-1, and the part of the file loaded so far is read again and replaces the text loaded so far.
+    Otherwise, the text loaded so far can't be replaced without losing the user's edits, so the file stays UTF-8, and the rest of it is decoded with the bytes that aren't valid UTF-8 replaced with U+FFFD.
+
+    PARAMETERS:
+        data - The chunk that couldn't be decoded.
+        decoderState - The state of the decoder before the chunk was decoded (See codecs.IncrementalDecoder.getstate()).
+        final - Whether the chunk is the last one.
+
+    RETURNS:
+        The text of the chunk to add to the document (Empty if the text loaded so far has been replaced).
+    """
+    def __fallBack(self, data, decoderState, final):
+
+        if self.edited:
+            self.decoder = codecs.getincrementaldecoder(self.encoding)(errors="replace")
+            self.decoder.setstate(decoderState)
+            return self.__normalize(self.decoder.decode(data, final), final)
+
+        self.encoding = "latin-1"
+        self.decoder = codecs.getincrementaldecoder(self.encoding)()
+        self.pendingCR = False
+        self.textHash = hashlib.blake2b(digest_size=TEXT_HASH_SIZE)
+
+        self.file.seek(0)
+        text = self.__normalize(self.decoder.decode(self.file.read(self.bytesRead), final), final)
+
+        # The user's cursor and scroll position are put back afterwards, as replacing the whole text would move them to the end
+        userCursor = self.editor.textCursor()
+        position = userCursor.position()
+        scroll = self.editor.verticalScrollBar().value()
+
+        self.__insert(text, replace=True)
+
+        userCursor.setPosition(min(position, self.editor.document().characterCount() - 1))
+        self.editor.setTextCursor(userCursor)
+        self.editor.verticalScrollBar().setValue(scroll)
+
+        return ""
+
+
+    """
+    Called when the document is edited whilst the file is being loaded, to record whether the user has edited it, and to keep loadedEnd at the end of the loaded text.
+    An edit before loadedEnd moves it by the change in length (An edit that removes text past loadedEnd leaves it at the end of the inserted text).
+    Text inserted at loadedEnd (e.g typed at the end of the document) doesn't move it, so that the rest of the file is inserted before that text.
+
+    PARAMETERS:
+        position - Position in the document at which the change occured.
+        removed - Number of characters removed.
+        added - Number of characters added.
+    """
+    def __onContentsChange(self, position, removed, added):
+
+        if self.inserting:
+            return
+
+        self.edited = True
+
+        if position < self.loadedEnd:
+            self.loadedEnd = position + added + max(0, self.loadedEnd - position - removed)
+
+
+    """
+    Changes the line breaks in the text of a chunk of the file to "\\n", and adds the text to textHash.
+
+    PARAMETERS:
+        text - The decoded text of the chunk.
+        final - Whether the chunk is the last one.
+    """
+    def __normalize(self, text, final):
+
+        if self.pendingCR:
+            text = "\r" + text
+            self.pendingCR = False
+
+        if text.endswith("\r") and not final:
+            text = text[:-1]
+            self.pendingCR = True
+
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+        self.textHash.update(text.encode("utf-8", "surrogatepass"))
+
+        return text
+
+
+    """
+    Closes the file, then re-enables the document's undo stack and starts the editor's highlighter now that the whole file has been loaded.
+    """
+    def __finish(self):
+
+        self.loadTimer.stop()
+
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+        editor = self.editor
+        document = editor.document()
+
+        document.contentsChange.disconnect(self.__onContentsChange)
+
+        if editor.loading:
+            editor.loading = False
+            document.setUndoRedoEnabled(True)
+            document.setModified(self.edited)
+
+            if editor.highlighter is not None:
+                editor.highlighter.start()
+
+        self.progressChanged.emit(100)
+        self.finished.emit()
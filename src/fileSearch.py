@@ -0,0 +1,388 @@
+from concurrent.futures import ProcessPoolExecutor
+import fnmatch
+import mmap
+import multiprocessing
+import os
+import re
+
+from atomicFile import writeAtomically
+
+
+"""
+Engine for searching (and replacing) text in every file under a directory, used by the Find in Files popup (See findInFiles.py).
+
+The directory tree is walked with os.scandir(), skipping version control and build directories (IGNORED_DIRS) and anything matched by a ".gitignore" file.
+The files are then searched in batches by a pool of worker processes, so that a large tree is searched on every core at once.
+
+Files are searched as bytes, through mmap, with a bytes regular expression, so a file is never read into a Python string, and only the lines that contain a hit are decoded.
+A file is taken to be binary (and is skipped) if there is a null byte within its first BINARY_CHECK_SIZE bytes, as Git does.
+As the search is done on bytes, the term is searched for in its UTF-8 encoding, and ignoring case only applies to ASCII letters.
+
+The functions that are run in the worker processes (searchBatch() and replaceBatch()) only use the standard library.
+Even so, starting a worker imports Qt: with the "spawn" start method, each worker imports the program's __main__ module (main.py) again, and with it the GUI's modules.
+This is a one-off cost per worker, as the pool is started once and its workers are kept for every later search.
+"""
+
+IGNORED_DIRS = frozenset((".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv", ".tox", ".mypy_cache", ".pytest_cache"))
+
+BINARY_CHECK_SIZE = 8192 # Number of bytes at the start of a file that are checked for a null byte
+
+MAX_FILE_HITS = 1000 # Maximum number of hits reported for a single file
+
+MAX_PREVIEW_LENGTH = 300 # Maximum number of bytes of a hit's line that are sent back as its preview
+
+pool = None # The ProcessPoolExecutor that searches files, once it has been started
+
+
+"""
+Returns the number of worker processes in the pool, i.e the number of CPU cores (or 1, if that can't be found out).
+"""
+def getWorkerCount():
+    return os.cpu_count() or 1
+
+
+"""
+Returns the pool of worker processes, starting it if this is the first time it has been needed.
+The workers are started with the "spawn" method on every platform, as forking a process that is running Qt's threads isn't safe.
+"""
+def getPool():
+
+    global pool
+
+    if pool is None:
+        pool = ProcessPoolExecutor(max_workers=getWorkerCount(), mp_context=multiprocessing.get_context("spawn"))
+
+    return pool
+
+
+"""
+Returns the source (as bytes) and flags of the bytes regular expression that matches a term.
+
+PARAMETERS:
+    term - The text (or regular expression) to search for.
+    regex - Whether term is a regular expression.
+    caseSensitive - Whether hits must match the case of term.
+    wholeWord - Whether hits must not be directly preceded or followed by a letter, digit or underscore.
+
+Raises re.error if term is not a valid regular expression.
+"""
+def makePattern(term, regex, caseSensitive, wholeWord):
+
+    source = term if regex else re.escape(term)
+    if wholeWord:
+        source = rf"(?<!\w)(?:{source})(?!\w)"
+
+    flags = re.MULTILINE
+    if not caseSensitive:
+        flags |= re.IGNORECASE
+
+    source = source.encode("utf-8")
+    re.compile(source, flags) # Raise re.error in the GUI process, rather than in every worker
+
+    return source, flags
+
+
+"""
+Reads the patterns in a directory's ".gitignore" file.
+
+PARAMETERS:
+    dirPath - Path of the directory.
+
+RETURNS:
+    List of (pattern, anchored, dirOnly) tuples, where anchored is whether the pattern is matched against the path relative to the directory rather than just the name,
+    and dirOnly is whether the pattern only matches directories. Negated patterns ("!") aren't supported, and are left out.
+"""
+def readIgnoreFile(dirPath):
+
+    rules = []
+
+    try:
+        with open(os.path.join(dirPath, ".gitignore"), 'r', encoding="utf-8", errors="replace") as file:
+            lines = file.read().splitlines()
+    except OSError: # Raised if the directory has no .gitignore file
+        return rules
+
+    for line in lines:
+
+        line = line.strip()
+        if line == "" or line.startswith("#") or line.startswith("!"):
+            continue
+
+        dirOnly = line.endswith("/")
+        line = line.rstrip("/")
+
+        anchored = "/" in line
+        rules.append((line.lstrip("/"), anchored, dirOnly))
+
+    return rules
+
+
+"""
+Walks a directory tree, yielding the path of every file that is to be searched.
+Symbolic links to directories aren't followed, so that the walk can't go round in a loop.
+
+PARAMETERS:
+    root - Path of the directory to walk.
+    cancelled - Function that returns True if the walk is to be stopped.
+"""
+def walk(root, cancelled):
+
+    # Each entry on the stack is a directory still to be walked, with the ignore rules of it and its parents, as (rules, baseDir) pairs
+    stack = [(root, [])]
+
+    while stack and not cancelled():
+
+        dirPath, inherited = stack.pop()
+
+        rules = readIgnoreFile(dirPath)
+        ignoreRules = inherited + [(rules, dirPath)] if rules else inherited
+
+        try:
+            entries = list(os.scandir(dirPath))
+        except OSError: # e.g Permission denied
+            continue
+
+        subDirs = []
+
+        for entry in entries:
+
+            try:
+                isDir = entry.is_dir(follow_symlinks=False)
+                isFile = not isDir and entry.is_file()
+            except OSError:
+                continue
+
+            if isDir and entry.name in IGNORED_DIRS:
+                continue
+
+            if isIgnored(entry.path, entry.name, isDir, ignoreRules):
+                continue
+
+            if isDir:
+                subDirs.append(entry.path)
+            elif isFile:
+                yield entry.path
+
+        subDirs.sort(reverse=True) # Walked in order of name, as the stack is popped from the end
+        stack.extend((subDir, ignoreRules) for subDir in subDirs)
+
+
+"""
+Returns whether a file or directory is matched by any of the ".gitignore" rules that apply to it.
+
+PARAMETERS:
+    path - Path of the file or directory.
+    name - Name of the file or directory.
+    isDir - Whether path is a directory.
+    ignoreRules - List of (rules, baseDir) pairs, where rules is a list returned by readIgnoreFile() for the directory baseDir.
+"""
+def isIgnored(path, name, isDir, ignoreRules):
+
+    for rules, baseDir in ignoreRules:
+
+        relativePath = None
+
+        for pattern, anchored, dirOnly in rules:
+
+            if dirOnly and not isDir:
+                continue
+
+            if anchored:
+                if relativePath is None:
+                    relativePath = os.path.relpath(path, baseDir).replace(os.sep, "/")
+                if fnmatch.fnmatchcase(relativePath, pattern):
+                    return True
+
+            elif fnmatch.fnmatchcase(name, pattern):
+                return True
+
+    return False
+
+
+"""
+Searches a batch of files. Run in a worker process.
+
+PARAMETERS:
+    paths - List of the paths of the files to search.
+    source - Source (as bytes) of the regular expression to search for (See makePattern()).
+    flags - Flags of the regular expression.
+    countOnly - Whether only the number of hits in each file is wanted (e.g once as many hits as can be listed have been found), so the hits' lines aren't decoded or sent back.
+                (Optional; defaults to False).
+
+RETURNS:
+    List of (path, lineNumber, column, length, preview) tuples for the hits in the batch, where lineNumber starts from 1, column is the hit's position (in characters) within its line,
+    length is the hit's length in characters and preview is the text of the hit's line (cut down to MAX_PREVIEW_LENGTH bytes).
+    If countOnly is True, a list of (path, count) tuples instead, for each file in the batch that has hits.
+"""
+def searchBatch(paths, source, flags, countOnly=False):
+
+    pattern = re.compile(source, flags) # re caches compiled patterns, so this is only compiled once per worker
+
+    results = []
+
+    for path in paths:
+
+        try:
+            with open(path, 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    if countOnly:
+                        count = countBuffer(buffer, pattern)
+                        if count > 0:
+                            results.append((path, count))
+                    else:
+                        results.extend(searchBuffer(path, buffer, pattern))
+
+        except (OSError, ValueError): # Raised if the file can't be read, or is empty (an empty file can't be mapped)
+            continue
+
+    return results
+
+
+"""
+Returns a list of the hits in a mapped file (See searchBatch()), or an empty list if the file is binary.
+
+PARAMETERS:
+    path - Path of the file.
+    buffer - The mmap of the file.
+    pattern - The compiled bytes regular expression to search for.
+"""
+def searchBuffer(path, buffer, pattern):
+
+    hits = []
+
+    if buffer.find(b"\0", 0, BINARY_CHECK_SIZE) != -1:
+        return hits
+
+    lineNumber = 1
+    lastPosition = 0 # Position up to which newlines have been counted
+
+    for match in pattern.finditer(buffer):
+
+        start, end = match.span()
+        if start == end: # Empty match, which there would be nothing to select for
+            continue
+
+        lineNumber += buffer[lastPosition:start].count(b"\n")
+        lastPosition = start
+
+        lineStart = buffer.rfind(b"\n", 0, start) + 1
+        lineEnd = buffer.find(b"\n", start)
+        if lineEnd == -1:
+            lineEnd = len(buffer)
+
+        prefix = buffer[lineStart:start].decode("utf-8", "replace")
+        length = len(buffer[start:end].decode("utf-8", "replace"))
+        preview = buffer[lineStart:min(lineEnd, lineStart + MAX_PREVIEW_LENGTH)].decode("utf-8", "replace").rstrip("\r")
+
+        hits.append((path, lineNumber, len(prefix), length, preview))
+
+        if len(hits) == MAX_FILE_HITS:
+            break
+
+    return hits
+
+
+"""
+Returns the number of hits in a mapped file, counted as by searchBuffer() (i.e up to MAX_FILE_HITS, and 0 if the file is binary), without finding their lines.
+
+PARAMETERS:
+    buffer - The mmap of the file.
+    pattern - The compiled bytes regular expression to search for.
+"""
+def countBuffer(buffer, pattern):
+
+    count = 0
+
+    if buffer.find(b"\0", 0, BINARY_CHECK_SIZE) != -1:
+        return count
+
+    for match in pattern.finditer(buffer):
+
+        if match.start() == match.end():
+            continue
+
+        count += 1
+        if count == MAX_FILE_HITS:
+            break
+
+    return count
+
+
+"""
+Replaces every hit in a batch of files. Run in a worker process.
+Each file is written atomically, through the same code as saving (See atomicFile.writeAtomically()), and is streamed from a mapping of the original to the new file, so it is never read into memory as a whole.
+
+PARAMETERS:
+    paths - List of the paths of the files to replace hits in.
+    source - Source (as bytes) of the regular expression to search for (See makePattern()).
+    flags - Flags of the regular expression.
+    replacement - The text to replace each hit with. For a regular expression search, this can refer to the hit's capture groups, as in re.sub().
+    regex - Whether the search is a regular expression search.
+
+RETURNS:
+    List of (path, count, error) tuples, where count is the number of hits replaced in the file, and error is a description of the error that stopped the file from being written (None if it was written).
+"""
+def replaceBatch(paths, source, flags, replacement, regex):
+
+    pattern = re.compile(source, flags)
+    replacement = replacement.encode("utf-8")
+
+    results = []
+
+    for path in paths:
+
+        try:
+            with open(path, 'rb') as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                    if buffer.find(b"\0", 0, BINARY_CHECK_SIZE) != -1 or not any(match.start() != match.end() for match in pattern.finditer(buffer)):
+                        continue
+
+            count = writeAtomically(path, lambda output: replaceFile(path, output, pattern, replacement, regex))
+            results.append((path, count, None))
+
+        except ValueError: # Raised if the file is empty (an empty file can't be mapped), in which case there is nothing to replace
+            continue
+
+        except (OSError, re.error) as error: # e.g Permission denied, or replacement refers to a group that doesn't exist
+            results.append((path, 0, str(error)))
+
+    return results
+
+
+"""
+Writes a file's text, with every hit replaced, to another file (See replaceBatch()).
+
+PARAMETERS:
+    path - Path of the file.
+    output - File object to write to.
+    pattern - The compiled bytes regular expression to search for.
+    replacement - The bytes to replace each hit with (a template that can refer to the hit's capture groups, if regex is True).
+    regex - Whether the search is a regular expression search.
+
+RETURNS:
+    The number of hits replaced.
+"""
+def replaceFile(path, output, pattern, replacement, regex):
+
+    count = 0
+    position = 0 # Position up to which the file has been written
+
+    with open(path, 'rb') as file:
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            with memoryview(buffer) as view: # Slices of a memoryview aren't copied, so the text between hits is written straight from the mapping
+
+                for match in pattern.finditer(buffer):
+
+                    start, end = match.span()
+                    if start == end: # Empty matches are skipped, as they are by the search (See searchBuffer())
+                        continue
+
+                    output.write(view[position:start])
+                    output.write(match.expand(replacement) if regex else replacement)
+
+                    position = end
+                    count += 1
+
+                output.write(view[position:])
+
+    return count
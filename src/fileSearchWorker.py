@@ -0,0 +1,150 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from concurrent.futures import wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+import fileSearch
+
+
+BATCH_FILES = 64 # Number of files sent to a worker process at a time
+
+PENDING_PER_WORKER = 4 # Number of batches that may be waiting for each worker process, so that workers never wait for the walk, but the walk doesn't get far ahead of the search
+
+POLL_TIME = 0.05 # Maximum time (in seconds) spent waiting for a batch to be finished, before checking whether the thread has been cancelled
+
+
+"""
+Thread that hands batches of files to the pool of worker processes (See fileSearch.getPool()) and sends their results back to the GUI thread as they arrive,
+so that neither walking the directory tree nor waiting for the workers blocks the GUI thread.
+
+The files are either searched (See fileSearch.searchBatch()), or, if a replacement is given, have their hits replaced (See fileSearch.replaceBatch()).
+
+As with highlightWorker.TokenizeThread, each thread is given a generation number that is sent back with every batch of results,
+so that results still on their way from a thread that has been cancelled can be recognized and dropped.
+
+CONSTRUCTOR PARAMETERS:
+    paths - Iterable of the paths of the files (e.g the generator returned by fileSearch.walk()).
+    source - Source (as bytes) of the regular expression to search for (See fileSearch.makePattern()).
+    flags - Flags of the regular expression.
+    generation - Number identifying the search that the thread is for.
+    replacement - The text to replace each hit with (Optional; defaults to None, in which case the files are only searched).
+    regex - Whether the search is a regular expression search (Optional; defaults to False; only used for replacing).
+
+ATTRIBUTES:
+    paths - Iterable of the paths of the files.
+    source - Source of the regular expression to search for.
+    flags - Flags of the regular expression.
+    generation - Number identifying the search that the thread is for.
+    replacement - The text to replace each hit with (None if the files are only being searched).
+    regex - Whether the search is a regular expression search.
+    cancelled - Flag that, when set from the GUI thread, stops the thread from handing out any more batches.
+    countOnly - Flag that, when set from the GUI thread (e.g once as many hits as can be listed have been found), makes the batches handed out after it only count the hits in each file
+                (See fileSearch.searchBatch()). Batches already handed out still send back every hit.
+    filesDone - Number of files that have been searched so far.
+    error - Description of the error that stopped the thread (None if there wasn't one).
+
+SIGNALS:
+    resultsReady(generation, results, filesDone) - Emitted when a batch has been finished, where results is the list returned by fileSearch.searchBatch() (or fileSearch.replaceBatch()).
+                                                  As batches are collected together, results may hold both hits and counts once countOnly has been set.
+"""
+class FileSearchThread(QThread):
+
+    resultsReady = pyqtSignal(int, list, int)
+
+
+    def __init__(self, paths, source, flags, generation, replacement=None, regex=False):
+
+        super().__init__()
+
+        self.paths = paths
+        self.source = source
+        self.flags = flags
+        self.generation = generation
+        self.replacement = replacement
+        self.regex = regex
+
+        self.cancelled = False
+        self.countOnly = False
+        self.filesDone = 0
+        self.error = None
+
+        self.pool = fileSearch.getPool() # Started in the GUI thread, so that only 1 pool is ever started
+
+
+    """
+    Reimplementation of QThread.run(). Hands out the files in batches of BATCH_FILES, collecting the results of the batches that have been finished in between.
+    """
+    def run(self):
+
+        pending = {} # Maps the future of each batch that has been handed out to the number of files in the batch
+        maxPending = PENDING_PER_WORKER * fileSearch.getWorkerCount()
+
+        try:
+            batch = []
+
+            for path in self.paths:
+
+                batch.append(path)
+
+                if len(batch) == BATCH_FILES:
+
+                    pending[self.__submit(batch)] = len(batch)
+                    batch = []
+
+                    # Only wait for a batch to be finished if too many are waiting to be searched
+                    self.__collect(pending, POLL_TIME if len(pending) >= maxPending else 0)
+
+                if self.cancelled:
+                    break
+
+            if batch and not self.cancelled:
+                pending[self.__submit(batch)] = len(batch)
+
+            while pending and not self.cancelled:
+                self.__collect(pending, POLL_TIME)
+
+        except BrokenProcessPool: # A worker process was killed (e.g by running out of memory)
+            fileSearch.pool = None
+            self.error = "A search process stopped unexpectedly"
+
+        for future in pending:
+            future.cancel()
+
+
+    """
+    Hands a batch of files to the pool.
+
+    PARAMETERS:
+        batch - List of the paths of the files in the batch.
+
+    RETURNS:
+        The concurrent.futures.Future for the batch's results.
+    """
+    def __submit(self, batch):
+
+        if self.replacement is None:
+            return self.pool.submit(fileSearch.searchBatch, batch, self.source, self.flags, self.countOnly)
+
+        return self.pool.submit(fileSearch.replaceBatch, batch, self.source, self.flags, self.replacement, self.regex)
+
+
+    """
+    Waits for batches to be finished, and emits resultsReady with the results of every batch that has been.
+
+    PARAMETERS:
+        pending - Dictionary mapping the future of each batch that hasn't been collected yet to the number of files in the batch. Collected batches are removed from it.
+        timeout - Maximum time (in seconds) to wait for a batch to be finished.
+    """
+    def __collect(self, pending, timeout):
+
+        done = wait(pending, timeout, FIRST_COMPLETED)[0]
+        if len(done) == 0:
+            return
+
+        results = []
+        for future in done:
+            results.extend(future.result())
+            self.filesDone += pending.pop(future)
+
+        if not self.cancelled:
+            self.resultsReady.emit(self.generation, results, self.filesDone)
@@ -0,0 +1,343 @@
+from PyQt6.QtWidgets import QWidget, QVBoxLayout, QMessageBox, QPushButton
+from PyQt6.QtCore import pyqtSignal
+
+import os
+
+from editor import Editor
+import languages
+import saving
+import largeFile
+import journal
+import startup
+from fileLoader import FileLoader, readFile
+from fileWatcher import FileWatcher, reloadText
+from saveWorker import hashText
+
+
+"""
+Represents a file open in a tab of the main window, holding its editor along with everything needed to load, save, watch and journal the file.
+
+CONSTRUCTOR PARAMETERS:
+    filePath - Path of the file to open (Raises OSError if the file can't be opened).
+
+ATTRIBUTES:
+    filePath - Absolute path of the file.
+    fileName - Name of the file, without the rest of its path.
+    largeFileMode - Whether the file is opened in large-file mode (See largeFile.LargeFileEditor).
+    loader - The FileLoader loading the file (None in large-file mode).
+    editor - The Editor (or LargeFileEditor) the file is open in.
+    progress - Percentage of the file that has been loaded.
+    savedHash - Hash of the text last loaded from (or saved to) the file, so that the editor can tell whether its text has been changed back to the file's text without reading the file.
+    watcher - FileWatcher watching for the file being changed by another program (None in large-file mode, as it is read-only and only ever shows part of the file).
+    journal - Journal recording edits so that they can be recovered after a crash (None until the file has been loaded, See __onLoaded()).
+    saver - The saving.Saver saving the file in the background.
+
+SIGNALS:
+    progressChanged(percent) - Emitted as the file is loaded, with the percentage of the file that has been loaded.
+    message(text) - Emitted with a message to show in the status bar (e.g once the file has been saved).
+"""
+class FileTab(QWidget):
+
+    progressChanged = pyqtSignal(int)
+    message = pyqtSignal(str)
+
+
+    def __init__(self, filePath):
+
+        super().__init__()
+
+        self.filePath = os.path.abspath(filePath)
+        self.fileName = os.path.basename(self.filePath)
+
+        # Files of at least largeFile.LARGE_FILE_SIZE are opened in large-file mode, where only part of the file is read at a time
+        self.largeFileMode = os.path.getsize(self.filePath) >= largeFile.LARGE_FILE_SIZE
+
+        # Otherwise, only the start of the file is read before the tab is shown, and the rest is loaded once the window is open (See fileLoader.FileLoader)
+        self.loader = None if self.largeFileMode else FileLoader(self.filePath)
+        startup.mark("file read")
+
+        if self.largeFileMode:
+            self.editor = largeFile.LargeFileEditor(self.filePath)
+        else:
+            # Get programming language from filename (or shebang line)
+            language = languages.detectLanguage(self.filePath, self.loader.firstText)
+
+            self.editor = Editor(self.loader.firstText, language, not self.loader.isFinished())
+
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(0, 0, 0, 0)
+        layout.addWidget(self.editor)
+
+        self.progress = 100
+        self.savedHash = None
+        self.watcher = None
+        self.journal = None
+
+        self.saver = saving.Saver()
+        self.saver.saved.connect(self.__onSaved)
+        self.saver.failed.connect(self.__onSaveFailed)
+
+        if not self.largeFileMode:
+
+            self.watcher = FileWatcher(self.filePath)
+            self.watcher.changed.connect(self.__onFileChanged)
+
+            self.progress = 0
+            self.loader.progressChanged.connect(self.__onProgressChanged)
+            self.loader.finished.connect(self.__onLoaded)
+
+
+    """
+    Starts loading the rest of the file into the editor (See fileLoader.FileLoader.start()), if it hasn't been started yet.
+    Once the file has been loaded, it is highlighted in full and its journal is started (See __onLoaded()), so this is put off until the window has first been painted (See main.MainWindow).
+    """
+    def startLoading(self):
+
+        if self.loader is not None and self.loader.editor is None:
+            self.loader.start(self.editor)
+
+
+    """
+    Loads the rest of the file straight away if it is still being loaded (or hasn't started loading yet).
+    To be called before anything that needs the whole of the file's text, as saving (or searching) only part of the file would lose (or miss) the rest of it.
+    """
+    def finishLoading(self):
+
+        if self.loader is not None:
+            self.startLoading()
+            self.loader.finish()
+
+
+    """
+    Saves the editor's text to the file in the background (See saving.Saver), in the file's original encoding and newline style.
+    The document is marked as unmodified straight away, as the snapshot being saved is the document's text as it is now (It is marked as modified again if the save fails).
+    """
+    def save(self):
+
+        self.finishLoading()
+        self.saver.save(self.filePath, self.editor.toPlainText(), self.loader.encoding, self.loader.newline)
+        self.editor.document().setModified(False)
+
+
+    """
+    Saves the editor's text to a new file chosen by the user, in the file's original encoding and newline style.
+    """
+    def saveAs(self):
+
+        self.finishLoading()
+        self.saver.saveAs(self.editor.toPlainText(), self.loader.encoding, self.loader.newline)
+
+
+    """
+    Closes the file, prompting the user to save if text in editor is discrepant from text last loaded from (or saved to) the file (See __isDirty()).
+    Once the file is closed, everything still running for it is stopped (See __stop()), and the journal is deleted, as there are no longer any unsaved changes to recover.
+
+    RETURNS:
+        Whether the file was closed (False if the user cancelled, or the file couldn't be saved).
+    """
+    def closeFile(self):
+
+        if self.largeFileMode: # Large-file mode is read-only, so there can't be any unsaved changes
+            self.__stop()
+            return True
+
+        self.saver.wait() # The file may still be being saved
+
+        if not self.__isDirty():
+            self.__stop()
+            return True
+
+        self.finishLoading()
+
+        msgBox = QMessageBox(self)
+        msgBox.setWindowTitle("BoothiumEdit")
+        msgBox.setText(f"You have unsaved changes to {self.fileName}. Do you want to save these changes before closing it?")
+
+        save = QPushButton("Save")
+        msgBox.addButton(save, QMessageBox.ButtonRole.AcceptRole)
+
+        discard = QPushButton("Discard")
+        msgBox.addButton(discard, QMessageBox.ButtonRole.DestructiveRole)
+
+        msgBox.addButton(QMessageBox.StandardButton.Cancel)
+
+        msgBox.exec()
+
+        if msgBox.clickedButton() == save:
+            self.save()
+            self.saver.wait() # The file must have been written before it is closed
+            if self.editor.document().isModified(): # The save failed (See __onSaveFailed())
+                return False
+
+        elif msgBox.clickedButton() != discard:
+            return False
+
+        self.__stop()
+        return True
+
+
+    """
+    Called as the file is loaded. Records how much of it has been loaded.
+
+    PARAMETERS:
+        percent - The percentage of the file that has been loaded.
+    """
+    def __onProgressChanged(self, percent):
+
+        self.progress = percent
+        self.progressChanged.emit(percent)
+
+
+    """
+    Called once the whole file has been loaded. Records the hash of its text, offers to recover any unsaved changes left in the file's journal by a previous session that didn't close properly, then starts journaling.
+    """
+    def __onLoaded(self):
+
+        self.savedHash = self.loader.textHash.digest()
+
+        recovered = journal.load(self.filePath)
+
+        if recovered is not None:
+            baseHash, records = recovered
+
+            # Edits can only be replayed on the text they were made to, unless the journal has been compacted into a snapshot
+            if records and (baseHash == self.savedHash or any(record[0] == journal.SNAPSHOT for record in records)):
+                answer = QMessageBox.question(self, "BoothiumEdit", f"{self.filePath} has unsaved changes from a previous session that didn't close properly. Do you want to recover them?")
+
+                if answer == QMessageBox.StandardButton.Yes:
+                    journal.replay(self.editor.document(), records)
+
+            journal.remove(self.filePath)
+
+        self.journal = journal.Journal(self.editor, self.filePath, self.savedHash)
+
+
+    """
+    Returns whether the editor's text differs from the text last loaded from (or saved to) the file.
+
+    The document's modified flag, which follows the undo stack's clean state, is checked first, so a document that hasn't been edited is known to be unchanged without looking at its text.
+    If it has been edited, its text is hashed and compared with savedHash, so that edits which have been typed out again by hand (rather than undone) don't count as changes.
+    The file itself is never read.
+    """
+    def __isDirty(self):
+
+        if self.loader is not None and not self.loader.isFinished(): # The document's modified flag isn't kept whilst the file is being loaded (See fileLoader.FileLoader)
+            return self.loader.edited
+
+        document = self.editor.document()
+
+        if not document.isModified():
+            return False
+
+        if self.savedHash is not None and hashText(document.toPlainText()) == self.savedHash:
+            document.setModified(False)
+            return False
+
+        return True
+
+
+    """
+    Called when a file has been saved. Records the hash of the text saved, if it was saved to the editor's file, and shows a message in the status bar.
+
+    PARAMETERS:
+        path - Path of the file that was saved.
+        textHash - Hash of the text that was saved.
+    """
+    def __onSaved(self, path, textHash):
+
+        if path == self.filePath:
+            self.savedHash = textHash
+            self.watcher.update() # So that the save isn't taken to be a change made by another program
+
+            if self.journal is not None:
+                self.journal.reset(textHash)
+
+        self.message.emit("Saved " + path)
+
+
+    """
+    Called when a file couldn't be saved. Marks the document as modified again, if it was the editor's file, and tells the user.
+
+    PARAMETERS:
+        path - Path of the file that couldn't be saved.
+        error - Description of the error.
+    """
+    def __onSaveFailed(self, path, error):
+
+        if path == self.filePath:
+            self.editor.document().setModified(True)
+
+        QMessageBox.warning(self, "BoothiumEdit", f"Could not save {path}:\n{error}")
+
+
+    """
+    Called when the file has been changed by another program (See fileWatcher.FileWatcher).
+    If there are no unsaved changes, the file is reloaded straight away. Otherwise, the user is asked whether to reload it, losing their changes, or keep their version.
+    """
+    def __onFileChanged(self):
+
+        if self.saver.thread is not None: # The change is the editor's own save, which __onSaved() will record
+            return
+
+        self.finishLoading()
+
+        if self.__isDirty():
+            self.watcher.blockSignals(True) # So that further changes whilst the user is being asked don't ask again
+            answer = QMessageBox.question(self, "BoothiumEdit", f"{self.filePath} has been changed by another program. Do you want to reload it and lose your unsaved changes?")
+            self.watcher.blockSignals(False)
+
+            if answer != QMessageBox.StandardButton.Yes:
+                return
+
+        self.__reload()
+
+
+    """
+    Reloads the file, only changing the lines of the editor's text that differ from the file's (See fileWatcher.reloadText()), so that the highlighting, view and user's cursor are kept.
+    """
+    def __reload(self):
+
+        self.watcher.update()
+
+        try:
+            text, self.loader.encoding, self.loader.newline = readFile(self.filePath)
+        except OSError as error:
+            QMessageBox.warning(self, "BoothiumEdit", f"Could not reload {self.filePath}:\n{error}")
+            return
+
+        reloadText(self.editor, text)
+
+        self.savedHash = hashText(text)
+        self.editor.document().setModified(False)
+
+        if self.journal is not None:
+            self.journal.reset(self.savedHash)
+
+        self.message.emit("Reloaded " + self.filePath)
+
+
+    """
+    Stops everything still running for the file once it has been closed, so that none of it carries on with an editor that is about to be deleted:
+    the editor's highlighting (and, in large-file mode, its scan of the file), the loading of the rest of the file, the watching of the file and the journal.
+    """
+    def __stop(self):
+
+        self.editor.stop()
+
+        if self.loader is not None:
+            self.loader.cancel()
+
+        if self.watcher is not None:
+            self.watcher.close()
+
+        self.__closeJournal()
+
+
+    """
+    Stops journaling and deletes the journal (See journal.Journal.close()), if it has been started.
+    """
+    def __closeJournal(self):
+
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
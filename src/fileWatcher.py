@@ -0,0 +1,191 @@
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import QObject, QFileSystemWatcher, QTimer, pyqtSignal
+
+from difflib import SequenceMatcher
+import os
+
+
+CHECK_DELAY = 100 # Time (in milliseconds) waited after the file or its directory changes before the file is checked, so that a burst of writes (e.g by a formatter) is only checked once
+
+MAX_DIFF_LINES = 20000 # If more lines than this differ, they are replaced as a single block, rather than being diffed line by line (which can take time in proportion to the square of the number of lines)
+
+
+"""
+Returns a signature of a file, made up of its modification time, size and inode number, which changes whenever the file is rewritten or replaced.
+
+PARAMETERS:
+    path - Path of the file.
+
+RETURNS:
+    A tuple of the file's modification time (in nanoseconds), size and inode number, or None if the file doesn't exist.
+"""
+def statSignature(path):
+
+    try:
+        info = os.stat(path)
+    except OSError:
+        return None
+
+    return (info.st_mtime_ns, info.st_size, info.st_ino)
+
+
+"""
+Works out which lines differ between the old and new versions of a text.
+
+The lines at the start and end that are the same in both are skipped first, as an external change usually only touches a few lines, so only the lines in between are diffed by difflib.SequenceMatcher.
+
+PARAMETERS:
+    oldLines - List of the lines of the old text.
+    newLines - List of the lines of the new text.
+
+RETURNS:
+    List of (i1, i2, j1, j2) tuples, in order, each meaning that oldLines[i1:i2] is to be replaced by newLines[j1:j2].
+"""
+def diffLines(oldLines, newLines):
+
+    start = 0
+    end = min(len(oldLines), len(newLines))
+    while start < end and oldLines[start] == newLines[start]:
+        start += 1
+
+    oldEnd = len(oldLines)
+    newEnd = len(newLines)
+    while oldEnd > start and newEnd > start and oldLines[oldEnd - 1] == newLines[newEnd - 1]:
+        oldEnd -= 1
+        newEnd -= 1
+
+    if oldEnd - start > MAX_DIFF_LINES or newEnd - start > MAX_DIFF_LINES:
+        return [(start, oldEnd, start, newEnd)] if (start, start) != (oldEnd, newEnd) else []
+
+    matcher = SequenceMatcher(None, oldLines[start:oldEnd], newLines[start:newEnd], autojunk=False)
+
+    return [(start + i1, start + i2, start + j1, start + j2) for tag, i1, i2, j1, j2 in matcher.get_opcodes() if tag != "equal"]
+
+
+"""
+Replaces the text of an editor with a new version of it (e.g the file's text after it has been changed by another program), only changing the lines that differ.
+
+As the lines that are the same are left alone, only the changed lines are rehighlighted, and the user's cursor stays on the same line.
+The view is kept on the same line too, unless that line has been changed.
+The replacement is a single edit, so it can be undone in one step.
+
+PARAMETERS:
+    editor - The editor whose text is to be replaced.
+    text - The new text.
+"""
+def reloadText(editor, text):
+
+    document = editor.document()
+    newLines = text.split("\n")
+    changes = diffLines(document.toPlainText().split("\n"), newLines)
+
+    if not changes:
+        return
+
+    blockCount = document.blockCount()
+
+    # Lines added or removed above the view would otherwise shift the text in view (as QPlainTextEdit scrolls by line)
+    topLine = editor.verticalScrollBar().value()
+    shift = sum((j2 - j1) - (i2 - i1) for i1, i2, j1, j2 in changes if i2 <= topLine)
+
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+
+    for i1, i2, j1, j2 in reversed(changes): # Working backwards, so that the positions of the lines before each change aren't affected by it
+
+        if i2 < blockCount: # Replace from the start of line i1 up to the start of line i2
+            cursor.setPosition(document.findBlockByNumber(i1).position())
+            cursor.setPosition(document.findBlockByNumber(i2).position(), QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText("".join(line + "\n" for line in newLines[j1:j2]))
+
+        elif i1 == 0: # The whole text is replaced
+            cursor.select(QTextCursor.SelectionType.Document)
+            cursor.insertText("\n".join(newLines[j1:j2]))
+
+        else: # Replace from the end of line i1 - 1 up to the end of the document, so that the line break before line i1 goes too if lines are removed from the end
+            cursor.setPosition(document.findBlockByNumber(i1 - 1).position() + document.findBlockByNumber(i1 - 1).length() - 1)
+            cursor.movePosition(QTextCursor.MoveOperation.End, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText("".join("\n" + line for line in newLines[j1:j2]))
+
+    cursor.endEditBlock()
+
+    editor.verticalScrollBar().setValue(topLine + shift)
+
+
+"""
+Watches a file for changes made by other programs (e.g a formatter, or git checkout).
+
+The file is watched with a QFileSystemWatcher, along with its directory, as a file that is replaced by renaming another file over it (as most editors and tools save files, including this one) stops being watched.
+When either changes, the file's signature (See statSignature()) is compared with the signature it had when it was last loaded or saved, so that the file is only read again if it has really changed.
+
+CONSTRUCTOR PARAMETERS:
+    filePath - Path of the file to watch.
+
+ATTRIBUTES:
+    filePath - Path of the file being watched (If the path given was a symbolic link, the file it points to is watched).
+    signature - Signature of the file when it was last loaded or saved (See update()).
+    watcher - The QFileSystemWatcher watching the file and its directory.
+    checkTimer - Single-shot QTimer that checks the file CHECK_DELAY after it (or its directory) changes.
+
+SIGNALS:
+    changed() - Emitted when the file has been changed since it was last loaded or saved.
+"""
+class FileWatcher(QObject):
+
+    changed = pyqtSignal()
+
+
+    def __init__(self, filePath):
+
+        super().__init__()
+
+        self.filePath = os.path.realpath(filePath)
+        self.signature = statSignature(self.filePath)
+
+        self.checkTimer = QTimer(self)
+        self.checkTimer.setSingleShot(True)
+        self.checkTimer.setInterval(CHECK_DELAY)
+        self.checkTimer.timeout.connect(self.__check)
+
+        self.watcher = QFileSystemWatcher([self.filePath, os.path.dirname(self.filePath)], self)
+        self.watcher.fileChanged.connect(lambda path: self.checkTimer.start())
+        self.watcher.directoryChanged.connect(lambda path: self.checkTimer.start())
+
+
+    """
+    Records the file's current signature, so that it isn't taken to have been changed. To be called when the file has been loaded or saved by the editor.
+    """
+    def update(self):
+        self.signature = statSignature(self.filePath)
+
+
+    """
+    Stops watching the file. To be called when the file is closed.
+    """
+    def close(self):
+
+        self.blockSignals(True)
+        self.checkTimer.stop()
+
+        paths = self.watcher.files() + self.watcher.directories()
+        if paths:
+            self.watcher.removePaths(paths)
+
+
+    """
+    Called by checkTimer. Emits changed if the file's signature differs from the one recorded.
+    A file that has been deleted isn't taken to have been changed, as it may be about to be replaced.
+    """
+    def __check(self):
+
+        signature = statSignature(self.filePath)
+
+        if signature is None:
+            return
+
+        if self.filePath not in self.watcher.files(): # The file was replaced, so it needs to be watched again
+            self.watcher.addPath(self.filePath)
+
+        if signature != self.signature:
+            self.signature = signature
+            self.changed.emit()
@@ -0,0 +1,462 @@
+from PyQt6.QtWidgets import QDialog, QLineEdit, QPushButton, QGridLayout, QCheckBox, QLabel, QTreeWidget, QTreeWidgetItem
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import Qt
+
+import os
+import re
+
+import fileSearch
+from fileSearchWorker import FileSearchThread
+from searchEngine import Search
+
+
+MAX_RESULTS = 10000 # Maximum number of hits listed, so that searching for a very common term doesn't fill the list with more items than it can handle.
+
+
+"""
+Represents the popup containing the Find in Files functionality, which searches every file under a directory (See fileSearch.py).
+
+The files are searched by a pool of worker processes, and the hits are added to the list as each batch of files is finished, so the first hits are listed long before a large tree has been searched.
+The search can be stopped at any time, and is stopped if a new search is started.
+
+Replace All replaces the hits in every file that has any, writing each file atomically (See fileSearch.replaceBatch()).
+Files that are open in a tab of the editor's window are the exception, as they are edited in their editors instead (as 1 step that can be undone),
+so that an editor never holds text that is out of date, and unsaved changes in it aren't lost.
+
+CONSTRUCTOR PARAMETERS:
+    editor - The QPlainTextEdit representing the code editor textbox.
+    filePath - Path of the file open in the editor.
+    openFile - Function that opens a file in the editor's window (or switches to it, if it is already open), and returns the editor it is open in (or None, if there isn't one the hit can be selected in).
+    getOpenEditors - Function that returns a dictionary mapping the real path (See os.path.realpath()) of each file open in the editor's window to the editor it is open in, once each has been loaded in full.
+
+ATTRIBUTES:
+    editor - The QPlainTextEdit representing the code editor textbox.
+    filePath - Absolute path of the file open in the editor.
+    openFile - Function that opens a file in the editor's window (See CONSTRUCTOR PARAMETERS).
+    getOpenEditors - Function that returns the editors of the files open in the editor's window (See CONSTRUCTOR PARAMETERS).
+    thread - The fileSearchWorker.FileSearchThread that is searching (or replacing), or that last did (None if nothing has been searched for yet).
+    generation - Number of the latest search, which results must be sent back with to be used (See fileSearchWorker.FileSearchThread).
+    resultCount - Number of hits found by the latest search.
+    resultFiles - Dictionary (used as an ordered set) holding the path of every file that the latest search found a hit in.
+    searchOptions - (term, regex, caseSensitive, wholeWord) tuple of the text found and the options chosen by the latest search (See fileSearch.makePattern()),
+                    so that Replace All replaces what was searched for, even if the find box or checkboxes have been changed since.
+    replacedCount - Number of hits replaced by the latest Replace All.
+    replaceErrors - List of (path, error) tuples for the files that the latest Replace All couldn't write.
+    dirBox - QLineEdit that the directory to search is typed into.
+    findBox - QLineEdit that the text to find is typed into.
+    repBox - QLineEdit that the replacement text is typed into.
+    regexBox - QCheckBox for whether the text to find is a regular expression.
+    caseBox - QCheckBox for whether hits must match the case of the text to find.
+    wordBox - QCheckBox for whether hits must be whole words.
+    searchButton - QPushButton that starts the search, or stops it whilst it is under way.
+    resultList - QTreeWidget listing the hits, 1 per row.
+    countLabel - QLabel showing the number of hits found, and how many files have been searched.
+"""
+class FindInFilesPopup(QDialog):
+
+
+    def __init__(self, editor, filePath, openFile, getOpenEditors):
+
+        super().__init__()
+
+        self.resize(700, 500)
+        self.setWindowTitle("Find in Files")
+        self.setStyleSheet("""color: white;
+                            background-color: #0E0E10;
+                            font: Garet;""")
+
+        self.editor = editor
+        self.filePath = os.path.abspath(filePath)
+        self.openFile = openFile
+        self.getOpenEditors = getOpenEditors
+
+        self.thread = None
+        self.generation = 0
+
+        self.resultCount = 0
+        self.resultFiles = {}
+        self.searchOptions = None
+        self.replacedCount = 0
+        self.replaceErrors = []
+
+        layout = QGridLayout()
+
+        textBoxStyle = "background-color: #151821; border-style: none;"
+        btnStyle = "background-color: #151821; border-style: none;"
+
+        self.dirBox = QLineEdit(self)
+        self.dirBox.setStyleSheet(textBoxStyle)
+        self.dirBox.setPlaceholderText("Directory")
+        self.dirBox.setText(os.path.dirname(self.filePath))
+        self.dirBox.returnPressed.connect(self.__find)
+
+        self.searchButton = QPushButton("Search", self)
+        self.searchButton.setFixedSize(80, 20)
+        self.searchButton.setStyleSheet(btnStyle)
+        self.searchButton.setAutoDefault(False) # Otherwise pressing return in a text box would also click the button, stopping the search it has just started
+        self.searchButton.clicked.connect(self.__onSearchClicked)
+
+        layout.addWidget(self.dirBox, 0, 0, 1, 2)
+        layout.addWidget(self.searchButton, 0, 2)
+
+        self.findBox = QLineEdit(self)
+        self.findBox.setStyleSheet(textBoxStyle)
+        self.findBox.setPlaceholderText("Find")
+        self.findBox.returnPressed.connect(self.__find)
+
+        self.repBox = QLineEdit(self)
+        self.repBox.setStyleSheet(textBoxStyle)
+        self.repBox.setPlaceholderText("Replace")
+
+        replaceAll = QPushButton("Replace All", self)
+        replaceAll.setFixedSize(80, 20)
+        replaceAll.setStyleSheet(btnStyle)
+        replaceAll.setAutoDefault(False)
+        replaceAll.clicked.connect(lambda: self.__replaceAll(self.repBox.text()))
+
+        layout.addWidget(self.findBox, 1, 0)
+        layout.addWidget(self.repBox, 1, 1)
+        layout.addWidget(replaceAll, 1, 2)
+
+        self.regexBox = QCheckBox("Regex", self)
+        self.caseBox = QCheckBox("Match Case", self)
+        self.wordBox = QCheckBox("Whole Word", self)
+
+        layout.addWidget(self.regexBox, 2, 0)
+        layout.addWidget(self.caseBox, 2, 1)
+        layout.addWidget(self.wordBox, 2, 2)
+
+        self.resultList = QTreeWidget(self)
+        self.resultList.setStyleSheet("background-color: #151821; border-style: none;")
+        self.resultList.setHeaderLabels(["File", "Line", "Text"])
+        self.resultList.setRootIsDecorated(False)
+        self.resultList.setUniformRowHeights(True) # Lets the list skip measuring every row, which matters once thousands of hits are listed
+        self.resultList.setColumnWidth(0, 220)
+        self.resultList.setColumnWidth(1, 50)
+        self.resultList.itemActivated.connect(self.__openResult)
+
+        layout.addWidget(self.resultList, 3, 0, 1, 3)
+
+        self.countLabel = QLabel(self)
+        layout.addWidget(self.countLabel, 4, 0, 1, 3)
+
+        self.setLayout(layout)
+        self.exec()
+
+
+    """
+    Reimplementation of QDialog.done(), which every way of closing the popup goes through (the exit button, Escape or a call to close()).
+    Stops any search that is under way before closing.
+    """
+    def done(self, result):
+
+        self.__stop()
+        super().done(result)
+
+
+    """
+    Called when the search button is pressed. Stops the search if one is under way, and otherwise starts one.
+    """
+    def __onSearchClicked(self):
+
+        if self.thread is not None and self.thread.isRunning():
+            self.__stop()
+            self.countLabel.setText(f"Stopped. {self.__resultSummary()}")
+        else:
+            self.__find()
+
+
+    """
+    Stops the search (or Replace All) that is under way, if there is one.
+    The thread stops handing out batches straight away, and any results that are still on their way are dropped.
+    """
+    def __stop(self):
+
+        if self.thread is None:
+            return
+
+        self.thread.cancelled = True
+        self.generation += 1
+
+        self.thread.wait() # The thread checks whether it has been cancelled at least every POLL_TIME, so this is never long
+        self.searchButton.setText("Search")
+
+
+    """
+    Returns the source and flags of the regular expression for the text to find, using the options chosen with the checkboxes (See fileSearch.makePattern()),
+    or None if there is no text to find or it isn't a valid regular expression.
+    """
+    def __makePattern(self):
+
+        term = self.findBox.text()
+
+        if term == "":
+            self.countLabel.setText("")
+            return None
+
+        try:
+            return fileSearch.makePattern(term, self.regexBox.isChecked(), self.caseBox.isChecked(), self.wordBox.isChecked())
+        except re.error:
+            self.countLabel.setText("Invalid regular expression")
+            return None
+
+
+    """
+    Starts searching every file under the chosen directory for the text to find, stopping any search that is already under way.
+    """
+    def __find(self):
+
+        self.__stop()
+
+        self.resultList.clear()
+        self.resultCount = 0
+        self.resultFiles = {}
+
+        root = self.dirBox.text()
+        if not os.path.isdir(root):
+            self.countLabel.setText("Directory does not exist")
+            return
+
+        pattern = self.__makePattern()
+        if pattern is None:
+            return
+
+        self.searchOptions = (self.findBox.text(), self.regexBox.isChecked(), self.caseBox.isChecked(), self.wordBox.isChecked())
+
+        thread = FileSearchThread(None, *pattern, self.generation)
+        thread.paths = fileSearch.walk(os.path.abspath(root), lambda: thread.cancelled) # Walked by the thread, so that walking a large tree doesn't block the GUI thread
+        thread.resultsReady.connect(self.__onResultsReady)
+        thread.finished.connect(lambda: self.__onFinished(thread))
+
+        self.thread = thread
+        self.searchButton.setText("Stop")
+        self.countLabel.setText("Searching...")
+
+        thread.start()
+
+
+    """
+    Called when a batch of files has been searched. Lists the hits found in the batch (up to MAX_RESULTS in total), and updates countLabel.
+    Once MAX_RESULTS hits have been found, the thread is told to only count the hits in the files still to be searched, as no more will be listed.
+
+    PARAMETERS:
+        generation - Number of the search that the batch is for.
+        results - List of hits (and, once the thread only counts hits, (path, count) tuples) returned by fileSearch.searchBatch().
+        filesDone - Number of files that have been searched so far.
+    """
+    def __onResultsReady(self, generation, results, filesDone):
+
+        if generation != self.generation: # Results from a search that has since been stopped
+            return
+
+        if self.thread.replacement is not None:
+            self.__onReplaced(results, filesDone)
+            return
+
+        root = os.path.abspath(self.dirBox.text())
+        items = []
+
+        for result in results:
+
+            self.resultFiles[result[0]] = None
+
+            if len(result) == 2: # (path, count) tuple from a batch that was only counted
+                self.resultCount += result[1]
+                continue
+
+            path, lineNumber, column, length, preview = result
+
+            if self.resultList.topLevelItemCount() + len(items) < MAX_RESULTS:
+                item = QTreeWidgetItem([os.path.relpath(path, root), str(lineNumber), preview.strip()])
+                item.setData(0, Qt.ItemDataRole.UserRole, (path, lineNumber, column, length))
+                items.append(item)
+
+            self.resultCount += 1
+
+        self.resultList.addTopLevelItems(items) # Adding the batch's items at once is much quicker than adding them 1 at a time
+
+        if self.resultCount >= MAX_RESULTS:
+            self.thread.countOnly = True
+
+        self.countLabel.setText(f"Searching... {self.__resultSummary()} ({filesDone} files searched)")
+
+
+    """
+    Called when the thread has stopped, whether it finished or was stopped.
+
+    PARAMETERS:
+        thread - The thread that has stopped.
+    """
+    def __onFinished(self, thread):
+
+        if thread is not self.thread or thread.cancelled:
+            return
+
+        self.searchButton.setText("Search")
+
+        if thread.error is not None:
+            self.countLabel.setText(thread.error)
+        elif thread.replacement is not None:
+            self.__showReplaced()
+        else:
+            self.countLabel.setText(self.__resultSummary())
+
+
+    """
+    Returns a description of the number of hits found (e.g "12 results in 3 files").
+    """
+    def __resultSummary(self):
+
+        if self.resultCount == 0:
+            return "No results"
+
+        summary = f"{self.resultCount} results in {len(self.resultFiles)} files"
+        if self.resultCount > MAX_RESULTS:
+            summary += f" (first {MAX_RESULTS} listed)"
+
+        return summary
+
+
+    """
+    Called when a result is double clicked (or Return is pressed on it).
+    A hit in the file open in the editor is selected in the editor. A hit in another file is selected once that file has been opened in a tab of the editor's window.
+
+    PARAMETERS:
+        item - The QTreeWidgetItem for the hit.
+    """
+    def __openResult(self, item):
+
+        path, lineNumber, column, length = item.data(0, Qt.ItemDataRole.UserRole)
+
+        editor = self.editor if path == self.filePath else self.openFile(path)
+
+        if editor is None:
+            return
+
+        block = editor.document().findBlockByNumber(lineNumber - 1)
+        if not block.isValid(): # The file has been edited since it was searched
+            return
+
+        start = block.position() + min(column, block.length() - 1)
+        end = block.position() + min(column + length, block.length() - 1)
+
+        cursor = QTextCursor(editor.document())
+        cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
+        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor)
+        editor.setTextCursor(cursor)
+
+
+    """
+    Replace every hit of the latest search with new text. The text searched for (and the options chosen) are those of the latest search, not what is in the find box now (See searchOptions).
+    The hits in files open in the editor's window are replaced in their editors straight away, each within a single edit block, so that they can be undone in 1 step.
+    The other files are then handed to the worker processes, which search them again and replace the hits in them. Files open in large-file mode are left unchanged, as the editor is read-only.
+
+    PARAMETERS:
+        newText - The text to replace each hit with. For a regular expression search, this can refer to the hit's capture groups, as in re.sub().
+    """
+    def __replaceAll(self, newText):
+
+        if self.thread is None or self.thread.replacement is not None or len(self.resultFiles) == 0:
+            return
+
+        if self.thread.isRunning():
+            self.countLabel.setText("Wait for the search to finish before replacing")
+            return
+
+        pattern = (self.thread.source, self.thread.flags) # The pattern of the search that found the hits, rather than one made from what is in the find box now
+
+        self.replacedCount = 0
+        self.replaceErrors = []
+
+        paths = list(self.resultFiles)
+        self.resultList.clear()
+        self.resultCount = 0
+        self.resultFiles = {}
+
+        openEditors = self.getOpenEditors()
+        closedPaths = []
+
+        for path in paths:
+            editor = openEditors.get(os.path.realpath(path))
+            if editor is None:
+                closedPaths.append(path)
+            elif editor.isReadOnly(): # Open in large-file mode, which reads the file from disk as it is scrolled, so it mustn't be rewritten under the editor
+                self.replaceErrors.append((path, "Open in large-file mode, which is read-only"))
+            else:
+                self.__replaceInEditor(editor, path, newText)
+
+        paths = closedPaths
+
+        thread = FileSearchThread(paths, *pattern, self.generation, newText, self.searchOptions[1])
+        thread.resultsReady.connect(self.__onResultsReady)
+        thread.finished.connect(lambda: self.__onFinished(thread))
+
+        self.thread = thread
+        self.searchButton.setText("Stop")
+        self.countLabel.setText("Replacing...")
+
+        thread.start()
+
+
+    """
+    Replaces every hit in a file open in an editor with new text, within a single edit block.
+
+    PARAMETERS:
+        editor - The editor the file is open in.
+        path - Path of the file.
+        newText - The text to replace each hit with.
+    """
+    def __replaceInEditor(self, editor, path, newText):
+
+        try:
+            search = Search(*self.searchOptions)
+            text = editor.toPlainText()
+            search.searchAll(text)
+            replacements = [search.expand(text, index, newText) for index in range(len(search))]
+        except re.error: # Raised if newText refers to a group that doesn't exist
+            self.replaceErrors.append((path, "Invalid replacement"))
+            return
+
+        cursor = QTextCursor(editor.document())
+        cursor.beginEditBlock()
+
+        for (start, length), replacement in reversed(list(zip(search.hits(), replacements))): # Replaced from the end, so that the positions of the hits before are unchanged
+            if replacement is None: # The hit no longer matches (See searchEngine.Search.expand()), which can't happen as nothing has been replaced yet, but is checked for all the same
+                continue
+            cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
+            cursor.setPosition(start + length, QTextCursor.MoveMode.KeepAnchor)
+            cursor.insertText(replacement)
+
+        cursor.endEditBlock()
+
+        self.replacedCount += len(replacements) - replacements.count(None)
+
+
+    """
+    Called when a batch of files has had its hits replaced, to add up the number of hits replaced.
+
+    PARAMETERS:
+        results - List returned by fileSearch.replaceBatch().
+        filesDone - Number of files that have been done so far.
+    """
+    def __onReplaced(self, results, filesDone):
+
+        for path, count, error in results:
+            self.replacedCount += count
+            if error is not None:
+                self.replaceErrors.append((path, error))
+
+        self.countLabel.setText(f"Replacing... {self.replacedCount} replaced ({filesDone} of {len(self.thread.paths)} files)")
+
+
+    """
+    Shows the number of hits replaced by Replace All, and the files that couldn't be written (if any).
+    """
+    def __showReplaced(self):
+
+        text = f"{self.replacedCount} replaced"
+
+        if self.replaceErrors:
+            text += f". Could not write {len(self.replaceErrors)} files: " + ", ".join(os.path.basename(path) for path, error in self.replaceErrors[:3])
+
+        self.countLabel.setText(text)
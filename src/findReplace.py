@@ -1,10 +1,32 @@
-from PyQt6.QtWidgets import QDialog, QLineEdit, QPushButton, QGridLayout, QMessageBox, QTextEdit
+from PyQt6.QtWidgets import QDialog, QLineEdit, QPushButton, QGridLayout, QTextEdit, QCheckBox, QLabel
 from PyQt6.QtGui import QTextCursor, QTextCharFormat, QColor
+from PyQt6.QtCore import QTimer, QPoint
 
+import re
+import time
 
+from searchEngine import Search
 
-""" 
-Represents the popup containing the find & replace functionality
+
+FIND_DELAY = 150 # Time (in milliseconds) after the user stops typing in the find box before the search starts, so that a search isn't started for every keystroke.
+
+SEARCH_CHUNK = 65536 # Number of characters searched at a time, between checks of whether the time slice is over.
+
+MERGE_GAP = 64 # Occurences on the same line that are separated by at most this many characters are replaced with a single edit by Replace All.
+
+SLICE_TIME = 0.01 # Maximum time (in seconds) spent searching before control is given back to the event loop, so that typing in the find box is never blocked for longer than this.
+
+
+"""
+Represents the popup containing the find & replace functionality.
+
+Text is searched for as the user types it into the find box. Once the user stops typing for FIND_DELAY, the lines in view are searched straight away,
+and the whole document is then searched in time slices of at most SLICE_TIME, with the popup showing the number of occurences found so far.
+If the text to find is changed before the search is finished, the search is cancelled and a new one is started.
+
+Occurences are highlighted with the editor's extra selections (See QPlainTextEdit.setExtraSelections()), which are drawn over the text without being part of the document,
+so highlighting them doesn't edit the document, add to its undo stack or cause it to be rehighlighted. Only the occurences in view are given extra selections,
+and these are updated whenever the editor is scrolled, so the cost of highlighting (and unhighlighting) doesn't depend on the number of occurences found.
 
 CONSTRUCTOR PARAMETERS:
     editor - The QPlainTextEdit representing the code editor textbox.
@@ -12,7 +34,22 @@ CONSTRUCTOR PARAMETERS:
 ATTRIBUTES:
     editor - The QPlainTextEdit representing the code editor textbox.
     document - The QTextDocument open in the editor.
-    instances - Array of QTextCursors, storing the cursors that select individual occurences of found text.
+    search - The searchEngine.Search holding the positions of the occurences of found text (None if nothing has been searched for yet).
+    text - Snapshot of the document's text that is searched. As the popup is modal, the document is almost only ever edited by replacing occurences,
+            so the snapshot is taken when the popup is opened, and the replacements are then made to the snapshot as well as to the document.
+            If the document is edited in any other way (e.g it is reloaded because another program changed the file), the snapshot is dropped (None) until the search is started again (See __onContentsChange()).
+    replacing - Whether the popup is making a replacement, so that its own edits aren't taken to be made by something else.
+    current - Index (within search) of the occurence that the user's cursor was last moved to (None if the user's cursor hasn't been moved to an occurence yet).
+                So long as the user's selection is still that occurence, moving to the next or previous occurence doesn't require a search for the position of the user's cursor.
+    anchor - Position in the document from which the first occurence is to be selected, i.e the start of the user's selection when the search was started.
+    highlightFmt - The QTextCharFormat that occurences are highlighted with.
+    findBox - QLineEdit that the text to find is typed into.
+    regexBox - QCheckBox for whether the text to find is a regular expression.
+    caseBox - QCheckBox for whether occurences must match the case of the text to find.
+    wordBox - QCheckBox for whether occurences must be whole words.
+    countLabel - QLabel showing the number of occurences found, and which of them is selected (i.e "n of N").
+    findTimer - Single-shot QTimer that starts the search once the user has stopped typing for FIND_DELAY.
+    searchTimer - Zero-interval QTimer that searches the document, 1 time slice per timeout.
 """
 class FindReplacePopup(QDialog):
 
@@ -21,7 +58,7 @@ class FindReplacePopup(QDialog):
 
         super().__init__()
 
-        self.setFixedSize(300, 100)
+        self.setFixedSize(300, 150)
         self.setWindowTitle("Find & Replace")
         self.setStyleSheet("""color: white; 
                             background-color: #0E0E10;
@@ -30,19 +67,37 @@ class FindReplacePopup(QDialog):
         self.editor = editor 
         self.document = editor.document()
 
-        self.instances = [] # Array of QTextCursors - stores the cursors that select individual occurences of found text.
+        self.search = None
+        self.current = None
+        self.anchor = 0
+
+        self.highlightFmt = QTextCharFormat()
+        self.highlightFmt.setBackground(QColor("#535e7c"))
+
+        self.text = self.document.toPlainText() # Taken before the user starts typing, as this takes a while for a large document
+        self.replacing = False
+
+        self.findTimer = QTimer(self)
+        self.findTimer.setSingleShot(True)
+        self.findTimer.setInterval(FIND_DELAY)
+        self.findTimer.timeout.connect(lambda: self.__find(self.findBox.text()))
+
+        self.searchTimer = QTimer(self)
+        self.searchTimer.setInterval(0) # A zero-interval timer times out whenever the event loop has no other events to process
+        self.searchTimer.timeout.connect(self.__searchSlice)
 
         layout = QGridLayout()
 
         textBoxStyle = "background-color: #151821; border-style: none;"
         btnStyle = "background-color: #151821; border-style: none;"
 
-        findBox = QLineEdit(self)
-        findBox.setFixedSize(120, 20)
-        findBox.setStyleSheet(textBoxStyle)
-        findBox.setPlaceholderText("Find")
-        findBox.returnPressed.connect(lambda: self.__find(findBox.text()))
-    
+        self.findBox = QLineEdit(self)
+        self.findBox.setFixedSize(120, 20)
+        self.findBox.setStyleSheet(textBoxStyle)
+        self.findBox.setPlaceholderText("Find")
+        self.findBox.textChanged.connect(lambda: self.findTimer.start()) # (Re)starting the timer on every keystroke means the search only starts once the user stops typing
+        self.findBox.returnPressed.connect(self.__onReturnPressed)
+
         next = QPushButton("Next", self)
         next.setFixedSize(60, 20)
         next.setStyleSheet(btnStyle)
@@ -53,7 +108,7 @@ class FindReplacePopup(QDialog):
         previous.setStyleSheet(btnStyle)
         previous.clicked.connect(self.__prevInstance)
 
-        layout.addWidget(findBox, 0, 0)    
+        layout.addWidget(self.findBox, 0, 0)
         layout.addWidget(next, 0, 1)
         layout.addWidget(previous, 0, 2)
 
@@ -76,187 +131,452 @@ class FindReplacePopup(QDialog):
         layout.addWidget(replace, 1, 1)
         layout.addWidget(replaceAll, 1, 2)
 
+        # Text can only be found, not replaced, in a read-only editor (i.e in large-file mode), as the popup's edits would otherwise get around the editor being read-only
+        for widget in (repBox, replace, replaceAll):
+            widget.setEnabled(not editor.isReadOnly())
+
+        # Buttons in a dialog are clicked by pressing return, which would move to the next occurence a second time after __onReturnPressed()
+        for button in (next, previous, replace, replaceAll):
+            button.setAutoDefault(False)
+
+        self.regexBox = QCheckBox("Regex", self)
+        self.caseBox = QCheckBox("Match Case", self)
+        self.wordBox = QCheckBox("Whole Word", self)
+
+        for checkBox in (self.regexBox, self.caseBox, self.wordBox):
+            checkBox.toggled.connect(lambda: self.findTimer.start())
+
+        layout.addWidget(self.regexBox, 2, 0)
+        layout.addWidget(self.caseBox, 2, 1)
+        layout.addWidget(self.wordBox, 2, 2)
+
+        self.countLabel = QLabel(self)
+        layout.addWidget(self.countLabel, 3, 0, 1, 3)
+
+        self.editor.verticalScrollBar().valueChanged.connect(self.__highlightVisible) # Occurences scrolled into view must be highlighted
+        self.document.contentsChange.connect(self.__onContentsChange)
+
         self.setLayout(layout)
         self.exec()
 
-    
+
+    """
+    Reimplementation of QDialog.done(), which every way of closing the popup goes through (the exit button, Escape or a call to close()).
+    Stops searching and removes highlights before closing.
+    """
+    def done(self, result):
+
+        self.findTimer.stop()
+        self.searchTimer.stop()
+
+        self.editor.verticalScrollBar().valueChanged.disconnect(self.__highlightVisible)
+        self.document.contentsChange.disconnect(self.__onContentsChange)
+
+        self.__unhighlight()
+        super().done(result)
+
+
     """
-    Reimplementation of QWidget.closeEvent()
-    When user presses exit button, remove highlights before closing. 
+    Called when the document is edited. Unless the edit is one of the popup's own replacements, the snapshot and the positions of the occurences are out of date,
+    so the occurences are forgotten (so that nothing is replaced at a stale position), and the search is started again with a new snapshot.
+
+    PARAMETERS:
+        position - Position in the document at which the change occured.
+        removed - Number of characters removed.
+        added - Number of characters added.
     """
-    def closeEvent(self, event):
+    def __onContentsChange(self, position, removed, added):
+
+        if self.replacing or (removed == 0 and added == 0):
+            return
+
+        self.searchTimer.stop()
         self.__unhighlight()
-        self.close()
+
+        self.text = None # Taken again by __find(), once rather than after each of a burst of edits
+
+        if self.search is not None:
+            self.search = None
+            self.current = None
+            self.countLabel.setText("")
+            self.findTimer.start() # Started again once the edits (e.g a reload, which may be made up of many) are over
+
+
+    """
+    Called when the user presses Return in the find box. Starts the search straight away if it hasn't been started yet, and otherwise moves to the next occurence.
+    """
+    def __onReturnPressed(self):
+
+        if self.findTimer.isActive() or self.search is None:
+            self.__find(self.findBox.text())
+        else:
+            self.__nextInstance()
 
 
     """
-    Gets instances of searchTerm, adds the positions of these instances to self.instances[], and highlights the instances in the editor. 
-    The user's cursor will be moved to select the first instance
+    Starts searching for searchTerm (using the options chosen with the checkboxes), cancelling any search that is already under way.
+    The occurences in view are found and highlighted straight away, and the rest of the document is searched by searchTimer.
+    The user's cursor will be moved to select the first occurence at or after the start of the user's selection, once it has been found.
 
     PARAMETERS:
         searchTerm - The text to search for.
     """
     def __find(self, searchTerm):
 
+        self.findTimer.stop()
+        self.searchTimer.stop()
+
+        self.__unhighlight() # Remove previous highlights that were created by a previous call to this function.
+
+        self.search = None
+        self.current = None
+
         # Exit function if no text was entered
         if searchTerm == "":
+            self.countLabel.setText("")
+            return
+
+        try:
+            self.search = Search(searchTerm, self.regexBox.isChecked(), self.caseBox.isChecked(), self.wordBox.isChecked())
+        except re.error: # Raised if searchTerm isn't a valid regular expression (e.g whilst it is still being typed)
+            self.countLabel.setText("Invalid regular expression")
             return
 
-        document = self.document
-        text = document.toPlainText()
+        if self.text is None:
+            self.text = self.document.toPlainText()
+
+        self.anchor = self.editor.textCursor().selectionStart()
+
+        self.searchTimer.start()
+
+        self.__highlightVisible() # Occurences the user can see are highlighted without waiting for the rest of the document to be searched
+        self.__updateCount()
+
+
+    """
+    Called by searchTimer. Searches the document in chunks of SEARCH_CHUNK characters until SLICE_TIME has passed or the end of the document is reached,
+    then updates the count of occurences found.
+    """
+    def __searchSlice(self):
+
+        deadline = time.perf_counter() + SLICE_TIME
+
+        search = self.search
+        found = len(search) # Number of occurences found before this time slice
+
+        finished = False
+        while not finished and time.perf_counter() < deadline:
+            finished = search.searchUntil(self.text, search.position + SEARCH_CHUNK)
+
+        if finished:
+            self.searchTimer.stop()
+
+        if self.current is None and len(search) > 0:
+
+            index = search.hitIndex(self.anchor, found) # First occurence found in this time slice at or after the anchor
+
+            if index < len(search):
+                self.__selectInstance(index)
+            elif finished: # No occurences after the anchor, so go round to the first occurence
+                self.__selectInstance(0)
+
+        self.__updateCount()
+
 
-        self.__unhighlight() # Remove previous highlights from the document that were created by a previous call to this function.
-        self.instances = [] # Clear instances array of any instances left over from a previous function call.
+    """
+    Finishes any search that is under way without splitting it into time slices, so that the positions of all the occurences are known.
+    """
+    def __finishSearch(self):
+
+        if not self.searchTimer.isActive():
+            return
 
-        isDiff = False # Flag indicating whether text being examined is discrepant from searchTerm
+        self.searchTimer.stop()
+        self.search.searchUntil(self.text, len(self.text))
 
-        for i in range(len(text)):
-                
-                if text[i] == searchTerm[0]: # Look for first character of searchTerm
+        if self.current is None and len(self.search) > 0:
+            self.__selectInstance(self.search.hitIndex(self.anchor) % len(self.search))
 
-                    if len(searchTerm) == 1: # As we have established that the first characters are equal, if the searchTerm only has 1 character then we can conclude the scanning of this particular instance.
-                        offset = 0 # There is no offset if searchTerm only has 1 character.
-                    
-                    else:
-                        for offset in range(1, len(searchTerm)): # Range starts at 1, not 0, as we have already established that the first characters are equal.
-                            if searchTerm[offset] != text[i + offset]:
-                                isDiff = True
-                                break
-                        
-                    if not isDiff:
+        self.__updateCount()
 
-                        start = i 
-                        end = i + offset + 1  # Note that because QTextCursor positions itself between characters, the cursors final position must be offset + 1.
 
-                        cursor = QTextCursor(self.document)
-                        cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor) # Navigate cursor to instance.
-                        cursor.setPosition(end, QTextCursor.MoveMode.KeepAnchor) # Select whole instance by moving position to end of instance but maintaining anchor at beginning.
-                        self.instances.append(cursor)
+    """
+    Updates countLabel to show the number of occurences found so far, and which of them is selected.
+    """
+    def __updateCount(self):
 
-                    isDiff = False # Reset difference flag.
+        count = len(self.search)
+        searching = self.searchTimer.isActive()
 
-        if self.instances == []: # In case no instances are found
-            msgBox = QMessageBox()
-            msgBox.setWindowTitle("BoothiumEdit")
-            msgBox.setText(f"Couldn't find '{searchTerm}'")
-            msgBox.exec()
+        if count == 0:
+            self.countLabel.setText("Searching..." if searching else "No results")
+            return
 
+        if self.current is None:
+            text = f"{count} found"
         else:
+            text = f"{self.current + 1} of {count}"
+
+        if searching:
+            text += "..."
+
+        self.countLabel.setText(text)
+
+
+    """
+    Highlights the occurences of found text that are in view, replacing the highlighting of any that were previously in view.
+    If the search hasn't yet got as far as the end of the lines in view, the lines in view are searched separately, rather than waiting for the search.
+    """
+    def __highlightVisible(self):
+
+        search = self.search
+
+        if search is None:
+            self.editor.setExtraSelections([])
+            return
 
-            highlightFmt = QTextCharFormat() 
-            highlightFmt.setBackground(QColor("#535e7c"))
+        viewport = self.editor.viewport()
+        firstVisible = self.editor.firstVisibleBlock()
+        lastVisible = self.editor.cursorForPosition(QPoint(viewport.width(), viewport.height())).block()
 
-            for instanceCursor in self.instances:
-                instanceCursor.setCharFormat(highlightFmt) # Apply highlighting
+        start = firstVisible.position()
+        end = lastVisible.position() + lastVisible.length() - 1
+
+        if self.searchTimer.isActive() and search.position < end:
+            hits = search.findWithin(self.text, start, end)
+
+        else: # As the occurences are in order of position, those in view can be found by binary search
+            first = search.hitIndex(start)
+            last = search.hitIndex(end, first)
+            hits = [search.hit(i) for i in range(first, last)]
+
+        selections = []
+
+        for hitStart, length in hits:
+
+            selection = QTextEdit.ExtraSelection()
+            selection.cursor = QTextCursor(self.document)
+            selection.cursor.setPosition(hitStart, QTextCursor.MoveMode.MoveAnchor)
+            selection.cursor.setPosition(hitStart + length, QTextCursor.MoveMode.KeepAnchor)
+            selection.format = self.highlightFmt
+            selections.append(selection)
+
+        self.editor.setExtraSelections(selections)
 
-            self.editor.setTextCursor(self.instances[0]) # Have user's cursor select first instance
-        
 
     """
-    Removes highlighting from document that was created by __find(). 
+    Removes the highlighting created by __highlightVisible().
     """
     def __unhighlight(self):
+        self.editor.setExtraSelections([])
+
+
+    """
+    Moves user's cursor to select an occurence of found text. The cursor for the occurence is only made at this point.
+
+    PARAMETERS:
+        index - Index of the occurence within self.search.
+    """
+    def __selectInstance(self, index):
+
+        start, length = self.search.hit(index)
 
-        defaultFmt = QTextCharFormat() 
-        defaultFmt.setBackground(QColor("#22283a")) # Background will be reset to the background color of the editor 
         cursor = QTextCursor(self.document)
+        cursor.setPosition(start, QTextCursor.MoveMode.MoveAnchor) # Navigate cursor to occurence.
+        cursor.setPosition(start + length, QTextCursor.MoveMode.KeepAnchor) # Select whole occurence by moving position to end of occurence but maintaining anchor at beginning.
+
+        self.current = index
+        self.editor.setTextCursor(cursor)
+        self.__updateCount()
+
+
+    """
+    Returns whether the user's selection is exactly the occurence that the user's cursor was last moved to.
+    """
+    def __isCurrentSelected(self):
 
-        cursor.setPosition(len(self.document.toPlainText()), QTextCursor.MoveMode.KeepAnchor) # Select entire document
-        cursor.setCharFormat(defaultFmt)
+        if self.current is None or self.current >= len(self.search):
+            return False
 
-        # By setting the text to the format with the default background the syntax highlighting is also removed. This restores the syntax highlighting
-        if self.editor.highlighter != None:
-            self.editor.highlighter.highlightAll()
+        start, length = self.search.hit(self.current)
+        cursor = self.editor.textCursor()
+
+        return cursor.selectionStart() == start and cursor.selectionEnd() == start + length
 
 
     """
-    Moves user's cursor to next instance. 
+    Moves user's cursor to next occurence after the user's cursor, going back to the first occurence after the last. 
+    If the user's selection is the occurence they were last moved to, this is simply the occurence after it. 
+    Otherwise (e.g the user has moved their cursor), the occurence is found by binary search from the position of the user's cursor, so this works from anywhere in the document.
     """
     def __nextInstance(self):
 
-        if len(self.instances) <= 1: # There is no next instance if there is only 1 instance, so exit the function in that case. If there are no instances, the user pressed the button without any instances having been found.
+        if self.search is None or len(self.search) == 0: # The user pressed the button without any occurences having been found.
             return
 
-        currentCursor = self.editor.textCursor()
-        newCursor = QTextCursor(self.document)
-
-        for i in range(len(self.instances)): # Find instance which user's current cursor is at.
-
-            if self.instances[i] == currentCursor:
+        if self.__isCurrentSelected():
+            index = self.current + 1
+        else:
+            index = self.search.hitIndex(self.editor.textCursor().selectionStart()) # First occurence at or after the user's cursor
 
-                try:
-                    newCursor = self.instances[i + 1]
-                except IndexError: # Raised if there is no instance after the currently selected one. In this case, put the cursor back to the first instance.
-                    newCursor = self.instances[0]
-                    
-        self.editor.setTextCursor(newCursor) 
+        self.__selectInstance(index % len(self.search))
 
 
     """
-    Moves user's cursor to previous instance.
+    Moves user's cursor to previous occurence before the user's cursor, going round to the last occurence before the first (See __nextInstance()).
     """
     def __prevInstance(self):        
 
-        if len(self.instances) <= 1: # There is no previous instance if there is only 1 instance, so exit the function in that case. If there are no instances, the user pressed the button without any instances having been found.
+        if self.search is None or len(self.search) == 0: # The user pressed the button without any occurences having been found.
             return
 
-        currentCursor = self.editor.textCursor()
-        newCursor = QTextCursor(self.document)
-
-        for i in range(len(self.instances)): # Find instance which user's current cursor is at.
-
-            if self.instances[i] == currentCursor:
+        if self.__isCurrentSelected():
+            index = self.current - 1
+        else:
+            index = self.search.hitIndex(self.editor.textCursor().selectionStart()) - 1 # Last occurence before the user's cursor
 
-                try:
-                    newCursor = self.instances[i - 1]
-                except IndexError: # Raised if there is no instance before the currently selected one. In this case, put the cursor to the last instance.
-                    newCursor = self.instances[len(self.instances) - 1]
-                    
-        self.editor.setTextCursor(newCursor) 
+        self.__selectInstance(index % len(self.search))
 
 
     """
-    Replace instance of found text on which the user's cursor is positioned with new text, 
-    moving the user's cursor to next instance in the process.
+    Replace occurence of found text that the user's cursor was last moved to with new text, 
+    moving the user's cursor to next occurence in the process.
+    If the user's selection isn't an occurence (e.g the user has moved their cursor), the user's cursor is moved to the next occurence instead, without replacing anything.
+    An occurence that no longer matches (as a replacement made since has changed the text around it) is skipped, without being replaced.
+    For a regular expression search, the new text can refer to the occurence's capture groups (See searchEngine.Search.expand()).
 
         PARAMETERS:
-            newText - The text to replace the selected instance with.
+            newText - The text to replace the selected occurence with.
     """
     def __replace(self, newText):
 
-        if newText == "" or self.instances == []:
+        if newText == "" or self.search is None or self.editor.isReadOnly():
+            return
+
+        self.__finishSearch() # The positions of the occurences after the replaced one are about to change, so they must all have been found in the snapshot first
+
+        search = self.search
+        if len(search) == 0:
             return
-        
-        cursorForInstance = self.editor.textCursor()
 
-        # Removing highlighting from instance.
-        defaultFmt = QTextCharFormat() 
-        defaultFmt.setBackground(QColor("#171c2b")) # Background will be reset to the background color of the editor 
-        cursorForInstance.setCharFormat(defaultFmt)
+        if not self.__isCurrentSelected():
+            self.__nextInstance()
+            return
+
+        index = self.current
+        start, length = search.hit(index)
+
+        try:
+            newText = search.expand(self.text, index, newText)
+        except re.error: # Raised if newText refers to a group that doesn't exist
+            self.countLabel.setText("Invalid replacement")
+            return
 
-        self.__nextInstance()
+        if newText is None: # No longer an occurence, so it is dropped, leaving its text as it is
+            search.replaceHit(index, length)
+            if len(search) > 0:
+                self.__selectInstance(index % len(search))
+            else:
+                self.current = None
+                self.__updateCount()
+            self.__highlightVisible()
+            return
 
-        # Remove instance to be replaced from self.instances
-        for i in self.instances:
-            if i.anchor() == cursorForInstance.anchor():
-                self.instances.remove(i)
-                break
+        cursorForInstance = QTextCursor(self.document)
+        cursorForInstance.setPosition(start, QTextCursor.MoveMode.MoveAnchor)
+        cursorForInstance.setPosition(start + length, QTextCursor.MoveMode.KeepAnchor)
 
+        self.replacing = True
         cursorForInstance.insertText(newText) # insertText() also deletes current selection before inserting new text
+        self.replacing = False
+        self.text = self.text[:start] + newText + self.text[start + length:]
+
+        search.replaceHit(index, len(newText)) # Remove the replaced occurence, and move the occurences after it by the change in length
+
+        if len(search) > 0:
+            self.__selectInstance(index % len(search)) # The next occurence now has the replaced occurence's index
+        else:
+            self.current = None
+            self.__updateCount()
+
+        self.__highlightVisible()
 
 
     """
-    Replace all instances of found text in file with new text.
+    Replace all occurences of found text in file with new text.
+    The text that each occurence is to be replaced with is worked out first (See searchEngine.Search.expand()), and the replacements are then made within a single edit block,
+    so that they can be undone in 1 step, and the document's contentsChange signal is only emitted once (so the edited lines are only rehighlighted once).
+    Only the occurences whose text actually changes are edited, and occurences close together on the same line are replaced with a single edit (See MERGE_GAP).
+    Occurences that no longer match (See searchEngine.Search.expand()) are left as they are.
 
         PARAMETERS:
-            newText - The text to replace the selected instance with.
+            newText - The text to replace the selected occurence with.
     """
     def __replaceAll(self, newText):
-        
-        if newText == "" or self.instances == []:
+
+        if newText == "" or self.search is None or self.editor.isReadOnly():
+            return
+
+        self.__finishSearch()
+
+        search = self.search
+        text = self.text
+
+        try:
+            if search.regex:
+                replacements = [search.expand(text, i, newText) for i in range(len(search))]
+            else:
+                replacements = [newText] * len(search)
+        except re.error: # Raised if newText refers to a group that doesn't exist
+            self.countLabel.setText("Invalid replacement")
             return
 
-        for i in range(len(self.instances)):
-            self.__replace(newText)
+        # Group the occurences into edits, each of which is a [start, end, [replacement pieces]] list. Occurences whose text is unchanged are left out.
+        edits = []
+        edit = None # The edit that the last changed occurence was put in
+
+        for (start, length), replacement in zip(search.hits(), replacements):
+
+            if replacement is None or (length == len(replacement) and text.startswith(replacement, start)):
+                continue
 
-        self.__unhighlight() # Remove all highlighting from document now that all instances have been replaced.
\ No newline at end of file
+            end = start + length
+
+            if edit is not None and start - edit[1] <= MERGE_GAP and text.find("\n", edit[1], start) == -1:
+                edit[2].append(text[edit[1]:start]) # Text between the occurences is kept as it is
+                edit[2].append(replacement)
+                edit[1] = end
+            else:
+                edit = [start, end, [replacement]]
+                edits.append(edit)
+
+        cursor = QTextCursor(self.document)
+        keepAnchor = QTextCursor.MoveMode.KeepAnchor
+        self.replacing = True
+        cursor.beginEditBlock()
+
+        # The edits are made from the end of the document backwards, so that making an edit doesn't move the positions of the edits that are still to be made.
+        for start, end, pieces in reversed(edits):
+            cursor.setPosition(start)
+            cursor.setPosition(end, keepAnchor)
+            cursor.insertText("".join(pieces))
+
+        cursor.endEditBlock()
+        self.replacing = False
+
+        # Make the same edits to the snapshot
+        newPieces = []
+        pos = 0
+        for start, end, pieces in edits:
+            newPieces.append(text[pos:start])
+            newPieces.extend(pieces)
+            pos = end
+        newPieces.append(text[pos:])
+        self.text = "".join(newPieces)
+
+        self.countLabel.setText(f"{len(replacements) - replacements.count(None)} replaced")
+
+        # There are no occurences left to select or highlight
+        self.search = None
+        self.current = None
+        self.__unhighlight()
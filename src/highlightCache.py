@@ -0,0 +1,281 @@
+from PyQt6.QtCore import QStandardPaths
+
+from array import array
+import hashlib
+import json
+import mmap
+import os
+import struct
+
+from atomicFile import writeAtomically
+import languages
+import tokenStore
+from tokenizer import LEXER_VERSION
+
+
+"""
+On-disk cache of the highlighting of files, so that reopening a file that hasn't changed doesn't require tokenizing it again.
+
+The highlighting of a file is stored in a cache file named after a hash of the file's text, the version of its language's grammar and the version of the lexer,
+so that a cache file is never used for text or rules other than the ones it was made from.
+
+Cache files are in a compact binary format that is read through mmap, so only the lines that are actually highlighted from the cache are read from disk:
+    - Header: The magic bytes "BEHC", followed by the format version, the number of lines and the length of the token type table (3 unsigned 32-bit integers).
+    - Token type table: JSON array of the names of the token types, indexed by the token type IDs used in the file.
+    - States: Signed 32-bit integer for each line, holding the state at the end of the line (See tokenizer.Lexer).
+    - Offsets: Unsigned 32-bit integer for each line (plus 1 for the end of the last line), holding the offset of the line's tokens within the token data.
+    - Token data: The tokens of each line, packed as by tokenStore.packTokens().
+
+Once the cache directory grows past CACHE_SIZE_LIMIT, the least recently used cache files are deleted.
+
+As a cache file may have been cut short or corrupted, everything read from it is checked (See CachedHighlighting), and a cache file that fails a check is deleted (See remove()).
+"""
+
+MAGIC = b"BEHC"
+FORMAT_VERSION = 1
+HEADER = struct.Struct("<4sIII")
+
+CACHE_SIZE_LIMIT = 256 * 1024 * 1024 # Maximum total size (in bytes) of the cache files
+
+
+"""
+Returns the path of the cache directory, creating it if it doesn't exist yet.
+"""
+def getCacheDir():
+
+    cacheDir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericCacheLocation), "BoothiumEdit", "highlight")
+    os.makedirs(cacheDir, exist_ok=True)
+
+    return cacheDir
+
+
+"""
+Returns the key under which the highlighting of a text is cached.
+
+PARAMETERS:
+    text - The text of the file.
+    language - The name of the file's language.
+"""
+def makeKey(text, language):
+
+    textHash = hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=20)
+    grammarVersion = languages.getGrammars()[language]["version"]
+
+    return f"{textHash.hexdigest()}-{language.replace('+', 'p')}-g{grammarVersion}-l{LEXER_VERSION}"
+
+
+"""
+Opens the cache file for a key. A cache file that isn't valid is deleted.
+
+PARAMETERS:
+    key - The key returned by makeKey().
+    stateCount - Number of states (other than 0) of the lexer of the file's language (See tokenizer.Lexer), so that states that the lexer doesn't have are caught.
+
+RETURNS:
+    A CachedHighlighting, or None if there is no (valid) cache file for the key.
+"""
+def load(key, stateCount):
+
+    try:
+        path = os.path.join(getCacheDir(), key)
+
+        with open(path, 'rb') as file:
+            cached = CachedHighlighting(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ), stateCount)
+
+    except ValueError: # Raised if the file isn't a valid cache file (including an empty one, which can't be mapped)
+        remove(key)
+        return None
+
+    except OSError: # Raised if the file doesn't exist
+        return None
+
+    try:
+        os.utime(path) # Mark the file as recently used
+    except OSError: # e.g File was removed by another instance of the editor since it was opened. The mmap can still be read, so the cache file is still used
+        pass
+
+    return cached
+
+
+"""
+Writes a cache file (Raises OSError if it can't be written), then deletes the least recently used cache files if the cache directory has grown past CACHE_SIZE_LIMIT.
+The file is written atomically (See atomicFile.writeAtomically()), so that a partially written cache file can never be read, and no temporary file is left behind if writing fails.
+
+PARAMETERS:
+    key - The key returned by makeKey().
+    states - List holding the state at the end of each line.
+    packedLines - List holding the tokens of each line, packed as by tokenStore.packTokens().
+"""
+def store(key, states, packedLines):
+
+    cacheDir = getCacheDir()
+
+    typeTable = json.dumps(tokenStore.tokenTypes).encode("utf-8")
+
+    offsets = array('I', [0])
+    for packed in packedLines:
+        offsets.append(offsets[-1] + len(packed))
+
+    def write(file):
+        file.write(HEADER.pack(MAGIC, FORMAT_VERSION, len(states), len(typeTable)))
+        file.write(typeTable)
+        file.write(array('i', states).tobytes())
+        file.write(offsets.tobytes())
+        file.writelines(packedLines)
+
+    writeAtomically(os.path.join(cacheDir, key), write)
+
+    trim(cacheDir)
+
+
+"""
+Deletes the cache file for a key, if there is one (e.g once it has been found not to be valid).
+
+PARAMETERS:
+    key - The key returned by makeKey().
+"""
+def remove(key):
+
+    try:
+        os.remove(os.path.join(getCacheDir(), key))
+    except OSError: # e.g File was already removed by another instance of the editor
+        pass
+
+
+"""
+Deletes the least recently used cache files until the total size of the cache directory is within CACHE_SIZE_LIMIT.
+
+PARAMETERS:
+    cacheDir - Path of the cache directory.
+"""
+def trim(cacheDir):
+
+    entries = [entry for entry in os.scandir(cacheDir) if entry.is_file()]
+    totalSize = sum(entry.stat().st_size for entry in entries)
+
+    entries.sort(key=lambda entry: entry.stat().st_mtime) # Least recently used first
+
+    for entry in entries:
+
+        if totalSize <= CACHE_SIZE_LIMIT:
+            break
+
+        try:
+            size = entry.stat().st_size
+            os.remove(entry.path)
+            totalSize -= size
+        except OSError: # e.g File was already removed by another instance of the editor
+            pass
+
+
+"""
+Represents the highlighting of a file read from a cache file.
+
+The header and the token type table are checked when the cache file is opened (Raises ValueError if they aren't valid, or if the file's length doesn't match them).
+The offsets, token type IDs and state of each line are only checked when the line is read (See line()), so that opening a cache file doesn't take longer the more lines it has.
+
+CONSTRUCTOR PARAMETERS:
+    buffer - The mmap of the cache file.
+    stateCount - Number of states (other than 0) of the lexer of the file's language.
+
+ATTRIBUTES:
+    buffer - The mmap of the cache file.
+    lineCount - Number of lines in the file.
+    stateCount - Number of states (other than 0) of the lexer of the file's language.
+    states - memoryview of the state at the end of each line.
+    offsets - memoryview of the offset of each line's tokens within the token data.
+    dataStart - Offset of the token data within the cache file.
+    dataLength - Length of the token data.
+    typeTranslation - bytes.translate() table that maps the token type IDs used in the cache file to the ones used in this process (See tokenStore.getTokenTypeId()).
+    invalidTypeIds - bytes holding every byte that isn't a token type ID in the cache file's token type table.
+"""
+class CachedHighlighting():
+
+
+    def __init__(self, buffer, stateCount):
+
+        self.buffer = buffer
+
+        if len(buffer) < HEADER.size:
+            raise ValueError("Not a BoothiumEdit highlight cache file")
+
+        magic, version, self.lineCount, typeTableLength = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError("Not a BoothiumEdit highlight cache file")
+
+        typeTableStart = HEADER.size
+        statesStart = typeTableStart + typeTableLength
+        offsetsStart = statesStart + 4 * self.lineCount
+        self.dataStart = offsetsStart + 4 * (self.lineCount + 1)
+
+        if len(buffer) < self.dataStart:
+            raise ValueError("Highlight cache file is truncated")
+
+        view = memoryview(buffer)
+        self.states = view[statesStart:offsetsStart].cast('i')
+        self.offsets = view[offsetsStart:self.dataStart].cast('I')
+
+        view.release() # The mmap can't be closed whilst any memoryview of it is unreleased
+
+        self.stateCount = stateCount
+        self.dataLength = len(buffer) - self.dataStart
+
+        try:
+            typeNames = json.loads(bytes(buffer[typeTableStart:statesStart]))
+        except ValueError:
+            typeNames = None
+
+        if not isinstance(typeNames, list) or len(typeNames) > 256 or not all(isinstance(typeName, str) for typeName in typeNames):
+            self.close()
+            raise ValueError("Highlight cache file has an invalid token type table")
+
+        if self.offsets[0] != 0 or self.offsets[-1] != self.dataLength:
+            self.close()
+            raise ValueError("Highlight cache file is truncated")
+
+        translation = bytearray(range(256))
+        for fileId, typeName in enumerate(typeNames):
+            translation[fileId] = tokenStore.getTokenTypeId(typeName)
+        self.typeTranslation = bytes(translation)
+        self.invalidTypeIds = bytes(range(len(typeNames), 256))
+
+
+    """
+    Returns a (packed, state) tuple for a line, where packed holds the line's tokens packed as by tokenStore.packTokens(), and state is the state at the end of the line.
+    Raises ValueError if the line's tokens or state aren't valid (i.e the cache file is corrupt).
+
+    PARAMETERS:
+        lineNumber - Number of the line, starting from 0.
+    """
+    def line(self, lineNumber):
+
+        if not 0 <= lineNumber < self.lineCount:
+            raise ValueError("Line is not in the highlight cache file")
+
+        start = self.offsets[lineNumber]
+        end = self.offsets[lineNumber + 1]
+        state = self.states[lineNumber]
+
+        if not start <= end <= self.dataLength or (end - start) % 9 != 0 or not 0 <= state <= self.stateCount:
+            raise ValueError("Highlight cache file is corrupt")
+
+        packed = self.buffer[self.dataStart + start:self.dataStart + end]
+
+        # The last byte of each token is its type ID. IDs that aren't in the token type table are deleted rather than translated, leaving fewer IDs than tokens
+        count = len(packed) // 9
+        typeIds = packed[8 * count:].translate(self.typeTranslation, self.invalidTypeIds)
+
+        if len(typeIds) != count:
+            raise ValueError("Highlight cache file has an invalid token type ID")
+
+        return packed[:8 * count] + typeIds, state
+
+
+    """
+    Closes the cache file.
+    """
+    def close(self):
+
+        self.states.release()
+        self.offsets.release()
+        self.buffer.close()
@@ -0,0 +1,98 @@
+from PyQt6.QtCore import QThread, QSemaphore, pyqtSignal
+
+from tokenizer import tokenize
+
+
+CHUNK_LINES = 500 # Number of lines tokenized before the results are sent back to the GUI thread
+
+MAX_PENDING_CHUNKS = 4 # Maximum number of chunks sent back to the GUI thread that it hasn't applied yet. Once this many are waiting, the thread waits for one to be applied before sending another
+
+POLL_TIME = 50 # Time (in milliseconds) the thread waits for a chunk to be applied before checking whether it has been cancelled
+
+
+"""
+Thread that tokenizes a snapshot of a document's text, so that very large documents can be tokenized without blocking the GUI thread.
+The results are sent back to the GUI thread in chunks of CHUNK_LINES lines through the chunkReady signal, where the highlighter only has to apply them.
+
+Each TokenizeThread is given the highlighter's generation number at the time the snapshot was taken, which is sent back with every chunk.
+If the document is edited, the highlighter increments its generation number and cancels the thread, so that any chunks that are still on their way (and now out of date) can be recognized and dropped.
+
+The GUI thread applies chunks in time slices, so it can fall behind the thread. To stop chunks (and the span tuples they hold) piling up in memory, the thread only runs MAX_PENDING_CHUNKS chunks ahead of the GUI thread,
+which tells the thread each time it has applied a chunk (See chunkApplied()).
+
+CONSTRUCTOR PARAMETERS:
+    lexer - The tokenizer.Lexer to tokenize the text with.
+    text - The text to tokenize (A snapshot of the document's text, starting at the beginning of a line).
+    firstLine - Number of the line that text begins with.
+    state - The state at the end of the line before firstLine (See tokenizer.Lexer).
+    generation - The highlighter's generation number at the time the snapshot was taken.
+
+ATTRIBUTES:
+    lexer - The tokenizer.Lexer to tokenize the text with.
+    text - The text to tokenize.
+    firstLine - Number of the line that text begins with.
+    state - The state at the end of the line before firstLine.
+    generation - The highlighter's generation number at the time the snapshot was taken.
+    cancelled - Flag that, when set from the GUI thread, makes the thread stop before tokenizing its next chunk.
+    pendingSlots - QSemaphore counting how many more chunks can be sent before the thread has to wait for the GUI thread to apply one.
+
+SIGNALS:
+    chunkReady(generation, firstLine, spansList, states) - Emitted when a chunk has been tokenized.
+        spansList and states are lists holding the spans and the end state of each line in the chunk, as returned by tokenizer.tokenize(), and firstLine is the number of the chunk's first line.
+"""
+class TokenizeThread(QThread):
+
+    chunkReady = pyqtSignal(int, int, list, list)
+
+
+    def __init__(self, lexer, text, firstLine, state, generation):
+
+        super().__init__()
+
+        self.lexer = lexer
+        self.text = text
+        self.firstLine = firstLine
+        self.state = state
+        self.generation = generation
+
+        self.cancelled = False
+        self.pendingSlots = QSemaphore(MAX_PENDING_CHUNKS)
+
+
+    """
+    Tells the thread that a chunk it sent has been applied, so that it can send another. To be called from the GUI thread.
+    """
+    def chunkApplied(self):
+        self.pendingSlots.release()
+
+
+    """
+    Reimplementation of QThread.run(). Tokenizes the text chunk by chunk, emitting chunkReady after each chunk.
+    """
+    def run(self):
+
+        lines = self.text.split("\n")
+        self.text = None # The snapshot is no longer needed once it has been split into lines
+
+        lexer = self.lexer
+        state = self.state
+
+        for chunkStart in range(0, len(lines), CHUNK_LINES):
+
+            if self.cancelled:
+                return
+
+            spansList = []
+            states = []
+
+            for line in lines[chunkStart:chunkStart + CHUNK_LINES]:
+                spans, state = tokenize(line, lexer, state)
+                spansList.append(spans)
+                states.append(state)
+
+            # Wait until the GUI thread has few enough chunks left to apply, checking every POLL_TIME whether the thread has been cancelled (as then no more chunks will be applied)
+            while not self.pendingSlots.tryAcquire(1, POLL_TIME):
+                if self.cancelled:
+                    return
+
+            self.chunkReady.emit(self.generation, self.firstLine + chunkStart, spansList, states)
@@ -1,10 +1,68 @@
 from PyQt6.QtWidgets import QPlainTextEdit
-from PyQt6.QtGui import QTextDocument, QTextCursor, QTextCharFormat, QColor
+from PyQt6.QtGui import QTextDocument, QTextCursor, QTextCharFormat, QTextLayout, QColor
+from PyQt6.QtCore import QTimer, QCoreApplication
 
-import re
 import json
 import os
 import sys
+import time
+from collections import deque
+
+from tokenizer import tokenize
+from languages import getLexer
+from highlightWorker import TokenizeThread
+from tokenStore import TokenStore, unpackTokens
+import highlightCache
+
+
+# Maps a type of lexical token to the hex color value that tokens of that type are to be highlighted.
+colorScheme = {
+	"comment": "#a69a5a",
+	"number": "#e69c3c",
+	"dbl_quote_string": "#609e7b",
+	"single_quote_string": "#609e7b",
+	"keyword": "#8751a6",
+	"operator": "#a34040",
+	"dbl_char_operator": "#a34040", 
+	"delimiter": "#ffffff",
+	"whitespace": "#ffffff",
+	"identifier": "#ffffff",
+	"function": "#5693a6", 
+	"preprocessor_directive": "#4d68b3",
+	"unknown": "#ffffff"
+}
+
+SLICE_TIME = 0.01 # Maximum time (in seconds) spent highlighting in the background before control is given back to the event loop, so that input is never blocked for longer than this.
+
+WORKER_THRESHOLD = 1000000 # Documents with more characters than this are tokenized in a separate thread (See highlightWorker.py) rather than in time slices.
+
+RESTART_DELAY = 500 # Time (in milliseconds) without edits after which a tokenizing thread cancelled by an edit is restarted.
+
+formatTables = {} # Caches the format table built for each color scheme by getFormatTable()
+
+
+"""
+Returns a format table for a color scheme, i.e a dictionary mapping each token type in the color scheme to a QTextCharFormat with the token type's color as its foreground.
+A format table is only built the first time it is needed, and is then shared by every Highlighter that uses the same color scheme.
+
+PARAMETERS:
+	colorScheme - Dictionary mapping a type of lexical token to a hex color value.
+"""
+def getFormatTable(colorScheme):
+
+	key = tuple(colorScheme.items())
+
+	if key not in formatTables:
+
+		table = {}
+		for tokenType, color in colorScheme.items():
+			fmt = QTextCharFormat()
+			fmt.setForeground(QColor(color))
+			table[tokenType] = fmt
+
+		formatTables[key] = table
+
+	return formatTables[key]
 
 
 """
@@ -16,7 +74,20 @@ CONSTRUCTOR PARAMETERS:
 ATTRIBUTES:
 	editor - The QPlainTextEdit representing the code editor textbox.
 	colorScheme - Dictionary mapping a type of lexical token to the hex color value that tokens of that type are to be highlighted.
-	rules - Dictionary mapping a token type to a regular expression that recognizes text of that token type.
+	formats - The format table for the color scheme (See getFormatTable()).
+	lexer - The tokenizer.Lexer for the editor's language, used to tokenize each line (See languages.py).
+	damageStart - Position in the document of the start of the text that has been edited since the last rehighlight (None if no text has been edited).
+	damageEnd - Position in the document of the end of the text that has been edited since the last rehighlight.
+	backgroundCursor - QTextCursor positioned at the start of the next line to be highlighted in the background (As a QTextCursor, its position is kept up to date as the document is edited).
+	backgroundTimer - Zero-interval QTimer that highlights the document in the background, 1 time slice per timeout.
+	worker - The highlightWorker.TokenizeThread tokenizing the document in the background, if the document is larger than WORKER_THRESHOLD (None if there is no such thread).
+	generation - Number that is incremented whenever the document is edited whilst a worker is tokenizing it, so that the worker's out of date results can be dropped.
+	restartTimer - Single-shot QTimer that restarts the worker once the user has stopped editing for RESTART_DELAY.
+	damageTimer - Zero-interval single-shot QTimer that rehighlights the damaged range once control returns to the event loop (See __onContentsChange()).
+	tokens - The TokenStore recording the tokens found on each line (Whitespace is not recorded).
+	chunks - Deque of (firstLine, spansList, states) tuples holding chunks of results sent by the worker that have yet to be applied (See highlightWorker.TokenizeThread), which holds at most highlightWorker.MAX_PENDING_CHUNKS chunks.
+	cacheKey - Key under which the highlighting of the document is cached on disk (See highlightCache.py). None if the highlight cache is disabled, or once the document has been edited.
+	cached - The highlightCache.CachedHighlighting that lines are highlighted from instead of being tokenized, if the document's highlighting was found in the cache (Otherwise None).
 """
 class Highlighter():
 
@@ -25,232 +96,518 @@ class Highlighter():
 
 		self.editor = editor
 
-		self.colorScheme = {			
-			"comment": "#a69a5a",
-			"number": "#e69c3c",
-			"dbl_quote_string": "#609e7b",
-			"single_quote_string": "#609e7b",
-			"keyword": "#8751a6",
-			"operator": "#a34040",
-			"dbl_char_operator": "#a34040", 
-			"delimiter": "#ffffff",
-			"whitespace": "#ffffff",
-			"identifier": "#ffffff",
-			"function": "#5693a6", 
-			"preprocessor_directive": "#4d68b3",
-			"unknown": "#ffffff"
-		}
-
-		# Maps a supported language to an array of it's reserved keywords.
-		languagesKeywords = {
-
-			"python": ["False", "await",	"else", "import", "pass",
-							"None", "break", "except", "in", "raise",
-							"True", "class", "finally", "is", "return",
-							"and", "continue", "for", "lambda",
-							"as", "def", "from", "nonlocal", "try",
-							"assert", "del", "global", "not", "while",
-							"async", "elif", "if"	, "or", "with",
-							"yield"],
-
-			"c": ["auto", "break", "case", "char",
-							"const", "continue", "default",	"do",
-							"double", "else", "enum", "extern",
-							"float", "for",	"goto",	"if",
-							"int", "long", "register",	"return",
-							"short", "signed",	"sizeof", "static",
-							"struct", "switch",	"typedef", "union",
-							"unsigned", "void", "volatile", "while"],
-
-			"c++": ["asm", "double", "new", "switch",
-							"auto", "else", "operator", "template",
-							"break", "enum", "private", "this",
-							"case", "extern", "protected", "throw",
-							"catch", "float", "public", "try",
-							"char", "for", "register", "typedef",
-							"class", "friend", "return", "union",
-							"const", "goto", "short", "unsigned",
-							"continue", "if", "signed", "virtual",
-							"default", "inline", "sizeof", "void",
-							"delete", "int", "static", "volatile ",
-							"do", "long", "struct", "while"],
-
-			"javascript": ["abstract", "arguments", "await", "boolean",
-							"break", "byte", "case", "catch",
-							"char", "class", "const", "continue",
-							"debugger", "default", "delete", "do",
-							"double", "else", "enum", "eval",
-							"export", "extends", "false", "final",
-							"finally", "float", "for", "function",
-							"goto", "if", "implements", "import",
-							"in", "instanceof", "int", "interface",
-							"let", "long", "native", "new",
-							"null", "package", "private", "protected",
-							"public", "return", "short", "static",
-							"super", "switch", "synchronized",
-							"throw", "throws", "transient", "true",
-							"try", "typeof", "var", "void",
-							"volatile", "while", "with", "yield"],
-
-			"java": ["abstract", "continue", "for", "new", "switch",
-							"assert", "default", "goto", "package", "synchronized",
-							"boolean", "do", "if", "private",
-							"break", "double", "implements", "protected", "throw",
-							"byte", "else", "import", "public",	"throws",
-							"case", "enum", "instanceof", "return",	"transient",
-							"catch", "extends", "int", "short",	"try",
-							"char", "final", "interface", "static",	"void",
-							"class", "finally", "long",	"strictfp",	"volatile",
-							"const", "float", "native", "super", "while"],
-
-			"go": ["const", "chan", "break", 
-							"defer", "var", "interface", 
-							"case", "go", "func", "map", 
-							"continue", "type", "struct", "default", 
-							"import", "else", "package", 
-							"fallthrough", "for", "goto", "if", 
-							"range", "return", "select", "switch"]
-		}
-
-		# Accounts for comments in python being denoted by '#' rather than '//'.
-		if self.editor.language == "python":
-			commentRegex = "^(#.*)"
-		else:
-			commentRegex = "^(//.*)"
+		self.damageStart = None
+		self.damageEnd = None
+
+		# Rehighlight whenever the document's text changes, whether this is from typing, pasting, undo/redo, find & replace or any other edit.
+		self.editor.document().contentsChange.connect(self.__onContentsChange)
+
+		self.backgroundCursor = QTextCursor(self.editor.document())
+
+		self.tokens = TokenStore(self.editor.document())
 
-	    # Generate regular expression for keywords.
-	    # The resulting regex should look something like this: "^(KEYWORD|KEYWORD|KEYWORD|KEYWORD)$", where "KEYWORD" is replaced with an actual keyword.
-		keywordRegex = "^(" # Opening part of expression
-		keywords = languagesKeywords[self.editor.language]
-		for i in range(len(keywords)):
+		self.backgroundTimer = QTimer(self.editor)
+		self.backgroundTimer.setInterval(0) # A zero-interval timer times out whenever the event loop has no other events to process
+		self.backgroundTimer.timeout.connect(self.__highlightSlice)
 
-			if i == len(keywords) - 1: # The "or" regex character (i.e "|") should not follow the last keyword in the regex string.
-				keywordRegex = keywordRegex + keywords[i] # Append keyword to regex string.
-			else:
-				keywordRegex = keywordRegex + keywords[i] + "|"
+		self.worker = None
+		self.generation = 0
+		self.chunks = deque()
 
-		keywordRegex = keywordRegex + ")(?=(\s|:))" # Append closing part of expression
+		self.restartTimer = QTimer(self.editor)
+		self.restartTimer.setSingleShot(True)
+		self.restartTimer.setInterval(RESTART_DELAY)
+		self.restartTimer.timeout.connect(self.__startWorker)
 
-		# Maps a type of token to a regular expression that recognizes text of that token type.
-		# For purposes of readability, a version of the regex string that does not include escape backslashes ('\') is commented next to the string.
-		#
-		# Note that the ordering of each rule within the dictionary is important, as for a lot of token types there is an overlap between 2 types(e.g all keywords are identifiers, and a function is an identifier followed by a delimiter).
-		# As the dictionary is iterated over rom start to finish when looking for matches, it is important for more particular token types (e.g function, keyword) to precede more general ones (e.g identifier) that might also capture the tokens that are of the more specific types. 
-		self.rules = {
+		self.damageTimer = QTimer(self.editor)
+		self.damageTimer.setSingleShot(True)
+		self.damageTimer.setInterval(0) # Times out once control returns to the event loop
+		self.damageTimer.timeout.connect(self.__rehighlightDamage)
 
-            "whitespace": r'^\s',
+		QCoreApplication.instance().aboutToQuit.connect(self.stop) # A QThread must not be destroyed whilst it is still running
 
-            "comment": commentRegex,
+		# Lines scrolled into view are highlighted straight away, rather than when the background highlighting gets to them.
+		self.editor.verticalScrollBar().valueChanged.connect(self.highlightVisible)
 
-            "delimiter": r"^[\(\)\[\]\{\}@,:`;.]", # W/O escape backslashes: ^[()[]{}@,:`;.]
+		self.colorScheme = colorScheme
+		self.formats = getFormatTable(colorScheme)
 
-            "dbl_char_operator": r"^((==)|(!=)|(\<=)|(\>=)|(<>)|(\<\<)|(\>\>)|(//)|(\*\*)|(\+=)|(\-=)|(\*=)|(%=)|(/=)|(\|=)|(^=))",  # W/O escape backslashes: ^((==)|(!=)|(<=)|(>=)|(<>)|(<<)|(>>)|(//)|(**)|(+=)|(-=)|(*=)|(%=)|(/=)|(|=)|(^=))
-            "operator": r"^[\+\-\*/%\|^&~<>!=\?]", # W/O escape backslashes: ^[+-*/%|^&~<>!=?]
+		self.lexer = getLexer(self.editor.language)
 
-            "keyword": keywordRegex,
-            "function": r"^[_A-Za-z][_A-Za-z0-9]*(?=\()", # W/O escape backslashes: ^[_A-Za-z][_A-Za-z0-9]*(?=(
-            "identifier": "^[_A-Za-z][_A-Za-z0-9]*", 
+		self.cacheKey = None
+		self.cached = None
 
-            "dbl_quote_string": r"^(\"[^\"\n]*\")", # W/O escape backslashes: ^("[^"\n]*")
-			"single_quote_string": r"^('[^'\n]*')", 
 
-            "number": r"^\d+",
-            
-	    }
+	"""
+	Applies necessary highlighting to a single line, starting from the state at the end of the previous line (See tokenizer.Lexer).
+	The state at the end of the line is saved in the line's QTextBlock (via QTextBlock.setUserState()), so that the following line can be highlighted without re-highlighting this one.
+	A user state of -1 (Qt's default) means the line has not been highlighted yet.
+	If the document's highlighting was found in the cache, the line's tokens and end state are read from the cache instead of tokenizing it.
+	If the cache file turns out to be corrupt, it is deleted, and this line (and the rest of the document) is tokenized instead.
+
+	PARAMETERS:
+		block - The QTextBlock representing the line to highlight.
+
+	RETURNS:
+		True if the state at the end of the line has changed, meaning that the following line also needs to be highlighted again. Otherwise False.
+	"""
+	def highlightBlock(self, block):
+
+		packed = None
 
-	    # Add C/C++ preprocessor directives
-		if self.editor.language == "c" or self.editor.language == "c++":
-			self.rules["preprocessor_directive"] = r"^#(include|define|undef|if|ifdef|ifndef|error)(?=\s)" 
+		if self.cached is not None:
+			try:
+				packed, state = self.cached.line(block.blockNumber())
+			except ValueError: # The cache file is corrupt
+				cacheKey = self.cacheKey
+				self.__closeCache()
+				highlightCache.remove(cacheKey)
 
-		# Finally, add unknown character regex at end of dictionary (Must be added at the end, as the regex string for it captures all characters).
-		self.rules["unknown"] = r"^."
+		if packed is not None:
+			self.__applySpans(block, unpackTokens(packed), packed)
+
+		else:
+			prevState = block.previous().userState() # Equals -1 if there is no previous line
+			if prevState < 0:
+				prevState = 0
+
+			spans, state = tokenize(block.text(), self.lexer, prevState)
+			self.__applySpans(block, spans)
+
+		if state == block.userState():
+			return False
+
+		block.setUserState(state)
+		return True
 
 
 	"""
-	Applies necessary highlighting to the line on which the user's cursor is located.
-	This is to be executed in the editor class on every key press.
+	Applies necessary highlighting to the lines from first to last (inclusive). 
+	Highlighting then carries on past the last line for as long as the state at the end of each line changes (e.g when a block comment is opened or closed), and stops at the first line whose end state is unchanged.
+	It also stops at the first line that has not been highlighted yet, as the background highlighting will get to that line.
+	If highlighting takes longer than SLICE_TIME (e.g after a Replace All across a large document), the remaining lines are handed over to the background highlighting.
+
+	PARAMETERS:
+		first - The QTextBlock representing the first line to highlight.
+		last - The QTextBlock representing the last line that must be highlighted.
+
+	RETURNS:
+		True if the remaining lines were handed over to the background highlighting, otherwise False.
 	"""
-	def highlightLine(self):
+	def rehighlightBlocks(self, first, last):
 
-		script = self.editor.toPlainText()
+		lastNumber = last.blockNumber()
+		deadline = time.perf_counter() + SLICE_TIME
 
-		# Getting whole line on which User's cursor is located
-		line = ""
+		block = first
+		while block.isValid():
 
-		char = self.editor.textCursor().position() - 1 # 1 is substracted from the position to get the index of the character preceding the cursor
-		charsBeforeLine = 0 # Number of characters in the file before the first character of the line.
-		# Iterate backwards until newline character (Loop also terminates if beginning of file is reached).
-		while char >= 0:
-			if script[char] == "\n":
-				charsBeforeLine = char + 1
-				break
-			line = line + script[char] # Append character to line
-			char -= 1
+			stateChanged = self.highlightBlock(block)
 
-		line = line[::-1] # As we iterated backwards, the line string is back-to-front. This inverts it so that so the characters are in the correct order.
+			block = block.next()
 
-		char = self.editor.textCursor().position() # This gives the index of the character occuring just after the cursor.
-		# Iterate forwards until newline character (Loop also terminates if end of file is reached).
-		while char < len(script):
-			if script[char] == "\n":
+			if block.blockNumber() > lastNumber and (not stateChanged or block.userState() == -1):
 				break
-			line = line + script[char]  # Append character to line
-			char += 1
 
-		cursor = QTextCursor(self.editor.document())
+			if block.isValid() and time.perf_counter() > deadline:
+				self.__resumeBackground(block)
+				return True
+
+		return False
 
-		i = 0
-		while i < len(line):
 
-			for tokenType in self.rules:
+	"""
+	Called by the document's contentsChange signal whenever text in it is inserted or removed.
+	Adds the edited text to the damaged range of the document, and schedules the damaged lines to be rehighlighted once control returns to the event loop.
+	This means a burst of edits within 1 turn of the event loop (e.g a Replace All) is coalesced into a single rehighlight.
+
+	PARAMETERS:
+		position - Position in the document at which the change occured.
+		removed - Number of characters removed.
+		added - Number of characters added.
+	"""
+	def __onContentsChange(self, position, removed, added):
+
+		# Whilst the file is being loaded, the whole file is yet to be highlighted by start(), so there is nothing to rehighlight
+		if self.editor.loading:
+			return
 
-				match = re.match(self.rules[tokenType], line[i:]) # Only the text following the current iteration position is searched, so that we disregard already examined text.
+		# Neither the cached highlighting nor the highlighting of the original text apply once the document has been edited
+		if self.cacheKey is not None:
+			self.__closeCache()
 
-				if match:
-					matchLength = match.span()[1] - match.span()[0]
+		# The worker's results are out of date once the document has been edited, so cancel it and restart it once the user stops editing.
+		if self.worker is not None:
+			self.generation += 1
+			self.worker.cancelled = True
+			self.chunks.clear()
+			self.restartTimer.start()
 
-					fmt = QTextCharFormat()
-					color = self.colorScheme[tokenType]
-					fmt.setForeground(QColor(color))
+		if self.damageStart is None: # First edit since the last rehighlight
+			self.damageStart = position
+			self.damageEnd = position + added
+			self.damageTimer.start()
+			return
 
-					cursor.setPosition(charsBeforeLine + i, QTextCursor.MoveMode.MoveAnchor) # Navigate cursor to match.
-					cursor.setPosition(charsBeforeLine + i + matchLength, QTextCursor.MoveMode.KeepAnchor) # Select whole match by moving position to end of match but maintaining anchor at beginning.
+		# Positions after the edited text are shifted by the edit, so the end of the damaged range must be shifted too.
+		if self.damageEnd >= position + removed:
+			self.damageEnd += added - removed
+		elif self.damageEnd > position: # End of damaged range was within the removed text
+			self.damageEnd = position + added
 
-					cursor.setCharFormat(fmt)
+		self.damageStart = min(self.damageStart, position)
+		self.damageEnd = max(self.damageEnd, position + added)
 
-					i += matchLength
-					
-					break
 
-					
 	"""
-	Applies necessary highlighting to the entire file.
+	Rehighlights the lines within the damaged range of the document (See __onContentsChange()), then clears the damaged range.
+	If the damaged range is too large to be rehighlighted within SLICE_TIME, the lines in view are also highlighted straight away, rather than when the background highlighting reaches them.
+	"""
+	def __rehighlightDamage(self):
+
+		if self.damageStart is None:
+			return
+
+		document = self.editor.document()
+		lastPos = document.characterCount() - 1 # Position of the end of the document
+
+		first = document.findBlock(min(self.damageStart, lastPos))
+		last = document.findBlock(min(self.damageEnd, lastPos))
+
+		self.damageStart = None
+		self.damageEnd = None
+
+		if self.rehighlightBlocks(first, last):
+			self.__highlightPages(onlyUnhighlighted=False)
+
+
+	"""
+	Starts highlighting the entire file. 
+	The lines in view are highlighted straight away, and the rest of the file is highlighted in the background, so that the editor can be shown and used whilst a large file is still being highlighted.
+	The background highlighting is done in time slices of at most SLICE_TIME, or for files larger than WORKER_THRESHOLD, is tokenized in a separate thread.
+	If the highlight cache is enabled and the document's highlighting is found in it, the document is highlighted from the cache without being tokenized.
+	Otherwise, the highlighting is written to the cache once the whole document has been highlighted (unless it has been edited by then).
 	This is to be executed on the program's startup.
 	"""
-	def highlightAll(self):
+	def start(self):
+
+		if self.editor.settings["highlightCache"]:
+
+			self.cacheKey = highlightCache.makeKey(self.editor.toPlainText(), self.editor.language)
+			self.cached = highlightCache.load(self.cacheKey, len(self.lexer.states))
+
+			if self.cached is not None and self.cached.lineCount != self.editor.document().blockCount(): # Should only happen in the unlikely event of a hash collision
+				self.__closeCache()
+
+		self.__highlightPages(onlyUnhighlighted=False)
+
+		self.backgroundCursor.setPosition(0)
+		self.__startBackground()
+
+
+	"""
+	Stops all background highlighting, and cancels any rehighlight of edited lines that is waiting for control to return to the event loop.
+	"""
+	def stop(self):
+
+		self.backgroundTimer.stop()
+		self.restartTimer.stop()
+		self.damageTimer.stop()
+		self.__stopWorker()
+
+		self.damageStart = None
+		self.damageEnd = None
+
+
+	"""
+	Stops highlighting for good, disconnecting the highlighter from the editor and its document (e.g when the editor is closed).
+	The highlighting already applied is left in the document.
+	"""
+	def close(self):
+
+		self.stop()
+		self.__closeCache()
 
-		script = self.editor.toPlainText()
-		cursor = QTextCursor(self.editor.document())
-		
-		i = 0
-		while i < len(script):
+		self.editor.document().contentsChange.disconnect(self.__onContentsChange)
+		self.tokens.detach()
+		QCoreApplication.instance().aboutToQuit.disconnect(self.stop)
+		self.editor.verticalScrollBar().valueChanged.disconnect(self.highlightVisible)
 
-			for tokenType in self.rules:
+		self.backgroundTimer.deleteLater()
+		self.restartTimer.deleteLater()
+		self.damageTimer.deleteLater()
 
-				match = re.match(self.rules[tokenType], script[i:]) # Only the text following the current iteration position is searched, so that we disregard already examined text.
 
-				if match:
-					matchLength = match.span()[1] - match.span()[0]
+	"""
+	Stops highlighting for good and removes the highlighting from the document, so that the editor can carry on without a highlighter (e.g when syntax highlighting is turned off in the settings).
+	"""
+	def detach(self):
+
+		self.close()
+
+		document = self.editor.document()
+
+		block = document.firstBlock()
+		while block.isValid():
+			block.layout().clearFormats()
+			block.setUserState(-1)
+			block = block.next()
+
+		document.markContentsDirty(0, document.characterCount()) # Have the document redrawn without its formats
+
+
+	"""
+	Highlights the lines in view, as well as a page of lines after them (so that they are already highlighted if the user scrolls down), skipping lines that are already highlighted.
+	This is executed when the editor is scrolled or resized.
+	"""
+	def highlightVisible(self):
+		self.__highlightPages(onlyUnhighlighted=True)
+
+
+	"""
+	Highlights the lines in view and a page of lines after them.
+	The lines before them may not have been highlighted yet, in which case they are highlighted as if no multi-line construct was open before them. 
+	This is corrected when the background highlighting reaches them.
+
+	PARAMETERS:
+		onlyUnhighlighted - Whether to skip lines that are already highlighted.
+	"""
+	def __highlightPages(self, onlyUnhighlighted):
+
+		linesPerPage = self.editor.viewport().height() // self.editor.fontMetrics().height() + 1 # As lines aren't wrapped, each line (i.e QTextBlock) takes up exactly 1 line of the viewport. 
+
+		block = self.editor.firstVisibleBlock()
+		for i in range(2 * linesPerPage):
+
+			if not block.isValid():
+				break
+
+			if not onlyUnhighlighted or block.userState() == -1:
+				self.highlightBlock(block)
 
-					fmt = QTextCharFormat()
-					color = self.colorScheme[str(tokenType)]
-					fmt.setForeground(QColor(color))
+			block = block.next()
 
-					cursor.setPosition(i, QTextCursor.MoveMode.MoveAnchor) # Navigate cursor to match.
-					cursor.setPosition(i + matchLength, QTextCursor.MoveMode.KeepAnchor) # Select whole match by moving position to end of match but maintaining anchor at beginning.
 
-					cursor.setCharFormat(fmt)
+	"""
+	Called by backgroundTimer. Highlights lines starting from the position of backgroundCursor, until SLICE_TIME has passed or the end of the document is reached.
+	If a worker is tokenizing the document, the worker's results are applied instead.
+	"""
+	def __highlightSlice(self):
+
+		deadline = time.perf_counter() + SLICE_TIME
+
+		if self.worker is not None:
+			self.__applyChunks(deadline)
+			return
+
+		block = self.backgroundCursor.block()
+		while block.isValid() and time.perf_counter() < deadline:
+			self.highlightBlock(block)
+			block = block.next()
+
+		if block.isValid():
+			self.backgroundCursor.setPosition(block.position())
+		else: # Whole document has been highlighted
+			self.backgroundTimer.stop()
+			self.__finishCache()
+
+
+	"""
+	Starts the background highlighting from the position of backgroundCursor: in a worker thread if the document is larger than WORKER_THRESHOLD, and otherwise in time slices.
+	Highlighting from the cache is always done in time slices, as there is no tokenizing to move off the GUI thread.
+	"""
+	def __startBackground(self):
+
+		if self.cached is None and self.editor.document().characterCount() > WORKER_THRESHOLD:
+			self.__startWorker()
+		else:
+			self.backgroundTimer.start()
+
+
+	"""
+	Has the background highlighting (re)highlight the document from a given line onwards.
+
+	PARAMETERS:
+		block - The QTextBlock representing the line to carry on from.
+	"""
+	def __resumeBackground(self, block):
+
+		if block.position() >= self.backgroundCursor.position() and (self.backgroundTimer.isActive() or self.worker is not None or self.restartTimer.isActive()):
+			return # Background highlighting will get to the line anyway
+
+		self.backgroundCursor.setPosition(block.position())
+
+		if self.worker is not None or self.restartTimer.isActive(): # Worker has been cancelled by an edit, and will restart from backgroundCursor once the user stops editing
+			self.restartTimer.start()
+		else:
+			self.__startBackground()
+
+
+	"""
+	Starts a worker thread that tokenizes the document from the position of backgroundCursor to the end of the document (See highlightWorker.TokenizeThread).
+	Any worker that is already running is stopped first.
+	"""
+	def __startWorker(self):
+
+		self.__stopWorker()
+
+		block = self.backgroundCursor.block()
+
+		prevState = block.previous().userState() # Equals -1 if there is no previous line
+		if prevState < 0:
+			prevState = 0
+
+		text = self.editor.toPlainText()[block.position():] # Snapshot of the text the worker is to tokenize
+
+		self.worker = TokenizeThread(self.lexer, text, block.blockNumber(), prevState, self.generation)
+		self.worker.chunkReady.connect(self.__onChunkReady)
+		self.worker.start()
+
+
+	"""
+	Cancels the worker thread (if there is one) and waits for it to finish.
+	"""
+	def __stopWorker(self):
+
+		if self.worker is None:
+			return
+
+		self.worker.cancelled = True
+		self.worker.wait() # The worker checks whether it's been cancelled after every chunk, so this won't take long
+		self.worker = None
+		self.chunks.clear()
+
+
+	"""
+	Called by the worker's chunkReady signal. Queues the worker's results for a chunk of lines to be applied by backgroundTimer, unless the document has been edited since the worker took its snapshot.
+	The results are applied in time slices, rather than straight away, so that input isn't blocked if the worker gets ahead of the GUI thread.
+
+	PARAMETERS:
+		generation - The generation number that the worker was started with.
+		firstLine - Number of the first line in the chunk.
+		spansList - List holding the spans of each line in the chunk.
+		states - List holding the end state of each line in the chunk.
+	"""
+	def __onChunkReady(self, generation, firstLine, spansList, states):
+
+		if generation != self.generation: # Chunk is out of date
+			return
+
+		self.chunks.append((firstLine, spansList, states))
+		self.backgroundTimer.start()
+
+
+	"""
+	Applies the worker's queued results until a deadline has passed, or there are no more results to apply.
+
+	PARAMETERS:
+		deadline - Value of time.perf_counter() at which to stop.
+	"""
+	def __applyChunks(self, deadline):
+
+		document = self.editor.document()
+
+		while self.chunks:
+
+			firstLine, spansList, states = self.chunks.popleft()
+			block = document.findBlockByNumber(firstLine)
+
+			for i in range(len(spansList)):
+
+				if time.perf_counter() > deadline: # Put the rest of the chunk back, to be applied in the next time slice
+					self.chunks.appendleft((firstLine + i, spansList[i:], states[i:]))
+					self.backgroundCursor.setPosition(block.position())
+					return
+
+				self.__applySpans(block, spansList[i])
+				block.setUserState(states[i])
+				block = block.next()
+
+			self.worker.chunkApplied() # So that the worker can send its next chunk
+
+			if not block.isValid(): # Whole document has been highlighted
+				self.backgroundCursor.movePosition(QTextCursor.MoveOperation.End)
+				self.backgroundTimer.stop()
+				self.__stopWorker()
+				self.__finishCache()
+				return
+
+			self.backgroundCursor.setPosition(block.position())
+
+		self.backgroundTimer.stop() # Wait for the worker's next chunk
+
+
+	"""
+	Colors each token on a line according to the color scheme, and records the tokens in the token store.
+	The formats are set as the additional formats of the line's QTextLayout rather than as character formats of the document's text, 
+	so that highlighting does not edit the document (which would add entries to the undo stack, and mark the document as modified).
+
+	PARAMETERS:
+		block - The QTextBlock representing the line.
+		spans - List of (start, length, tokenType) tuples for the tokens on the line, as returned by tokenizer.tokenize().
+		packed - The spans already packed for the token store, if they are read from the highlight cache (Optional; if omitted, the spans are packed here).
+	"""
+	def __applySpans(self, block, spans, packed=None):
+
+		formats = self.formats
+		ranges = []
+		visibleSpans = []
+
+		for span in spans:
+
+			start, length, tokenType = span
+
+			if tokenType == "whitespace": # Whitespace is invisible, so there is no need to color it.
+				continue
+
+			formatRange = QTextLayout.FormatRange()
+			formatRange.start = start
+			formatRange.length = length
+			formatRange.format = formats[tokenType]
+			ranges.append(formatRange)
+			visibleSpans.append(span)
+
+		if packed is None:
+			self.tokens.setTokens(block, visibleSpans)
+		else: # The cache only holds visible spans
+			self.tokens.setPackedTokens(block, packed)
+
+		block.layout().setFormats(ranges)
+		self.editor.document().markContentsDirty(block.position(), block.length()) # Have the line redrawn with its new formats
+
+
+	"""
+	Called once the whole document has been highlighted in the background.
+	If the document's highlighting was read from the cache, the cache file is closed. Otherwise, the highlighting is written to the cache, unless the document has been edited or the cache is disabled.
+	"""
+	def __finishCache(self):
+
+		if self.cacheKey is None:
+			return
+
+		if self.cached is None:
+
+			states = []
+			block = self.editor.document().firstBlock()
+			while block.isValid():
+				states.append(block.userState())
+				block = block.next()
+
+			try:
+				highlightCache.store(self.cacheKey, states, self.tokens.lines)
+			except OSError: # e.g Cache directory isn't writable. The cache is only an optimization, so this isn't worth reporting.
+				pass
+
+		self.__closeCache()
+
+
+	"""
+	Stops using the cache, closing the cache file if the document's highlighting was read from it.
+	"""
+	def __closeCache(self):
+
+		if self.cached is not None:
+			self.cached.close()
+			self.cached = None
 
-					i += matchLength
-					
-					break
\ No newline at end of file
+		self.cacheKey = None
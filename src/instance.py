@@ -0,0 +1,108 @@
+from PyQt6.QtNetwork import QLocalServer, QLocalSocket
+from PyQt6.QtCore import QObject, pyqtSignal
+
+import getpass
+
+
+SERVER_NAME = "BoothiumEdit-" + getpass.getuser() # Each user has their own instance
+
+CONNECT_TIMEOUT = 500 # Time (in milliseconds) waited for the running instance to accept a connection (or to read the paths sent to it)
+
+
+"""
+Hands files over to the BoothiumEdit instance that is already running, if there is one, so that they are opened as tabs in its window rather than starting another instance.
+The paths are sent over a local socket (a Unix domain socket, or a named pipe on Windows), separated by null characters (which can't appear in a path).
+
+PARAMETERS:
+    paths - List of the absolute paths of the files to open.
+
+RETURNS:
+    True if the files were handed over, or False if there is no running instance.
+"""
+def handOff(paths):
+
+    socket = QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+
+    socket.write("\0".join(paths).encode("utf-8", "surrogateescape"))
+    socket.waitForBytesWritten(CONNECT_TIMEOUT)
+    socket.disconnectFromServer()
+
+    if socket.state() != QLocalSocket.LocalSocketState.UnconnectedState:
+        socket.waitForDisconnected(CONNECT_TIMEOUT)
+
+    return True
+
+
+"""
+Listens for later invocations of BoothiumEdit handing files over to this instance (See handOff()).
+
+If the server name is still taken by an instance that crashed (which leaves its socket file behind on Unix), the old server is removed, unless it turns out to be running after all.
+
+ATTRIBUTES:
+    server - The QLocalServer listening for connections.
+    buffers - Dictionary mapping each connected QLocalSocket to a bytearray of the data received from it so far.
+
+SIGNALS:
+    filesReceived(paths) - Emitted with the list of paths sent by another invocation, once it has disconnected.
+"""
+class InstanceServer(QObject):
+
+    filesReceived = pyqtSignal(list)
+
+
+    def __init__(self):
+
+        super().__init__()
+
+        self.buffers = {}
+
+        self.server = QLocalServer(self)
+        self.server.setSocketOptions(QLocalServer.SocketOption.UserAccessOption) # Other users mustn't be able to open files in this user's editor
+        self.server.newConnection.connect(self.__onNewConnection)
+
+        if not self.server.listen(SERVER_NAME):
+
+            socket = QLocalSocket()
+            socket.connectToServer(SERVER_NAME)
+
+            if socket.waitForConnected(CONNECT_TIMEOUT): # Another instance started at the same time, and is already listening
+                socket.disconnectFromServer()
+            else:
+                QLocalServer.removeServer(SERVER_NAME)
+                self.server.listen(SERVER_NAME)
+
+
+    """
+    Called when another invocation connects. Starts collecting the data it sends.
+    """
+    def __onNewConnection(self):
+
+        while self.server.hasPendingConnections():
+
+            socket = self.server.nextPendingConnection()
+            self.buffers[socket] = bytearray()
+
+            socket.readyRead.connect(lambda socket=socket: self.buffers[socket].extend(socket.readAll().data()))
+            socket.disconnected.connect(lambda socket=socket: self.__onDisconnected(socket))
+
+
+    """
+    Called when another invocation has sent its paths and disconnected. Emits filesReceived with the paths.
+
+    PARAMETERS:
+        socket - The QLocalSocket that was connected to the other invocation.
+    """
+    def __onDisconnected(self, socket):
+
+        data = self.buffers.pop(socket)
+        data.extend(socket.readAll().data())
+        socket.deleteLater()
+
+        paths = [path for path in data.decode("utf-8", "surrogateescape").split("\0") if path != ""]
+
+        if paths:
+            self.filesReceived.emit(paths)
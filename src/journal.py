@@ -0,0 +1,298 @@
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import QObject, QStandardPaths, QTimer
+
+import hashlib
+import os
+import struct
+
+from journalWorker import JournalThread
+from saveWorker import TEXT_HASH_SIZE
+
+
+"""
+Edit journal, which records every edit made to a document so that unsaved changes can be recovered if the editor crashes (or the computer does).
+
+Rather than saving copies of the whole document, which would be too slow for large files, each edit is recorded as it is made, as a record of where it was made, how much text was removed and the text inserted.
+The journal is based on the text of the file as it was last loaded or saved, so replaying its records on that text gives the document's text.
+
+Journal files are named after a hash of the path of the file they belong to, and are in a compact binary format:
+    - Header: The magic bytes "BEJL", followed by the format version (unsigned 32-bit integer), the hash of the text the journal is based on (See saveWorker.hashText()),
+      and the length of the file's path, in bytes (unsigned 32-bit integer), followed by the path itself (UTF-8).
+    - Records: The kind of the record (EDIT or SNAPSHOT, as an unsigned byte), the position of the edit and the number of characters removed (unsigned 32-bit integers),
+      and the length of the inserted text in bytes (unsigned 32-bit integer), followed by the inserted text itself (UTF-8). A SNAPSHOT record replaces the whole text with the inserted text.
+
+A record that was only partly written (e.g because the editor crashed whilst writing it) marks the end of the journal.
+"""
+
+MAGIC = b"BEJL"
+FORMAT_VERSION = 1
+HEADER = struct.Struct(f"<4sI{TEXT_HASH_SIZE}sI")
+RECORD = struct.Struct("<BIII")
+
+EDIT = 0 # Kinds of record
+SNAPSHOT = 1
+
+FLUSH_INTERVAL = 1000 # Time (in milliseconds) between handing the records of the latest edits to the JournalThread
+
+COMPACT_SIZE = 1024 * 1024 # The journal is compacted into a snapshot once it is larger than this (in bytes) and larger than the document, so the time spent writing snapshots is never more than the time spent writing records
+
+
+"""
+Returns the path of the journal directory, creating it if it doesn't exist yet.
+"""
+def getJournalDir():
+
+    journalDir = os.path.join(QStandardPaths.writableLocation(QStandardPaths.StandardLocation.GenericDataLocation), "BoothiumEdit", "journals")
+    os.makedirs(journalDir, exist_ok=True)
+
+    return journalDir
+
+
+"""
+Returns the path of the journal of a file.
+
+PARAMETERS:
+    filePath - Path of the file.
+"""
+def getJournalPath(filePath):
+
+    pathHash = hashlib.blake2b(os.path.realpath(filePath).encode("utf-8", "surrogateescape"), digest_size=16)
+
+    return os.path.join(getJournalDir(), pathHash.hexdigest() + ".bejl")
+
+
+"""
+Reads the journal of a file.
+
+PARAMETERS:
+    filePath - Path of the file.
+
+RETURNS:
+    A tuple of the hash of the text the journal is based on, and a list of its records, as (kind, position, removed, text) tuples.
+    None if the file has no (valid) journal.
+"""
+def load(filePath):
+
+    try:
+        with open(getJournalPath(filePath), 'rb') as file:
+            data = file.read()
+    except OSError:
+        return None
+
+    if len(data) < HEADER.size:
+        return None
+
+    magic, version, baseHash, pathLength = HEADER.unpack_from(data)
+
+    if magic != MAGIC or version != FORMAT_VERSION:
+        return None
+
+    records = []
+    offset = HEADER.size + pathLength
+
+    while offset + RECORD.size <= len(data):
+
+        kind, position, removed, length = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+
+        if offset + length > len(data): # Partly written
+            break
+
+        records.append((kind, position, removed, data[offset:offset + length].decode("utf-8", "surrogatepass")))
+        offset += length
+
+    return baseHash, records
+
+
+"""
+Deletes the journal of a file, if there is one.
+
+PARAMETERS:
+    filePath - Path of the file.
+"""
+def remove(filePath):
+
+    try:
+        os.remove(getJournalPath(filePath))
+    except FileNotFoundError:
+        pass
+
+
+"""
+Applies the records of a journal to a document, as a single edit, so that it can be undone in 1 step.
+
+PARAMETERS:
+    document - The QTextDocument, holding the text the journal is based on.
+    records - List of the journal's records, as returned by load().
+"""
+def replay(document, records):
+
+    cursor = QTextCursor(document)
+    cursor.beginEditBlock()
+
+    for kind, position, removed, text in records:
+
+        if kind == SNAPSHOT:
+            cursor.select(QTextCursor.SelectionType.Document)
+        else:
+            end = document.characterCount() - 1 # Position of the end of the document
+            cursor.setPosition(min(position, end))
+            cursor.setPosition(min(position + removed, end), QTextCursor.MoveMode.KeepAnchor)
+
+        cursor.insertText(text)
+
+    cursor.endEditBlock()
+
+
+"""
+Records the edits made to an editor's document in the file's journal (See the top of this module).
+
+Recording an edit only packs it into pending, so it costs next to nothing per keystroke.
+Every FLUSH_INTERVAL, pending is handed to a JournalThread, which appends it to the journal and flushes it to disk.
+The journal file isn't created until the document is first edited, so just viewing a file never writes to disk.
+
+CONSTRUCTOR PARAMETERS:
+    editor - The editor whose document is to be journaled.
+    filePath - Path of the file open in the editor.
+    baseHash - Hash of the text of the file as it was loaded (See saveWorker.hashText()). If the document has already been edited, the journal is started with a snapshot of its text.
+
+ATTRIBUTES:
+    editor - The editor whose document is being journaled.
+    filePath - Path of the file open in the editor.
+    baseHash - Hash of the text of the file that the journal is based on.
+    pending - bytearray of the records that are yet to be handed to the JournalThread.
+    size - Size (in bytes) of the journal, including pending.
+    thread - The JournalThread writing the journal.
+    flushTimer - QTimer that hands pending to thread every FLUSH_INTERVAL.
+"""
+class Journal(QObject):
+
+
+    def __init__(self, editor, filePath, baseHash):
+
+        super().__init__()
+
+        self.editor = editor
+        self.filePath = filePath
+        self.baseHash = baseHash
+
+        self.pending = bytearray()
+        self.size = 0
+
+        self.thread = JournalThread(getJournalPath(filePath))
+        self.thread.start()
+
+        self.flushTimer = QTimer(self)
+        self.flushTimer.setInterval(FLUSH_INTERVAL)
+        self.flushTimer.timeout.connect(self.__flush)
+        self.flushTimer.start()
+
+        editor.document().contentsChange.connect(self.__onContentsChange)
+
+        if editor.document().isModified():
+            self.compact()
+
+
+    """
+    Starts the journal afresh once the file has been saved (or reloaded), as the journal is based on the text of the file.
+    If the document hasn't been edited since, the journal is deleted. Otherwise, it is compacted, so that it holds the edits made since.
+
+    PARAMETERS:
+        baseHash - Hash of the file's new text.
+    """
+    def reset(self, baseHash):
+
+        self.baseHash = baseHash
+
+        if self.editor.document().isModified():
+            self.compact()
+        else:
+            self.pending.clear()
+            self.size = 0
+            self.thread.jobs.put(("remove", None))
+
+
+    """
+    Replaces the journal with a snapshot of the document's text.
+    """
+    def compact(self):
+
+        text = self.editor.document().toPlainText().encode("utf-8", "surrogatepass")
+
+        data = self.__header() + RECORD.pack(SNAPSHOT, 0, 0, len(text)) + text
+
+        self.pending.clear()
+        self.size = len(data)
+        self.thread.jobs.put(("rewrite", data))
+
+
+    """
+    Stops journaling and deletes the journal, once there are no unsaved changes to recover (i.e when the editor is closed).
+    Waits for the JournalThread to finish.
+    """
+    def close(self):
+
+        self.flushTimer.stop()
+        self.editor.document().contentsChange.disconnect(self.__onContentsChange)
+
+        self.thread.jobs.put(("remove", None))
+        self.thread.jobs.put(None)
+        self.thread.wait()
+
+
+    """
+    Returns the journal's header.
+    """
+    def __header(self):
+
+        path = os.path.realpath(self.filePath).encode("utf-8", "surrogateescape")
+
+        return HEADER.pack(MAGIC, FORMAT_VERSION, self.baseHash, len(path)) + path
+
+
+    """
+    Called by the document's contentsChange signal. Adds a record of the edit to pending.
+
+    PARAMETERS:
+        position - Position in the document at which the change occured.
+        removed - Number of characters removed.
+        added - Number of characters added.
+    """
+    def __onContentsChange(self, position, removed, added):
+
+        if removed == 0 and added == 0:
+            return
+
+        text = ""
+
+        if added > 0:
+            document = self.editor.document()
+            cursor = QTextCursor(document)
+            cursor.setPosition(position)
+            cursor.setPosition(min(position + added, document.characterCount() - 1), QTextCursor.MoveMode.KeepAnchor)
+            text = cursor.selectedText().replace("\u2029", "\n") # selectedText() separates lines with the Unicode paragraph separator
+
+        data = text.encode("utf-8", "surrogatepass")
+
+        if self.size == 0: # First edit since the journal was started
+            self.pending += self.__header()
+
+        self.pending += RECORD.pack(EDIT, position, removed, len(data))
+        self.pending += data
+        self.size += RECORD.size + len(data)
+
+
+    """
+    Called by flushTimer. Hands pending to the JournalThread, or compacts the journal if it has grown past COMPACT_SIZE and the size of the document.
+    """
+    def __flush(self):
+
+        if not self.pending:
+            return
+
+        if self.size > COMPACT_SIZE and self.size > self.editor.document().characterCount():
+            self.compact()
+            return
+
+        self.thread.jobs.put(("append", bytes(self.pending)))
+        self.pending.clear()
@@ -0,0 +1,125 @@
+from PyQt6.QtCore import QThread
+
+import os
+import queue
+import tempfile
+
+
+"""
+Thread that writes an edit journal to disk (See journal.Journal), so that flushing the journal to disk with os.fsync() never blocks the GUI thread.
+
+The GUI thread hands the thread jobs through a queue. Every job waiting in the queue is carried out before the journal is flushed, so a burst of jobs costs a single os.fsync().
+The jobs are:
+    ("append", data) - Appends bytes to the journal, creating it if it doesn't exist yet.
+    ("rewrite", data) - Replaces the journal with new contents (e.g when it is compacted). The new journal is written to a temporary file that is renamed over the journal, so a crash part way through leaves the old journal.
+    ("remove", None) - Deletes the journal.
+    None - Stops the thread, once the jobs before it have been carried out.
+
+CONSTRUCTOR PARAMETERS:
+    path - Path of the journal file.
+
+ATTRIBUTES:
+    path - Path of the journal file.
+    jobs - queue.Queue of jobs for the thread.
+    file - The journal file, opened for appending (None if it isn't open).
+    error - Description of the error that stopped the journal from being written (None if there hasn't been one). Once there has been an error, appends are skipped until the journal is rewritten or removed,
+        so that records are never appended after a record that was only partly written.
+"""
+class JournalThread(QThread):
+
+
+    def __init__(self, path):
+
+        super().__init__()
+
+        self.path = path
+        self.jobs = queue.Queue()
+        self.file = None
+        self.error = None
+
+
+    """
+    Reimplementation of QThread.run(). Carries out jobs until it is told to stop.
+    """
+    def run(self):
+
+        running = True
+
+        while running:
+
+            batch = [self.jobs.get()]
+            while not self.jobs.empty():
+                batch.append(self.jobs.get())
+
+            try:
+                for job in batch:
+                    if job is None:
+                        running = False
+                        break
+                    self.__do(*job)
+
+                if self.file is not None:
+                    self.file.flush()
+                    os.fsync(self.file.fileno())
+
+            except OSError as error: # The journal is only a safeguard, so failing to write it mustn't stop the editor. The next rewrite starts it afresh
+                self.error = str(error)
+                self.__close()
+
+        self.__close()
+
+
+    """
+    Carries out a job.
+
+    PARAMETERS:
+        kind - "append", "rewrite" or "remove".
+        data - The bytes to write (None for "remove").
+    """
+    def __do(self, kind, data):
+
+        if kind == "append":
+            if self.error is not None:
+                return
+            if self.file is None:
+                self.file = open(self.path, 'ab')
+            self.file.write(data)
+
+        elif kind == "rewrite":
+            self.__close()
+
+            fileDescriptor, tempPath = tempfile.mkstemp(dir=os.path.dirname(self.path), suffix=".tmp")
+            try:
+                with os.fdopen(fileDescriptor, 'wb') as file:
+                    file.write(data)
+                    file.flush()
+                    os.fsync(file.fileno())
+                os.replace(tempPath, self.path)
+            except BaseException:
+                if os.path.exists(tempPath):
+                    os.remove(tempPath)
+                raise
+
+            self.file = open(self.path, 'ab')
+            self.error = None
+
+        elif kind == "remove":
+            self.__close()
+            self.error = None
+            try:
+                os.remove(self.path)
+            except FileNotFoundError:
+                pass
+
+
+    """
+    Closes the journal file if it is open.
+    """
+    def __close(self):
+
+        if self.file is not None:
+            try:
+                self.file.close()
+            except OSError:
+                pass
+            self.file = None
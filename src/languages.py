@@ -0,0 +1,110 @@
+import json
+import os
+import sys
+
+from tokenizer import Lexer
+
+
+"""
+Registry of the languages that BoothiumEdit can highlight.
+
+Each language is defined by a grammar file in the "grammars" folder (e.g "grammars/python.json"), so adding support for a new language only requires adding a grammar file.
+A grammar file is a JSON object with the following keys:
+    name - The name of the language (This is the string used for the editor's language attribute).
+    version - Integer that is to be incremented whenever the grammar is changed.
+    extensions - Array of the file extensions used by the language (e.g ".py").
+    filenames - Array of full file names used by the language, for files that don't have an extension (e.g "Makefile").
+    interpreters - Array of the names of interpreters that may appear in a shebang line (e.g "python3" in "#!/usr/bin/env python3").
+    keywords - Array of the language's reserved keywords.
+    rules - Array of [tokenType, regex] pairs, ordered from highest to lowest precedence (See tokenizer.compileRules()).
+    regions - Object mapping the token type of a rule that opens a multi-line construct to a [tokenType, endRegex] pair (See tokenizer.Lexer).
+
+The grammar files are only read the first time a language needs to be detected, and a language's Lexer is only compiled the first time a file in that language is opened.
+Both are then cached for the rest of the process, so every editor highlighting a language shares the same Lexer.
+"""
+
+grammarsPath = os.path.join(sys.path[0], "grammars")
+
+grammars = None # Maps the name of a language to its grammar (as loaded from its grammar file), once the grammar files have been read.
+lexers = {} # Maps the name of a language to its compiled Lexer, once it has been compiled.
+
+
+"""
+Reads every grammar file into the grammars dictionary, if this hasn't been done already, and returns the dictionary.
+"""
+def getGrammars():
+
+    global grammars
+
+    if grammars is None:
+
+        grammars = {}
+
+        for fileName in sorted(os.listdir(grammarsPath)):
+
+            if not fileName.endswith(".json"):
+                continue
+
+            with open(os.path.join(grammarsPath, fileName), 'r') as file:
+                grammar = json.load(file)
+
+            grammars[grammar["name"]] = grammar
+
+    return grammars
+
+
+"""
+Works out the language of a file from its name, or failing that, from the shebang line at the start of its text.
+
+PARAMETERS:
+    filePath - Path of the file.
+    fileText - The text of the file (Only the first line is looked at).
+
+RETURNS:
+    The name of the language, or "unknown" if the file isn't in any of the supported languages.
+"""
+def detectLanguage(filePath, fileText):
+
+    fileName = os.path.basename(filePath)
+    extension = os.path.splitext(fileName)[1]
+
+    for name, grammar in getGrammars().items():
+        if fileName in grammar["filenames"] or (extension != "" and extension in grammar["extensions"]):
+            return name
+
+    # Shebang lines look like "#!/usr/bin/python3" or "#!/usr/bin/env python3"
+    if fileText.startswith("#!"):
+
+        words = fileText[2:].split("\n", 1)[0].split()
+
+        if len(words) > 0:
+
+            interpreter = os.path.basename(words[0])
+            if interpreter == "env" and len(words) > 1:
+                interpreter = words[1]
+
+            for name, grammar in getGrammars().items():
+                if interpreter in grammar["interpreters"]:
+                    return name
+
+    return "unknown"
+
+
+"""
+Returns the Lexer for a language, compiling it from the language's grammar if this is the first time it has been needed.
+
+PARAMETERS:
+    language - The name of the language.
+"""
+def getLexer(language):
+
+    if language not in lexers:
+
+        grammar = getGrammars()[language]
+
+        rules = dict(grammar["rules"])
+        regions = {opener: tuple(region) for opener, region in grammar["regions"].items()}
+
+        lexers[language] = Lexer(rules, regions, frozenset(grammar["keywords"]))
+
+    return lexers[language]
@@ -0,0 +1,301 @@
+from PyQt6.QtWidgets import QPlainTextEdit, QScrollBar
+from PyQt6.QtGui import QTextCursor
+from PyQt6.QtCore import Qt, QRect
+
+from array import array
+import mmap
+
+from editor import Editor
+from lineIndexWorker import LineIndexThread, INDEX_STRIDE
+
+
+LARGE_FILE_SIZE = 64 * 1024 * 1024 # Files of at least this size (in bytes) are opened in large-file mode
+
+WINDOW_LINES = 4000 # Number of lines of the file held in the document at a time
+
+WINDOW_MARGIN = 500 # The window is moved once the view comes within this many lines of either end of it, so that the user never scrolls past the end of the window
+
+MAX_WINDOW_BYTES = 8 * 1024 * 1024 # Maximum number of bytes of the file held in the document, so that a file with very long lines can't fill the document. Lines past this are cut off.
+
+
+"""
+Represents the code editor textbox in large-file mode, which is used for files of at least LARGE_FILE_SIZE.
+
+Rather than reading the whole file and copying it into the document, the file is memory-mapped, and only a window of WINDOW_LINES lines around the view is decoded and held in the document.
+The window is moved along the file as the user scrolls, so the memory used depends on the size of the window rather than the size of the file
+(The pages of the file that have been mapped belong to the operating system's file cache, and can be dropped by it at any time).
+
+The lines of the file are found by a LineIndexThread, which scans the file in the background, so the start of the file is shown straight away.
+The editor's own scrollbar only covers the window, so it is hidden, and a separate scrollbar covering every line of the file is shown instead,
+which grows as the scan finds more lines. The line numbers shown are the lines' numbers in the file (See firstLineNumber).
+
+Large-file mode is read-only, as the document only ever holds part of the file, and it doesn't highlight syntax.
+
+CONSTRUCTOR PARAMETERS:
+    filePath - Path of the file to open.
+
+ATTRIBUTES:
+    file - The open file object.
+    buffer - The mmap of the file.
+    checkpoints - array of the position of the start of every INDEX_STRIDE-th line (See lineIndexWorker.LineIndexThread).
+    lineCount - Number of lines whose start has been found so far.
+    scanFinished - Whether the whole file has been scanned.
+    indexThread - The LineIndexThread scanning the file.
+    windowStart - Position in the file of the start of the window.
+    windowEnd - Position in the file of the end of the window.
+    loadingWindow - Whether the window is being loaded.
+    fileScrollBar - QScrollBar covering every line of the file, whose value is the number of the top line in view.
+"""
+class LargeFileEditor(Editor):
+
+
+    def __init__(self, filePath):
+
+        super().__init__("", "unknown")
+
+        self.setReadOnly(True)
+
+        self.file = open(filePath, 'rb')
+        self.buffer = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.checkpoints = array('Q', [0])
+        self.lineCount = 1
+        self.scanFinished = False
+
+        self.windowStart = None
+        self.windowEnd = None
+        self.loadingWindow = False
+
+        self.fileScrollBar = QScrollBar(Qt.Orientation.Vertical, self)
+        self.fileScrollBar.valueChanged.connect(self.__scrollToLine)
+
+        self.setVerticalScrollBarPolicy(Qt.ScrollBarPolicy.ScrollBarAlwaysOff)
+        self.verticalScrollBar().valueChanged.connect(self.__onViewScrolled)
+        self.setViewportMargins(self.lineNumberArea.getWidth(), 0, self.fileScrollBar.sizeHint().width(), 0)
+
+        self.indexThread = LineIndexThread(self.buffer)
+        self.indexThread.chunkScanned.connect(self.__onChunkScanned)
+        self.indexThread.start()
+
+        # The first window is shown straight away, without waiting for the scan
+        self.__loadWindow(0)
+
+
+    """
+    Reimplementation of Editor.keyPressEvent(). Keys are handled as by QPlainTextEdit, without the editor's automatic indentation and bracket/quote closing, which would otherwise edit the read-only document.
+    """
+    def keyPressEvent(self, event):
+        QPlainTextEdit.keyPressEvent(self, event)
+
+
+    """
+    Reimplemenation of Qwidget.resizeEvent. Keeps fileScrollBar on the right-hand edge of the editor.
+    """
+    def resizeEvent(self, event):
+
+        super().resizeEvent(event)
+
+        cr = self.contentsRect()
+        width = self.fileScrollBar.sizeHint().width()
+        self.fileScrollBar.setGeometry(QRect(cr.right() - width + 1, cr.top(), width, cr.height()))
+
+        self.__updateScrollRange()
+
+
+    """
+    Stops the scan and closes the file. To be called when the editor is closed.
+    """
+    def stop(self):
+
+        super().stop()
+
+        self.indexThread.cancelled = True
+        self.indexThread.wait()
+
+        self.buffer.close()
+        self.file.close()
+
+
+    """
+    Called when the LineIndexThread has scanned a chunk of the file. Adds the checkpoints found to the index, and extends fileScrollBar to cover the lines found.
+
+    PARAMETERS:
+        checkpoints - List of the positions of the checkpoints found in the chunk.
+        lineCount - Number of lines whose start has been found so far.
+        finished - Whether the whole file has been scanned.
+    """
+    def __onChunkScanned(self, checkpoints, lineCount, finished):
+
+        self.checkpoints.extend(checkpoints)
+        self.lineCount = lineCount
+        self.scanFinished = finished
+
+        self.__updateScrollRange()
+        self.lineNumberArea.updateWidth()
+
+        # The window may have been cut short by the end of the lines found so far
+        if self.document().blockCount() < WINDOW_LINES and self.firstLineNumber + self.document().blockCount() < lineCount:
+            self.__loadWindow(self.fileScrollBar.value())
+
+
+    """
+    Returns the position in the file of the start of a line.
+
+    PARAMETERS:
+        lineNumber - Number of the line, starting from 0 (Must be less than lineCount).
+    """
+    def __lineStart(self, lineNumber):
+
+        position = self.checkpoints[lineNumber // INDEX_STRIDE]
+
+        for i in range(lineNumber % INDEX_STRIDE):
+            position = self.buffer.find(b"\n", position) + 1
+
+        return position
+
+
+    """
+    Returns the position in the file of the end of a line (i.e of the newline at the end of it, or of the end of the file).
+    The newline is searched for, so this works for lines that the scan hasn't reached yet.
+
+    PARAMETERS:
+        lineStart - Position in the file of the start of the line.
+    """
+    def __lineEnd(self, lineStart):
+
+        end = self.buffer.find(b"\n", lineStart)
+        return len(self.buffer) if end == -1 else end
+
+
+    """
+    Loads a window of lines around a line into the document, and scrolls the view so that the line is at the top of it.
+    The window starts WINDOW_LINES // 2 lines before the line (or earlier, if there aren't enough lines after it to fill the window),
+    unless those lines are so long that the line wouldn't be within the first half of MAX_WINDOW_BYTES, in which case it starts closer to the line.
+    The user's cursor is kept at the same place in the file if it is still within the window.
+
+    PARAMETERS:
+        topLine - Number of the line to scroll to the top of the view.
+    """
+    def __loadWindow(self, topLine):
+
+        topLine = max(0, min(topLine, self.lineCount - 1))
+        topStart = self.__lineStart(topLine)
+
+        firstLine = max(0, min(topLine - WINDOW_LINES // 2, self.lineCount - WINDOW_LINES))
+        start = self.__lineStart(firstLine)
+
+        if topStart - start > MAX_WINDOW_BYTES // 2: # Very long lines. Go back from topLine 1 line at a time instead, until the limit is reached
+            firstLine = topLine
+            start = topStart
+            while firstLine > 0:
+                previous = self.buffer.rfind(b"\n", 0, start - 1) + 1
+                if topStart - previous > MAX_WINDOW_BYTES // 2:
+                    break
+                firstLine -= 1
+                start = previous
+
+        lastLine = min(firstLine + WINDOW_LINES, self.lineCount) - 1
+        end = min(self.__lineEnd(self.__lineStart(lastLine)), start + MAX_WINDOW_BYTES)
+
+        self.loadingWindow = True # The view is scrolled whilst the document is replaced, which mustn't move the window again
+
+        if (start, end) != (self.windowStart, self.windowEnd):
+
+            cursor = self.textCursor()
+            cursorLine = self.firstLineNumber + cursor.blockNumber()
+            cursorColumn = cursor.positionInBlock()
+
+            text = self.buffer[start:end].decode("utf-8", "replace").replace("\r\n", "\n")
+
+            self.firstLineNumber = firstLine
+            self.windowStart = start
+            self.windowEnd = end
+            self.setPlainText(text)
+
+            if firstLine <= cursorLine < firstLine + self.document().blockCount():
+                block = self.document().findBlockByNumber(cursorLine - firstLine)
+                cursor = QTextCursor(block)
+                cursor.setPosition(block.position() + min(cursorColumn, block.length() - 1))
+                self.setTextCursor(cursor)
+
+        self.verticalScrollBar().setValue(topLine - firstLine)
+        self.loadingWindow = False
+
+        self.__syncScrollBar()
+
+
+    """
+    Called when fileScrollBar is moved. Scrolls the view to a line of the file, moving the window first if the line isn't far enough within it.
+
+    PARAMETERS:
+        lineNumber - Number of the line to scroll to the top of the view.
+    """
+    def __scrollToLine(self, lineNumber):
+
+        offset = lineNumber - self.firstLineNumber
+        windowLines = self.document().blockCount()
+
+        if self.__nearWindowEdge(offset, windowLines) or not 0 <= offset < windowLines:
+            self.__loadWindow(lineNumber)
+        else:
+            self.verticalScrollBar().setValue(offset)
+
+
+    """
+    Called when the view is scrolled within the window (e.g with the mouse wheel, or by moving the user's cursor).
+    Moves fileScrollBar to match, and moves the window if the view has come close to either end of it.
+
+    PARAMETERS:
+        value - Number of the top line in view, within the window.
+    """
+    def __onViewScrolled(self, value):
+
+        if self.loadingWindow:
+            return
+
+        if self.__nearWindowEdge(value, self.document().blockCount()):
+            self.__loadWindow(self.firstLineNumber + value) # Does nothing but scroll if the window would stay where it is (e.g if it has been cut short by very long lines)
+        else:
+            self.__syncScrollBar()
+
+
+    """
+    Moves fileScrollBar to the top line in view.
+    """
+    def __syncScrollBar(self):
+
+        self.fileScrollBar.blockSignals(True) # So that __scrollToLine() isn't called
+        self.fileScrollBar.setValue(self.firstLineNumber + self.verticalScrollBar().value())
+        self.fileScrollBar.blockSignals(False)
+
+        self.lineNumberArea.update()
+
+
+    """
+    Returns whether the view is within WINDOW_MARGIN lines of either end of the window, where there are more lines of the file past that end.
+
+    PARAMETERS:
+        offset - Number of the top line in view, within the window.
+        windowLines - Number of lines in the window.
+    """
+    def __nearWindowEdge(self, offset, windowLines):
+
+        visibleLines = self.fileScrollBar.pageStep()
+
+        if offset < WINDOW_MARGIN and self.firstLineNumber > 0:
+            return True
+
+        return offset + visibleLines > windowLines - WINDOW_MARGIN and self.firstLineNumber + windowLines < self.lineCount
+
+
+    """
+    Sets the range of fileScrollBar to cover every line found so far.
+    """
+    def __updateScrollRange(self):
+
+        visibleLines = max(1, self.viewport().height() // max(1, self.fontMetrics().height()))
+
+        self.fileScrollBar.blockSignals(True)
+        self.fileScrollBar.setPageStep(visibleLines)
+        self.fileScrollBar.setRange(0, max(0, self.lineCount - visibleLines))
+        self.fileScrollBar.blockSignals(False)
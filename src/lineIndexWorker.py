@@ -0,0 +1,75 @@
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from itertools import accumulate
+import mmap
+
+
+SCAN_CHUNK = 16 * 1024 * 1024 # Number of bytes of the file scanned at a time, after which the line starts found are sent back to the GUI thread
+
+INDEX_STRIDE = 64 # Only the start of every INDEX_STRIDE-th line is recorded, so that the index is a small fraction of the size of the file
+
+
+"""
+Thread that scans a memory-mapped file for the starts of its lines, so that the lines of a very large file can be found without blocking the GUI thread (See largeFile.LargeFileEditor).
+
+Rather than recording where every line starts, which would take up memory in proportion to the number of lines, only the start of every INDEX_STRIDE-th line (a checkpoint) is recorded.
+Any other line is found by searching forwards from the checkpoint before it, which never requires searching past more than INDEX_STRIDE - 1 newlines.
+
+Each chunk is split on newlines by bytes.split(), and the positions of the newlines are worked out from the lengths of the pieces with itertools.accumulate(), so the file is scanned by C code rather than byte by byte in Python.
+
+CONSTRUCTOR PARAMETERS:
+    buffer - The mmap of the file.
+
+ATTRIBUTES:
+    buffer - The mmap of the file.
+    cancelled - Flag that, when set from the GUI thread, makes the thread stop before scanning its next chunk.
+
+SIGNALS:
+    chunkScanned(checkpoints, lineCount, finished) - Emitted when a chunk has been scanned, where checkpoints is a list of the positions of the checkpoints found in the chunk,
+        lineCount is the number of lines whose start has been found so far, and finished is whether the whole file has been scanned.
+"""
+class LineIndexThread(QThread):
+
+    chunkScanned = pyqtSignal(list, int, bool)
+
+
+    def __init__(self, buffer):
+
+        super().__init__()
+
+        self.buffer = buffer
+        self.cancelled = False
+
+
+    """
+    Reimplementation of QThread.run(). Scans the file chunk by chunk, emitting chunkScanned after each chunk.
+    """
+    def run(self):
+
+        buffer = self.buffer
+        size = len(buffer)
+
+        lineCount = 1 # The first line starts at the start of the file
+
+        for chunkStart in range(0, size, SCAN_CHUNK):
+
+            if self.cancelled:
+                return
+
+            pieces = buffer[chunkStart:chunkStart + SCAN_CHUNK].split(b"\n")
+            ends = list(accumulate(map(len, pieces))) # The i-th newline in the chunk is at chunkStart + ends[i] + i
+
+            # Line (lineCount + i) starts just after the i-th newline in the chunk. Only lines that are a multiple of INDEX_STRIDE are recorded
+            first = -lineCount % INDEX_STRIDE
+            checkpoints = [chunkStart + ends[i] + i + 1 for i in range(first, len(pieces) - 1, INDEX_STRIDE)]
+
+            lineCount += len(pieces) - 1
+
+            # The pages of the chunk that were read in won't be needed again, so they are released rather than counting towards the editor's memory use until the operating system drops them
+            if hasattr(mmap, "MADV_DONTNEED"): # Not available on every platform (e.g Windows)
+                buffer.madvise(mmap.MADV_DONTNEED, chunkStart, min(SCAN_CHUNK, size - chunkStart))
+
+            self.chunkScanned.emit(checkpoints, lineCount, chunkStart + SCAN_CHUNK >= size)
+
+        if size == 0:
+            self.chunkScanned.emit([], lineCount, True)
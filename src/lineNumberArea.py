@@ -23,7 +23,7 @@ class LineNumberArea(QWidget):
     If the width of the lineNumberArea needs to be changed (as a result of the new number of the bottom line having more digits, and thus needing more width), this returns the calculated new width.
     """
     def getWidth(self):
-        linesNo = self.editor.blockCount()
+        linesNo = self.editor.firstLineNumber + self.editor.blockCount()
         digitsNo = len(str(linesNo)) # Number of digits in line number of bottom line
         charWidth = QFontMetrics(self.font()).maxWidth() # Width of 1 individual character in the editor's font.
         return ((digitsNo + 1) * charWidth) 
@@ -31,10 +31,10 @@ class LineNumberArea(QWidget):
 
     """
     This is called by event from the editor class (via the blockCountChanged() signal), whenever new lines are created or removed in the editor.
-    Sets a margin on the left-hand side of the editor which the lineNumberArea will occupy.
+    Sets a margin on the left-hand side of the editor which the lineNumberArea will occupy (keeping any margin on the right-hand side, e.g for a large-file editor's scrollbar).
     """
     def updateWidth(self):
-        self.editor.setViewportMargins(self.getWidth(), 0, 0, 0) 
+        self.editor.setViewportMargins(self.getWidth(), 0, self.editor.viewportMargins().right(), 0) 
 
 
     """
@@ -68,7 +68,7 @@ class LineNumberArea(QWidget):
         painter.fillRect(event.rect(), QColor("#191e2b"))
 
         line = self.editor.firstVisibleBlock()
-        lineNo = line.blockNumber()
+        lineNo = self.editor.firstLineNumber + line.blockNumber() # Number of the line in the file, rather than in the document
 
         height = self.fontMetrics().height() # Height of 1 individual character in the editor's font.
 
@@ -1,135 +1,379 @@
-from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QPushButton
+import time
+START_TIME = time.perf_counter() # Taken before anything else is imported, so that --profile-startup can time the imports
+
+from PyQt6.QtWidgets import QApplication, QMainWindow, QMessageBox, QProgressBar, QTabWidget
 from PyQt6.QtGui import QAction, QKeySequence
+from PyQt6.QtCore import Qt
 
 import sys
-import platform
+import os
 
-from editor import Editor
-import saving
-import findReplace
 import settings
+import instance
+import startup
+from fileTab import FileTab
+
+# findReplace and findInFiles are only imported when they are first opened, as they are rarely needed and (for Find in Files) slow to import
 
 
-app = QApplication([])
+"""
+Represents the editor's window, in which each open file has its own tab (See fileTab.FileTab).
 
+Only one window is opened per user: running BoothiumEdit again hands the files to open over to the running window (See instance.py), which opens them in new tabs.
 
+CONSTRUCTOR PARAMETERS:
+    paths - List of the paths of the files to open.
+
+ATTRIBUTES:
+    tabs - The QTabWidget holding a FileTab for each open file.
+    server - The instance.InstanceServer that other invocations hand files over to (None until the window has first been painted).
+    painted - Whether the window has been painted yet. Until it has, files are only read as far as needed to show them, and the rest of the startup is put off (See __onFirstPaint()).
+    progressBar - QProgressBar in the status bar, showing how much of the current tab's file has been loaded.
+    saveAct - The "Save" QAction.
+    saveAsAct - The "Save As" QAction.
+"""
 class MainWindow(QMainWindow):
-	
-    
-    def __init__(self):
+
+
+    def __init__(self, paths):
 
         super().__init__()
 
         self.setGeometry(100, 100, 1000, 1000)
         self.setMinimumSize(500, 500)
 
-        # Getting file from command line arguments
-        try:
-            self.filePath = sys.argv[1]
-        except IndexError: # Handle user not providing a filename
-            sys.exit("ERROR: No filename specified")
+        self.tabs = QTabWidget(self)
+        self.tabs.setTabsClosable(True)
+        self.tabs.setMovable(True)
+        self.tabs.setDocumentMode(True)
+        self.tabs.currentChanged.connect(self.__onCurrentChanged)
+        self.tabs.tabCloseRequested.connect(self.__closeTab)
+        self.setCentralWidget(self.tabs)
 
-        try:
-            with open(self.filePath, "r") as file:
-                fileText = file.read()
-        except FileNotFoundError: # Handle user providing nonexistent file
-            sys.exit("ERROR: File does not exist")
-
-        # Get name of file without rest of path
-        if platform.system() == "Windows": # Account for windows using "\" as path seperator rather than "/"
-            pathSeperator = '\\' # Double backslash to escape the first backslash
-        else:
-            pathSeperator = '/'
-            
-        lastPathSepIndex = self.filePath[::-1].index(pathSeperator) # Reverse file path to facilitate getting index of last path seperator 
-        fileNameNoPath = ((self.filePath[::-1])[:lastPathSepIndex])[::-1] # Get characters of reverse path that precede last path seperator, then reverse this to get them finally in the right order
-
-        self.setWindowTitle("BoothiumEdit - " + fileNameNoPath)
-
-        # Get programming language from filename
-        if self.filePath[-3:] == ".py":
-            language = "python"
-        elif self.filePath[-3:] == ".js":
-            language = "javascript"
-        elif self.filePath[-3:] == ".go":
-            language = "go"         
-        elif self.filePath[-2:] == ".c" or self.filePath[-2:] == ".h":
-            language = "c"
-        elif self.filePath[-4:] == ".cpp" or self.filePath[-2:] == ".hpp":
-            language = "c++"
-        elif self.filePath[-5:] == ".java":
-            language = "java"
-        else:
-            language = "unknown"
-             
-        editor = Editor(fileText, language)
-        self.setCentralWidget(editor)
+        # The status bar is only shown whilst it has something to show, i.e whilst the file is being loaded, or for a while after it has been saved
+        self.statusBar().hide()
+        self.statusBar().messageChanged.connect(self.__updateStatusBar)
+
+        self.progressBar = QProgressBar(self)
+        self.progressBar.setMaximumWidth(200)
+        self.statusBar().addPermanentWidget(self.progressBar)
 
         menuBar = self.menuBar()
-        menuBar.setStyleSheet("""color: white; 
+        menuBar.setStyleSheet("""color: white;
                                 background-color: #1e1e1e;
                                 font: Garet;
                                 font-size: 13pt;
                                 """)
 
-        saveAct = QAction("Save", self)
-        saveAct.triggered.connect(lambda: saving.save(self.filePath, self.centralWidget().toPlainText()))
-        saveAct.setShortcut(QKeySequence("Ctrl+s"))
-                                                        
-        saveAsAct = QAction("Save As", self)
-        saveAsAct.triggered.connect(lambda: saving.saveAs(self.centralWidget().toPlainText()))
-        saveAsAct.setShortcut(QKeySequence("Ctrl+Shift+s"))
+        self.saveAct = QAction("Save", self)
+        self.saveAct.triggered.connect(lambda: self.__currentTab().save())
+        self.saveAct.setShortcut(QKeySequence("Ctrl+s"))
+
+        self.saveAsAct = QAction("Save As", self)
+        self.saveAsAct.triggered.connect(lambda: self.__currentTab().saveAs())
+        self.saveAsAct.setShortcut(QKeySequence("Ctrl+Shift+s"))
+
+        closeTabAct = QAction("Close Tab", self)
+        closeTabAct.triggered.connect(lambda: self.__closeTab(self.tabs.currentIndex()))
+        closeTabAct.setShortcut(QKeySequence("Ctrl+w"))
 
         settingsAct = QAction("Settings", self)
-        settingsAct.triggered.connect(settings.SettingsPopup)
+        settingsAct.triggered.connect(lambda: settings.SettingsPopup(self.openFile))
 
         fileMenu = menuBar.addMenu("&File")
-        fileMenu.addAction(saveAct)
-        fileMenu.addAction(saveAsAct)
+        fileMenu.addAction(self.saveAct)
+        fileMenu.addAction(self.saveAsAct)
+        fileMenu.addAction(closeTabAct)
         fileMenu.addSeparator()
         fileMenu.addAction(settingsAct)
 
         findAct = QAction("Find", self)
-        findAct.triggered.connect(lambda: findReplace.FindReplacePopup(self.centralWidget()))
+        findAct.triggered.connect(self.__openFindReplace)
         findAct.setShortcut(QKeySequence("Ctrl+f"))
 
+        findInFilesAct = QAction("Find in Files", self)
+        findInFilesAct.triggered.connect(self.__openFindInFiles)
+        findInFilesAct.setShortcut(QKeySequence("Ctrl+Shift+f"))
+
         editMenu = menuBar.addMenu("&Edit")
         editMenu.addAction(findAct)
+        editMenu.addAction(findInFilesAct)
+
+        self.server = None
+        self.painted = False
+        startup.afterFirstPaint(self, self.__onFirstPaint)
+        startup.mark("window setup")
+
+        for path in paths:
+            self.openFile(path)
+
+
+    """
+    Opens a file in a new tab, or switches to its tab if it is already open.
+
+    PARAMETERS:
+        path - Path of the file.
+
+    RETURNS:
+        The file's FileTab, or None if it couldn't be opened.
+    """
+    def openFile(self, path):
+
+        realPath = os.path.realpath(path)
+
+        for index in range(self.tabs.count()):
+            if os.path.realpath(self.tabs.widget(index).filePath) == realPath:
+                self.tabs.setCurrentIndex(index)
+                return self.tabs.widget(index)
+
+        try:
+            tab = FileTab(path)
+        except OSError as error:
+            QMessageBox.warning(self, "BoothiumEdit", f"Could not open {path}:\n{error.strerror}")
+            return None
+
+        tab.progressChanged.connect(self.__updateStatusBar)
+        tab.message.connect(lambda text: self.statusBar().showMessage(text, 3000))
+        tab.editor.document().modificationChanged.connect(lambda: self.__updateTitle(tab))
+
+        self.tabs.setCurrentIndex(self.tabs.addTab(tab, tab.fileName))
+
+        if self.painted:
+            tab.startLoading()
+
+        return tab
+
+
+    """
+    Opens files handed over by another invocation of BoothiumEdit (See instance.InstanceServer), and brings the window to the front.
+
+    PARAMETERS:
+        paths - List of the absolute paths of the files.
+    """
+    def openFiles(self, paths):
+
+        for path in paths:
+            self.openFile(path)
+
+        self.setWindowState(self.windowState() & ~Qt.WindowState.WindowMinimized)
+        self.raise_()
+        self.activateWindow()
+
+
+    """
+    Called once the window has first been painted, i.e once the user can see the file. Starts the work that was put off so that the window could be shown sooner:
+    loading the rest of each file, highlighting it in full and recovering its journal (See fileTab.FileTab.startLoading()), and listening for files handed over by other invocations.
+    """
+    def __onFirstPaint(self):
+
+        startup.mark("first paint")
+
+        self.painted = True
+
+        for index in range(self.tabs.count()):
+            self.tabs.widget(index).startLoading()
+
+        self.server = instance.InstanceServer()
+        self.server.filesReceived.connect(self.openFiles)
+
+        startup.mark("deferred work")
+        startup.report()
+
+
+    """
+    Returns the FileTab of the tab that is shown.
+    """
+    def __currentTab(self):
+        return self.tabs.currentWidget()
+
+
+    """
+    Called when a different tab is shown. Updates the window's title, the status bar and the actions that depend on the tab's file.
+    """
+    def __onCurrentChanged(self):
+
+        tab = self.__currentTab()
+
+        if tab is None:
+            return
+
+        # In large-file mode, the editor only holds part of the file, so saving it would cut the file short
+        self.saveAct.setEnabled(not tab.largeFileMode)
+        self.saveAsAct.setEnabled(not tab.largeFileMode)
+
+        self.__updateTitle(tab)
+        self.__updateStatusBar()
+
+        tab.editor.setFocus()
 
 
     """
-    Reimplementation of QWidget.closeEvent(). Prompts user to save if text in editor is discrepant from text in file.
+    Updates the title of a tab, and the window's title if it is the tab shown, so that they show whether the tab's file has unsaved changes.
+
+    PARAMETERS:
+        tab - The FileTab.
+    """
+    def __updateTitle(self, tab):
+
+        modified = tab.editor.document().isModified()
+
+        self.tabs.setTabText(self.tabs.indexOf(tab), tab.fileName + ("*" if modified else ""))
+
+        if tab is not self.__currentTab():
+            return
+
+        if tab.largeFileMode:
+            self.setWindowTitle("BoothiumEdit - " + tab.fileName + " (Read Only)")
+        else:
+            self.setWindowTitle("BoothiumEdit - " + tab.fileName + "[*]") # "[*]" is shown as "*" whilst the window is marked as modified
+
+        self.setWindowModified(modified)
+
+
+    """
+    Shows the status bar if the current tab's file is being loaded or a message is being shown in it, and hides it otherwise.
+    """
+    def __updateStatusBar(self):
+
+        tab = self.__currentTab()
+        loading = tab is not None and tab.progress < 100
+
+        if loading:
+            self.progressBar.setValue(tab.progress)
+
+        self.progressBar.setVisible(loading)
+        self.statusBar().setVisible(loading or self.statusBar().currentMessage() != "")
+
+
+    """
+    Closes a tab, prompting the user to save its file if it has unsaved changes (See fileTab.FileTab.closeFile()). The window is closed once its last tab has been closed.
+
+    PARAMETERS:
+        index - The index of the tab.
+    """
+    def __closeTab(self, index):
+
+        tab = self.tabs.widget(index)
+
+        if tab is None or not tab.closeFile():
+            return
+
+        self.tabs.removeTab(index)
+        tab.deleteLater()
+
+        if self.tabs.count() == 0:
+            self.close()
+
+
+    """
+    Opens the Find & Replace popup.
+    """
+    def __openFindReplace(self):
+
+        import findReplace
+
+        tab = self.__currentTab()
+        tab.finishLoading()
+        findReplace.FindReplacePopup(tab.editor)
+
+
+    """
+    Opens the Find in Files popup.
+    """
+    def __openFindInFiles(self):
+
+        import findInFiles
+
+        tab = self.__currentTab()
+        tab.finishLoading()
+        findInFiles.FindInFilesPopup(tab.editor, tab.filePath, self.__openResultFile, self.__getOpenEditors)
+
+
+    """
+    Returns a dictionary mapping the real path of each open file to the editor it is open in, for Find in Files to replace hits in open files in their editors rather than on disk.
+    Each file is loaded in full first, so that none of its text is left out.
+    """
+    def __getOpenEditors(self):
+
+        editors = {}
+
+        for index in range(self.tabs.count()):
+            tab = self.tabs.widget(index)
+            tab.finishLoading()
+            editors[os.path.realpath(tab.filePath)] = tab.editor
+
+        return editors
+
+
+    """
+    Opens a file that Find in Files found a hit in, so that the hit can be selected in its editor.
+
+    PARAMETERS:
+        path - Path of the file.
+
+    RETURNS:
+        The editor the file is open in, or None if the file couldn't be opened or is open in large-file mode (where only part of the file is in the editor).
+    """
+    def __openResultFile(self, path):
+
+        tab = self.openFile(path)
+
+        if tab is None or tab.largeFileMode:
+            return None
+
+        tab.finishLoading()
+        return tab.editor
+
+
+    """
+    Reimplementation of QWidget.closeEvent(). Closes every tab, prompting the user to save any files with unsaved changes. If the user cancels, the window stays open.
     """
     def closeEvent(self, event):
 
-        editorText = self.centralWidget().toPlainText()
+        while self.tabs.count() > 0:
+
+            tab = self.tabs.widget(0)
+            self.tabs.setCurrentIndex(0) # So that the user can see which file they are being asked about
+
+            if not tab.closeFile():
+                event.ignore()
+                return
+
+            self.tabs.removeTab(0)
+            tab.deleteLater()
 
-        with open(self.filePath, "r") as file:
-            fileText = file.read()
 
-        if editorText != fileText:
+# Only run when main.py is run directly, as Find in Files' worker processes import it again when they start (See fileSearch.getPool())
+if __name__ == "__main__":
 
-            msgBox = QMessageBox(self)
-            msgBox.setWindowTitle("BoothiumEdit")
-            msgBox.setText("You have unsaved changes. Do you want to save these changes before exiting?")
+    arguments = sys.argv[1:]
 
-            save = QPushButton("Save")
+    # --profile-startup prints how long each phase of the startup took (See startup.StartupProfile). The startup is profiled in a new instance, rather than handing the files over to the running one
+    profiling = "--profile-startup" in arguments
+    if profiling:
+        arguments = [argument for argument in arguments if argument != "--profile-startup"]
+        startup.profile = startup.StartupProfile(START_TIME)
+        startup.mark("imports")
 
-            def saveAndExit(newText):
-                saving.save(self.filePath, newText)
-                self.close()
+    # Getting files from command line arguments. Relative paths are resolved here, as the running instance they may be handed to may have been started from another directory
+    paths = [os.path.abspath(path) for path in arguments]
 
-            save.clicked.connect(lambda: saveAndExit(editorText))
-            msgBox.addButton(save, QMessageBox.ButtonRole.AcceptRole)
+    if not paths: # Handle user not providing a filename
+        sys.exit("ERROR: No filename specified")
 
-            discard = QPushButton("Discard")
-            discard.clicked.connect(lambda: self.close())
-            msgBox.addButton(discard, QMessageBox.ButtonRole.RejectRole)
+    for path in paths:
+        if not os.path.isfile(path): # Handle user providing nonexistent file
+            sys.exit("ERROR: File does not exist: " + path)
 
-            msgBox.exec()
+    # If BoothiumEdit is already running, the files are opened in its window instead
+    if not profiling and instance.handOff(paths):
+        sys.exit(0)
 
+    app = QApplication([])
+    startup.mark("application")
 
-window = MainWindow()
-window.show()
+    window = MainWindow(paths)
+    window.show()
+    startup.mark("window shown")
 
-sys.exit(app.exec())
\ No newline at end of file
+    sys.exit(app.exec())
@@ -0,0 +1,90 @@
+from PyQt6.QtCore import QThread
+
+import hashlib
+import os
+
+from atomicFile import writeAtomically
+
+
+TEXT_HASH_SIZE = 20 # Size (in bytes) of the hashes returned by hashText()
+
+
+"""
+Returns a hash of a text, used to tell whether the editor's text is the same as the text that was last saved (or loaded).
+
+PARAMETERS:
+    text - The text to hash.
+"""
+def hashText(text):
+    return hashlib.blake2b(text.encode("utf-8", "surrogatepass"), digest_size=TEXT_HASH_SIZE).digest()
+
+
+"""
+Writes text to a file atomically (See atomicFile.writeAtomically()), so that the file either has its old contents or its new contents, even if the editor (or the computer) crashes part way through saving it.
+If the path is a symbolic link, the file it points to is replaced, rather than the link.
+
+Raises OSError if the file can't be written, and UnicodeEncodeError if the text can't be encoded in the encoding (in either case, the file is left as it was).
+
+PARAMETERS:
+    path - Path of the file.
+    text - The text to write, with "\\n" line breaks.
+    encoding - The encoding to write the text in (None for UTF-8).
+    newline - What each "\\n" is to be written as (None for the platform's default).
+"""
+def writeFile(path, text, encoding, newline):
+
+    if newline is None:
+        newline = os.linesep
+    if newline != "\n":
+        text = text.replace("\n", newline)
+
+    data = text.encode(encoding or "utf-8")
+
+    writeAtomically(path, lambda file: file.write(data))
+
+
+"""
+Thread that saves a snapshot of the editor's text (See writeFile()), so that a slow disk or network filesystem doesn't freeze the GUI thread whilst the file is written.
+
+CONSTRUCTOR PARAMETERS:
+    path - Path of the file to save to.
+    text - The text to save.
+    encoding - The encoding to write the text in.
+    newline - What each "\\n" is to be written as.
+
+ATTRIBUTES:
+    path - Path of the file to save to.
+    text - The text to save.
+    encoding - The encoding to write the text in.
+    newline - What each "\\n" is to be written as.
+    error - Description of the error that stopped the file from being saved (None if it was saved, or hasn't been yet).
+    textHash - Hash of the text that was saved (See hashText()). Worked out by the thread, so that hashing a large document doesn't block the GUI thread.
+"""
+class SaveThread(QThread):
+
+
+    def __init__(self, path, text, encoding, newline):
+
+        super().__init__()
+
+        self.path = path
+        self.text = text
+        self.encoding = encoding
+        self.newline = newline
+
+        self.error = None
+        self.textHash = None
+
+
+    """
+    Reimplementation of QThread.run(). Writes the file.
+    """
+    def run(self):
+
+        try:
+            writeFile(self.path, self.text, self.encoding, self.newline)
+            self.textHash = hashText(self.text)
+        except (OSError, UnicodeEncodeError) as error:
+            self.error = str(error)
+
+        self.text = None # The snapshot is no longer needed once it has been written
@@ -1,28 +1,117 @@
 from PyQt6.QtWidgets import QFileDialog
-import os
+from PyQt6.QtCore import QObject, pyqtSignal
 
+from saveWorker import SaveThread
 
-def save(filename, newtext):
-	file = open(filename, 'w')  # File's contents are automatically erased when opened in write mode
-	file.write(newtext)
-	file.close()
- 
 
-def saveAs(text): 
-	
-	path = QFileDialog.getSaveFileName(caption="Save As")[0]
+"""
+Saves files in the background, 1 at a time (See saveWorker.SaveThread).
 
-	# Case for user cancelling or exiting filesystem
-	if path == "": 
-		return
+The text to save is a snapshot taken when the save is requested, so the user can carry on editing whilst it is being written.
+If a save is requested whilst another is still being written, it waits until that one has finished.
+Only the latest waiting save is kept, so pressing Ctrl-s repeatedly whilst a slow save is under way only writes the file once more, with the latest text.
 
-	try: 
-		file = open(path, 'w')
-		file.write(text)
+ATTRIBUTES:
+	thread - The SaveThread writing the current save (None if no save is under way).
+	pending - (path, text, encoding, newline) tuple for the save waiting for the current one to finish (None if there isn't one).
+
+SIGNALS:
+	saved(path, textHash) - Emitted when a file has been saved, with the hash of the text that was saved (See saveWorker.hashText()).
+	failed(path, error) - Emitted when a file couldn't be saved, with a description of the error.
+"""
+class Saver(QObject):
+
+	saved = pyqtSignal(str, bytes)
+	failed = pyqtSignal(str, str)
+
+
+	def __init__(self):
+
+		super().__init__()
+
+		self.thread = None
+		self.pending = None
+
+
+	"""
+	Saves text to a file in the background, or once the save under way has finished.
+
+	PARAMETERS:
+		path - Path of the file to save to.
+		text - The text to save.
+		encoding - The encoding to write the text in. (Optional; defaults to None, for UTF-8).
+		newline - What each "\\n" is to be written as. (Optional; defaults to None, for the platform's default).
+	"""
+	def save(self, path, text, encoding=None, newline=None):
+
+		if self.thread is not None:
+			self.pending = (path, text, encoding, newline) # Replaces any save already waiting, as it would only be overwritten by this one
+			return
+
+		self.__start(path, text, encoding, newline)
+
+
+	"""
+	Asks the user for a file to save to, then saves text to it (See save()).
+
+	PARAMETERS:
+		text - The text to save.
+		encoding - The encoding to write the text in. (Optional; defaults to None, for UTF-8).
+		newline - What each "\\n" is to be written as. (Optional; defaults to None, for the platform's default).
+	"""
+	def saveAs(self, text, encoding=None, newline=None): 
 		
-	except FileNotFoundError: # Make file if it doesn't exist
-		os.mknod(path)
-		file = open(path, 'w')
-		file.write(text)
+		path = QFileDialog.getSaveFileName(caption="Save As")[0]
+
+		# Case for user cancelling or exiting filesystem
+		if path == "": 
+			return
+
+		self.save(path, text, encoding, newline)
+
+
+	"""
+	Blocks until every save has been written, including any that is waiting. To be called before the editor is closed.
+	"""
+	def wait(self):
+
+		while self.thread is not None:
+			thread = self.thread
+			thread.wait()
+			self.__onFinished(thread) # Its finished signal is still on its way, and will be ignored
+
+
+	"""
+	Starts a SaveThread writing a file.
+	"""
+	def __start(self, path, text, encoding, newline):
+
+		thread = SaveThread(path, text, encoding, newline)
+		thread.finished.connect(lambda: self.__onFinished(thread))
+
+		self.thread = thread
+		thread.start()
+
+
+	"""
+	Called when a SaveThread has finished. Reports whether the file was saved, then starts the save that is waiting, if there is one.
+
+	PARAMETERS:
+		thread - The SaveThread that has finished.
+	"""
+	def __onFinished(self, thread):
+
+		if thread is not self.thread: # Already handled by wait()
+			return
+
+		self.thread = None
+
+		if thread.error is None:
+			self.saved.emit(thread.path, thread.textHash)
+		else:
+			self.failed.emit(thread.path, thread.error)
 
-	file.close()
\ No newline at end of file
+		if self.pending is not None:
+			request = self.pending
+			self.pending = None
+			self.__start(*request)
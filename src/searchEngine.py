@@ -0,0 +1,306 @@
+from array import array
+from bisect import bisect_left, bisect_right
+import re
+
+
+"""
+Represents a search for a term within a snapshot of a document's text, and holds the hits (i.e occurences of the term) that it has found.
+
+The term can be searched for as plain text or as a regular expression, with or without matching case, and optionally only where it forms a whole word.
+A case-sensitive plain text search is done with str.find(), and every other kind of search with a compiled regular expression, so the text is scanned by C code rather than character by character in Python.
+
+The hits are kept in order of their position, as the start and length of each hit in 2 integer arrays, rather than as a QTextCursor per hit,
+so that searching for a common term in a very large document doesn't create millions of Python objects. Cursors are only to be made for the hits the user visits.
+
+The text can either be searched all at once (See searchAll()), or a part at a time (See searchUntil()), carrying on from where the previous part ended.
+
+Once the search is finished, hits can be replaced one at a time (See replaceHit()), which moves the positions of the hits after them.
+Rather than updating the position of every later hit, the positions in starts are left as they were in the snapshot, and each replacement is recorded in an adjustment index
+(the edit attributes below), from which the change in position of any hit can be found by binary search. hit() and hitIndex() translate between the 2 sets of positions.
+
+CONSTRUCTOR PARAMETERS:
+    term - The text (or regular expression) to search for.
+    regex - Whether term is a regular expression. (Optional; defaults to False).
+    caseSensitive - Whether hits must match the case of term. (Optional; defaults to False).
+    wholeWord - Whether hits must not be directly preceded or followed by a letter, digit or underscore. (Optional; defaults to False).
+    Raises re.error if term is not a valid regular expression.
+
+ATTRIBUTES:
+    term - The text (or regular expression) being searched for.
+    regex - Whether term is a regular expression.
+    literal - Whether the search is a case-sensitive plain text search, done with str.find() rather than with pattern.
+    pattern - The compiled regular expression that matches the hits.
+    starts - array of the position of the start of each hit.
+    lengths - array of the length of each hit.
+    position - Position in the text that the search carries on from.
+    pendingMatch - re.Match found past the end of the part of the text that was last searched, which is kept so that the next part doesn't have to be scanned for it again (None if there is no such match).
+    editEnds - Sorted list of the positions (in the snapshot) of the ends of the hits that have been replaced.
+    editOffsets - List holding, for each replaced hit in editEnds, the total change in length of the text from all replacements up to and including that hit,
+                    i.e how far the positions of the hits after it (up to the next replaced hit) have moved.
+    editNewEnds - List holding, for each replaced hit in editEnds, the position in the document of the end of the text that it was replaced with.
+"""
+class Search():
+
+
+    def __init__(self, term, regex=False, caseSensitive=False, wholeWord=False):
+
+        self.term = term
+        self.regex = regex
+        self.literal = not regex and caseSensitive and not wholeWord
+
+        source = term if regex else re.escape(term)
+        if wholeWord:
+            source = rf"(?<!\w)(?:{source})(?!\w)"
+
+        flags = re.MULTILINE
+        if not caseSensitive:
+            flags |= re.IGNORECASE
+
+        self.pattern = re.compile(source, flags)
+
+        self.starts = array('I')
+        self.lengths = array('I')
+
+        self.position = 0
+        self.pendingMatch = None
+
+        self.editEnds = []
+        self.editOffsets = []
+        self.editNewEnds = []
+
+
+    """
+    Returns the number of hits found.
+    """
+    def __len__(self):
+        return len(self.starts)
+
+
+    """
+    Returns a (start, length) tuple for a hit, where start is the hit's current position in the document (i.e taking account of any hits that have been replaced before it).
+
+    PARAMETERS:
+        index - Index of the hit, in order of position.
+    """
+    def hit(self, index):
+
+        start = self.starts[index]
+
+        if self.editEnds == []:
+            return start, self.lengths[index]
+
+        edit = bisect_right(self.editEnds, start) # Number of replaced hits before this hit
+        if edit == 0:
+            return start, self.lengths[index]
+
+        return start + self.editOffsets[edit - 1], self.lengths[index]
+
+
+    """
+    Returns the index of the first hit that starts at or after a position in the document (which equals len(self) if there is no such hit).
+    The index is found by binary search, after translating the position into a position in the snapshot.
+
+    PARAMETERS:
+        position - Position in the document.
+        lo - Index of the first hit to consider. (Optional; defaults to 0).
+    """
+    def hitIndex(self, position, lo=0):
+
+        edit = bisect_right(self.editNewEnds, position) # Number of replacements that end at or before position
+
+        if edit > 0:
+            position -= self.editOffsets[edit - 1]
+
+        # A position within the text of a replacement is treated as the end of the hit it replaced
+        if edit < len(self.editEnds):
+            position = min(position, self.editEnds[edit])
+
+        return bisect_left(self.starts, position, lo)
+
+
+    """
+    Removes a hit that has been replaced in the document, and records the replacement in the adjustment index, so that the positions of the hits after it are moved.
+
+    PARAMETERS:
+        index - Index of the hit.
+        newLength - Length of the text that the hit was replaced with.
+    """
+    def replaceHit(self, index, newLength):
+
+        start, length = self.hit(index)
+        end = self.starts[index] + self.lengths[index] # End of the hit in the snapshot
+
+        del self.starts[index]
+        del self.lengths[index]
+
+        change = newLength - length
+
+        edit = bisect_right(self.editEnds, end)
+        previousOffset = self.editOffsets[edit - 1] if edit > 0 else 0
+
+        self.editEnds.insert(edit, end)
+        self.editOffsets.insert(edit, previousOffset)
+        self.editNewEnds.insert(edit, start + newLength - change) # Moved by change below, along with the replacements after it
+
+        for i in range(edit, len(self.editOffsets)):
+            self.editOffsets[i] += change
+            self.editNewEnds[i] += change
+
+
+    """
+    Yields a (start, length) tuple for every hit, in order of position (See hit()).
+    """
+    def hits(self):
+
+        if self.editEnds == []:
+            yield from zip(self.starts, self.lengths)
+            return
+
+        edit = 0
+        offset = 0
+
+        for start, length in zip(self.starts, self.lengths):
+
+            while edit < len(self.editEnds) and self.editEnds[edit] <= start:
+                offset = self.editOffsets[edit]
+                edit += 1
+
+            yield start + offset, length
+
+
+    """
+    Returns the text that a hit is to be replaced with.
+    For a regular expression search, the replacement can refer to the hit's capture groups, as in re.sub() (e.g "\\1" or "\\g<name>"). Otherwise, it is used as it is.
+    Raises re.error if the replacement refers to a group that doesn't exist.
+
+    PARAMETERS:
+        text - The text that was searched, with any replacements that have been made since (See replaceHit()).
+        index - Index of the hit.
+        replacement - The replacement text.
+
+    RETURNS:
+        The text to replace the hit with, or None if the hit no longer matches the regular expression (i.e a replacement made since has changed the text around it, as with "(?<!a)b" once the "b" before it is replaced with "a").
+    """
+    def expand(self, text, index, replacement):
+
+        if not self.regex:
+            return replacement
+
+        start, length = self.hit(index)
+        match = self.pattern.match(text, start)
+
+        if match is None or match.end() != start + length:
+            return None
+
+        return match.expand(replacement)
+
+
+    """
+    Returns a list of (start, length) tuples for the hits that lie entirely within part of a text, without recording them.
+    Unlike searchUntil(), this never looks at the text outside of the part, so it is quick to find the hits in a small part of a large text (e.g the part that is in view) ahead of the rest of the search.
+
+    PARAMETERS:
+        text - The text to search.
+        start - Position in the text of the start of the part.
+        end - Position in the text of the end of the part.
+    """
+    def findWithin(self, text, start, end):
+
+        if self.literal:
+
+            term = self.term
+            length = len(term)
+            hits = []
+
+            if length == 0:
+                return hits
+
+            found = text.find(term, start, end)
+            while found != -1:
+                hits.append((found, length))
+                found = text.find(term, found + length, end)
+
+            return hits
+
+        return [(match.start(), match.end() - match.start()) for match in self.pattern.finditer(text, start, end) if match.end() != match.start()]
+
+
+    """
+    Searches the whole of a text.
+
+    PARAMETERS:
+        text - The text to search.
+    """
+    def searchAll(self, text):
+        self.searchUntil(text, len(text))
+
+
+    """
+    Searches a text from self.position, recording every hit that starts before a given position.
+    self.position is then moved on to where the search is to carry on from, which is past the end of any hit that extends beyond the stop position.
+    Empty matches of a regular expression (e.g of "^") are not recorded as hits, as there would be nothing to select.
+
+    PARAMETERS:
+        text - The text to search (Must be the same text each time this is called for a Search).
+        stop - Position in the text at which to stop.
+
+    RETURNS:
+        True if the search has reached the end of the text, otherwise False.
+    """
+    def searchUntil(self, text, stop):
+
+        starts = self.starts
+        lengths = self.lengths
+        pos = self.position
+
+        if self.literal:
+
+            term = self.term
+            length = len(term)
+
+            if length == 0:
+                self.position = len(text)
+                return True
+
+            # Hits that start before stop can only extend up to length - 1 characters past it
+            find = text.find
+            end = min(stop + length - 1, len(text))
+
+            found = find(term, pos, end)
+            while found != -1:
+                starts.append(found)
+                lengths.append(length)
+                pos = found + length
+                found = find(term, pos, end)
+
+            self.position = max(pos, stop)
+            return self.position >= len(text)
+
+        search = self.pattern.search
+
+        match = self.pendingMatch
+        if match is None or match.start() < pos:
+            match = search(text, pos)
+
+        while match is not None and match.start() < stop:
+
+            start, end = match.span()
+
+            if end == start: # Empty match. Carry on from the next character, so that the search always progresses
+                match = search(text, end + 1) if end < len(text) else None
+                continue
+
+            starts.append(start)
+            lengths.append(end - start)
+            match = search(text, end)
+
+            pos = end
+
+        self.pendingMatch = match
+
+        if match is None or match.start() == len(text): # There are no more hits in the text (A match at the very end of the text can only be empty)
+            self.position = len(text)
+            return True
+
+        self.position = max(pos, stop)
+        return False
@@ -1,21 +1,146 @@
 from PyQt6.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QComboBox, QLabel, QPushButton
+from PyQt6.QtCore import QObject, pyqtSignal
 
 import json
 import os
 import sys
 
+from fileWatcher import FileWatcher
+from saveWorker import writeFile
+
+
+DEFAULTS = {
+    "autoCloseBrckt": True,
+    "autoCloseQt": True,
+    "autoIndent": True,
+    "syntaxHighlighting": True,
+    "highlightCache": True
+} # Value of each setting, used for settings that are missing from BEditSettings.json (or aren't valid)
+
+store = None # The SettingsStore shared by the whole process (See getSettings())
+
+
+"""
+Returns the SettingsStore shared by every editor in the process, creating it the first time it is needed.
+"""
+def getSettings():
+
+    global store
+
+    if store is None:
+        store = SettingsStore(os.path.join(sys.path[0], "BEditSettings.json"))
+
+    return store
+
+
+"""
+Holds the settings loaded from BEditSettings.json, so that the file is only read once, however many editors (or settings popups) are opened.
+
+Settings that are missing from the file, or whose values are of the wrong type, are given their default values (See DEFAULTS). If the file isn't valid JSON, the settings are left as they were.
+The file is watched for changes (See fileWatcher.FileWatcher), so that settings changed by editing the file (e.g in BoothiumEdit itself) are applied straight away, in this and every other BoothiumEdit process.
+Settings are read with store[name], and changed with set(), which writes the file.
+
+CONSTRUCTOR PARAMETERS:
+    jsonPath - Path of BEditSettings.json.
+
+ATTRIBUTES:
+    jsonPath - Path of BEditSettings.json.
+    values - Dictionary mapping the name of each setting to its value.
+    watcher - FileWatcher watching BEditSettings.json.
+
+SIGNALS:
+    changed(name, value) - Emitted for each setting whose value has changed, so that open editors can apply it.
+"""
+class SettingsStore(QObject):
+
+    changed = pyqtSignal(str, object)
+
+
+    def __init__(self, jsonPath):
+
+        super().__init__()
+
+        self.jsonPath = jsonPath
+        self.values = dict(DEFAULTS)
+
+        self.watcher = FileWatcher(jsonPath)
+        self.watcher.changed.connect(self.__load)
+
+        self.__load()
+
+
+    """
+    Returns the value of a setting, so that the store can be read like the dictionary of settings it replaces (i.e store[name]).
+    """
+    def __getitem__(self, name):
+        return self.values[name]
+
+
+    """
+    Changes a setting, and writes the settings to BEditSettings.json.
+
+    PARAMETERS:
+        name - The name of the setting.
+        value - The setting's new value.
+    """
+    def set(self, name, value):
+
+        if self.values[name] == value:
+            return
+
+        self.values[name] = value
+
+        try:
+            writeFile(self.jsonPath, json.dumps(self.values, indent="\t") + "\n", "utf-8", "\n")
+        except OSError: # The setting still applies until the editor is closed
+            pass
+
+        self.watcher.update() # So that writing the file isn't taken to be a change to it
+
+        self.changed.emit(name, value)
+
+
+    """
+    Reads BEditSettings.json, filling in any missing or invalid settings with their defaults, and emits changed for each setting whose value has changed.
+    """
+    def __load(self):
+
+        try:
+            with open(self.jsonPath, 'r') as file:
+                loaded = json.load(file)
+        except (OSError, ValueError): # Missing, or not valid JSON (e.g whilst it is being edited by hand)
+            return
+
+        if not isinstance(loaded, dict):
+            return
+
+        for name, default in DEFAULTS.items():
+
+            value = loaded.get(name, default)
+            if type(value) is not type(default):
+                value = default
+
+            if self.values[name] != value:
+                self.values[name] = value
+                self.changed.emit(name, value)
+
 
 """
 Represents the settings popup that shows when the user clicks the "settings" option in the main window's menubar.
+Settings changed in the popup are applied to every open editor straight away (See SettingsStore).
+
+CONSTRUCTOR PARAMETERS:
+    openFile - Function that opens a file in a tab of the editor's window.
 
 ATTRIBUTES:
-    settings - Dictionary containing the settings loaded from BEditSettings.json.
+    settings - The SettingsStore holding the settings.
     jsonPath - full file path of BEditSettings.json.
+    openFile - Function that opens a file in a tab of the editor's window.
 """
 class SettingsPopup(QDialog):
 
     
-    def __init__(self):
+    def __init__(self, openFile):
 
         super().__init__()
         
@@ -25,12 +150,9 @@ class SettingsPopup(QDialog):
                                 background-color: #0E0E10;
                                 font-family: Garet; """)
 
-        self.jsonPath = os.path.join(sys.path[0], "BEditSettings.json")
-
-        with open(self.jsonPath, 'r') as file:
-            self.settings = json.load(file) 
-            # self.settings serves as a file buffer. 
-            # When settings are changed, they are saved here first, then this is dumped into the file when the user closes the popup.
+        self.settings = getSettings()
+        self.jsonPath = self.settings.jsonPath
+        self.openFile = openFile
 
         layout = QVBoxLayout()
         
@@ -46,6 +168,9 @@ class SettingsPopup(QDialog):
         syntaxHighlight = Setting("Syntax Highlighting", "syntaxHighlighting", self.settings["syntaxHighlighting"])
         layout.addLayout(syntaxHighlight)
 
+        highlightCache = Setting("Highlight Cache", "highlightCache", self.settings["highlightCache"])
+        layout.addLayout(highlightCache)
+
         self.setLayout(layout)
 
         openJson = QPushButton("Open BEditSettings.json", self)
@@ -55,22 +180,13 @@ class SettingsPopup(QDialog):
 
         self.exec()
 
-    
-    # Reimplementation of QWidget.closeEvent(). When user closes the popup, save their changes to the JSON file
-    def closeEvent(self, event):
-
-        with open(self.jsonPath, 'w') as file:
-            json.dump(self.settings, file)
-
-        self.close()
 
     
-    # Creates a new editor window with BEditSettings.json open in it.
+    # Opens BEditSettings.json in a new tab of the editor's window.
     def __openJson(self):
         
         self.close() # Close settings popup before opening JSON file.
-        mainPath = os.path.join(sys.path[0], "main.py")
-        os.system(f"python {mainPath} {self.jsonPath}") # Run shell command that opens editor, specifying BEditSettings.json as the file to open.
+        self.openFile(self.jsonPath)
 
 
 """
@@ -80,14 +196,14 @@ In the form of a QHBoxLayout that is to be added to the SettingsPopup's layout,
 CONSTRUCTOR PARAMETERS:
 
     title - The displayed name of the setting
-    jsonName - The name of the setting in the BEditSettings.json file and thus also in the SettingsPopup.settings dictionary 
+    jsonName - The name of the setting in the BEditSettings.json file and thus also in the SettingsStore 
                 e.g Bracket Pair Highlighting's jsonName is "brcktPairHighlight".
     enabled - Boolean indicating if the setting is on or off (True if on, False if off). 
-                When the constructor is called in the SettingsPopup, this is to be ascertained through getting the boolean value of the setting in the SettingsPopup.settings dictionary  
+                When the constructor is called in the SettingsPopup, this is to be ascertained through getting the boolean value of the setting from the SettingsStore  
 
 ATTRIBUTES:
     title - The displayed name of the setting
-    jsonName - The name of the setting in the BEditSettings.json file and thus also in the SettingsPopup.settings dictionary 
+    jsonName - The name of the setting in the BEditSettings.json file and thus also in the SettingsStore 
                 e.g Bracket Pair Highlighting's jsonName is "brcktPairHighlight".
 """
 class Setting(QHBoxLayout):
@@ -119,16 +235,6 @@ class Setting(QHBoxLayout):
 
     # To be called when a setting is changed
     def __settingChange(self, index):
-        
-        try:
-            settings = self.parentWidget().settings # For a layout, .parentWidget() returns the widget that implements the layout's parent layout, in this case the SettingsPopup.
-
-            # "On" is located at index 0; "Off" is at index 1.
-            if index == 0: 
-                settings[self.jsonName] = True
-            elif index == 1:
-                settings[self.jsonName] = False
 
-        # Thrown when self.parentWidget() returns None, which only occurs when setting is being initialized, as the setting at that stage has not been assigned as a child to the SettingsPopup layout via .addLayout().
-        except AttributeError: 
-            pass
\ No newline at end of file
+        # "On" is located at index 0; "Off" is at index 1.
+        getSettings().set(self.jsonName, index == 0)
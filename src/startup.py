@@ -0,0 +1,126 @@
+from PyQt6.QtCore import QObject, QEvent, QTimer
+
+import sys
+import time
+
+
+"""
+Helpers for keeping the editor's startup short: work that isn't needed to show the file is put off until the window has first been painted (See afterFirstPaint()),
+and the --profile-startup option times each phase of the startup (See StartupProfile).
+"""
+
+profile = None # The StartupProfile timing this run's startup (None unless BoothiumEdit was started with --profile-startup, and once the profile has been reported)
+
+
+"""
+Records that a phase of the startup has ended, if the startup is being profiled.
+
+PARAMETERS:
+    phase - Name of the phase.
+"""
+def mark(phase):
+
+    if profile is not None:
+        profile.mark(phase)
+
+
+"""
+Prints the startup profile to stderr, if the startup is being profiled, and stops profiling so that later phases (e.g files opened afterwards) aren't recorded.
+"""
+def report():
+
+    global profile
+
+    if profile is not None:
+        profile.report()
+        profile = None
+
+
+"""
+Calls a function once a widget has been painted for the first time, i.e once the user can see it.
+The function is called from the event loop just after the paint event has been handled, rather than during it, so that the paint isn't held up.
+
+PARAMETERS:
+    widget - The QWidget.
+    function - The function to call (without arguments).
+"""
+def afterFirstPaint(widget, function):
+    widget.installEventFilter(FirstPaintFilter(widget, function))
+
+
+"""
+Records how long each phase of the startup took, for the --profile-startup option.
+
+CONSTRUCTOR PARAMETERS:
+    startTime - time.perf_counter() value at which the startup began.
+
+ATTRIBUTES:
+    startTime - time.perf_counter() value at which the startup began.
+    phases - List of (name, end time) tuples for the phases recorded so far, in order.
+"""
+class StartupProfile:
+
+
+    def __init__(self, startTime):
+
+        self.startTime = startTime
+        self.phases = []
+
+
+    """
+    Records that a phase has ended.
+
+    PARAMETERS:
+        name - Name of the phase.
+    """
+    def mark(self, name):
+        self.phases.append((name, time.perf_counter()))
+
+
+    """
+    Prints how long each phase took, and the total time since the startup began, to stderr.
+    The total at the end of the last phase is the time to interactive, i.e the time until the editor is shown and ready for input.
+    """
+    def report(self):
+
+        print("Startup profile (ms):", file=sys.stderr)
+
+        previous = self.startTime
+        for name, end in self.phases:
+            print(f"    {name:<24}{1000 * (end - previous):8.1f}{1000 * (end - self.startTime):9.1f}", file=sys.stderr)
+            previous = end
+
+        print(f"Time to interactive: {1000 * (previous - self.startTime):.1f} ms", file=sys.stderr)
+
+
+"""
+Event filter that watches a widget for its first paint event (See afterFirstPaint()).
+
+CONSTRUCTOR PARAMETERS:
+    widget - The QWidget to watch (which becomes the filter's parent).
+    function - The function to call after the first paint.
+
+ATTRIBUTES:
+    function - The function to call after the first paint.
+"""
+class FirstPaintFilter(QObject):
+
+
+    def __init__(self, widget, function):
+
+        super().__init__(widget)
+
+        self.function = function
+
+
+    """
+    Reimplementation of QObject.eventFilter(). On the widget's first paint event, removes the filter and schedules the function to be called once the paint event has been handled.
+    """
+    def eventFilter(self, watched, event):
+
+        if event.type() == QEvent.Type.Paint:
+            watched.removeEventFilter(self)
+            QTimer.singleShot(0, self.function)
+            self.deleteLater()
+
+        return False
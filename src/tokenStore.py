@@ -0,0 +1,189 @@
+from array import array
+
+
+tokenTypes = [] # Maps a token type's ID (i.e its index in this list) to its name.
+tokenTypeIds = {} # Maps a token type's name to its ID.
+
+
+"""
+Returns the ID of a token type, i.e a small integer that identifies the token type and fits within 1 byte.
+IDs are assigned in the order token types are first seen.
+
+PARAMETERS:
+    tokenType - The name of the token type.
+"""
+def getTokenTypeId(tokenType):
+
+    if tokenType not in tokenTypeIds:
+        tokenTypeIds[tokenType] = len(tokenTypes)
+        tokenTypes.append(tokenType)
+
+    return tokenTypeIds[tokenType]
+
+
+"""
+Packs the tokens on a line into a single bytes object, made up of an array('I') of the start and length of each token (i.e [start, length, start, length, ...]),
+followed by 1 byte per token holding the ID of the token's type. Each token therefore takes up 9 bytes.
+
+PARAMETERS:
+    spans - List of (start, length, tokenType) tuples for the tokens on the line, as returned by tokenizer.tokenize().
+"""
+def packTokens(spans):
+
+    positions = array('I')
+    types = bytearray()
+
+    for start, length, tokenType in spans:
+        positions.append(start)
+        positions.append(length)
+        types.append(getTokenTypeId(tokenType))
+
+    return positions.tobytes() + types
+
+
+"""
+Unpacks the tokens on a line from a bytes object made by packTokens().
+
+PARAMETERS:
+    packed - The packed tokens of the line.
+
+RETURNS:
+    List of (start, length, tokenType) tuples for the tokens on the line.
+"""
+def unpackTokens(packed):
+
+    count = len(packed) // 9 # Number of tokens on the line
+    positions = memoryview(packed)[:8 * count].cast('I')
+
+    return [(positions[2 * i], positions[2 * i + 1], tokenTypes[packed[8 * count + i]]) for i in range(count)]
+
+
+"""
+Records the tokens found by the highlighter, so that the token at a position or the tokens on a line can be looked up without tokenizing the text again.
+
+The tokens on each line are packed into a bytes object (See packTokens()), and these are kept in a list with 1 entry per line,
+which is kept in step with the document's lines (i.e QTextBlocks) as lines are inserted or removed.
+The tokens of a line are replaced whenever the line is highlighted.
+
+CONSTRUCTOR PARAMETERS:
+    document - The QTextDocument whose tokens are recorded.
+
+ATTRIBUTES:
+    document - The QTextDocument whose tokens are recorded.
+    lines - List holding the packed tokens of each line (None for lines that haven't been highlighted yet).
+"""
+class TokenStore():
+
+
+    def __init__(self, document):
+
+        self.document = document
+        self.lines = [None] * document.blockCount()
+
+        self.document.contentsChange.connect(self.__onContentsChange)
+
+
+    """
+    Stops keeping the store in step with the document, once the tokens are no longer needed (e.g when syntax highlighting is turned off).
+    """
+    def detach(self):
+        self.document.contentsChange.disconnect(self.__onContentsChange)
+
+
+    """
+    Called by the document's contentsChange signal. Inserts or removes entries in self.lines to match the number of lines that were inserted or removed.
+    The lines that were edited are highlighted again afterwards, so their entries don't need to be correct here.
+
+    PARAMETERS:
+        position - Position in the document at which the change occured.
+        removed - Number of characters removed.
+        added - Number of characters added.
+    """
+    def __onContentsChange(self, position, removed, added):
+
+        change = self.document.blockCount() - len(self.lines) # Number of lines added (or removed, if negative)
+        if change == 0:
+            return
+
+        after = self.document.findBlock(position).blockNumber() + 1 # Lines are inserted or removed after the line the change started on
+
+        if change > 0:
+            self.lines[after:after] = [None] * change
+        else:
+            del self.lines[after:after - change]
+
+
+    """
+    Records the tokens on a line, replacing any that were previously recorded for it.
+
+    PARAMETERS:
+        block - The QTextBlock representing the line.
+        spans - List of (start, length, tokenType) tuples for the tokens on the line.
+    """
+    def setTokens(self, block, spans):
+        self.lines[block.blockNumber()] = packTokens(spans)
+
+
+    """
+    Records the tokens on a line that have already been packed (e.g tokens read from the highlight cache), replacing any that were previously recorded for it.
+
+    PARAMETERS:
+        block - The QTextBlock representing the line.
+        packed - The tokens on the line, packed as by packTokens().
+    """
+    def setPackedTokens(self, block, packed):
+        self.lines[block.blockNumber()] = packed
+
+
+    """
+    Returns a (start, length, tokenType) tuple for the token at a position in the document, where start is the position in the document of the token's first character.
+    Returns None if there is no token at the position, or if its line hasn't been highlighted yet.
+    The token is found by binary search within its line, as tokens are stored in order of their position.
+
+    PARAMETERS:
+        position - Position in the document.
+    """
+    def tokenAt(self, position):
+
+        block = self.document.findBlock(position)
+        packed = self.lines[block.blockNumber()]
+
+        if packed is None:
+            return None
+
+        count = len(packed) // 9 # Number of tokens on the line
+        positions = memoryview(packed)[:8 * count].cast('I')
+        column = position - block.position()
+
+        # Find the last token starting at or before the column
+        low = 0
+        high = count
+        while low < high:
+
+            middle = (low + high) // 2
+
+            if positions[2 * middle] <= column:
+                low = middle + 1
+            else:
+                high = middle
+
+        index = low - 1
+        if index < 0 or column >= positions[2 * index] + positions[2 * index + 1]: # Column is not within a token (e.g it's whitespace)
+            return None
+
+        return (block.position() + positions[2 * index], positions[2 * index + 1], tokenTypes[packed[8 * count + index]])
+
+
+    """
+    Returns a list of (start, length, tokenType) tuples for the tokens on a line, where start is relative to the start of the line.
+    Returns None if the line doesn't exist or hasn't been highlighted yet.
+
+    PARAMETERS:
+        lineNumber - Number of the line, starting from 0.
+    """
+    def lineTokens(self, lineNumber):
+
+        if not 0 <= lineNumber < len(self.lines) or self.lines[lineNumber] is None:
+            return None
+
+        return unpackTokens(self.lines[lineNumber])
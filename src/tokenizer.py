@@ -0,0 +1,192 @@
+import re
+
+
+LEXER_VERSION = 2 # To be incremented whenever a change to tokenize() or Lexer changes the tokens produced for the same grammar, so that out of date cached highlighting isn't used (See highlightCache.py).
+
+"""
+Compiles a dictionary of highlighting rules into a single master regular expression.
+Each rule becomes a named group in one large alternation (e.g "(?P<whitespace>...)|(?P<comment>...)|..."), so that the whole set of rules can be tried
+at a given position with a single call to the regex engine.
+
+As Python's regex engine tries the alternatives of an alternation from left to right, and takes the first one that matches,
+the precedence of the rules (i.e their ordering within the dictionary) is kept.
+
+PARAMETERS:
+    rules - Dictionary mapping a token type to a regular expression that recognizes text of that token type, ordered from highest to lowest precedence.
+            The regular expressions must not be anchored with '^', and must not contain capturing groups (non-capturing groups, i.e "(?:...)", can be used instead),
+            as the name of the matched group is what is used to identify the type of a token.
+
+RETURNS:
+    The compiled master regular expression.
+"""
+def compileRules(rules):
+
+    alternatives = []
+
+    for tokenType, regex in rules.items():
+
+        if re.compile(regex).groups != 0:
+            raise ValueError(f"Rule for token type '{tokenType}' contains a capturing group")
+
+        alternatives.append(f"(?P<{tokenType}>{regex})")
+
+    return re.compile("|".join(alternatives))
+
+
+"""
+Represents the compiled grammar of a language, which is used by tokenize() to split text into tokens.
+
+Most tokens are contained within a single line, but some constructs (e.g block comments, Python's triple-quoted strings, C macros continued with a backslash) span several lines.
+These are described as regions. A region is opened by a token recognized by one of the rules, and is either:
+    - Delimited: Everything from the opening token up to and including the text matching the region's end regex is 1 token. If the end regex isn't found on the line, the region continues onto the next line.
+    - Continued: The opening token and the rest of the line are tokenized as normal, but if the line ends with a backslash the region continues onto the next line (This is used for C macros).
+      Each line the region continues onto is 1 token, of the region's token type, and the region continues onto the line after it if it too ends with a backslash.
+
+Tokenizing is done 1 line at a time, so that a line can be re-tokenized without re-tokenizing the lines before it. 
+Which region (if any) is still open at the end of a line is represented by an integer state, that is to be passed to tokenize() when tokenizing the next line. 
+State 0 means that no region is open. Regions are numbered from 1 in the order they appear in the regions dictionary.
+
+Keywords and functions are not recognized by rules of their own. Instead, once a rule has recognized an identifier (i.e a token of type "identifier"), it is classified by looking at the identifier and the 1 character after it:
+    - Keyword: The identifier is in the keywords set, and is followed by whitespace, a colon or the end of the line.
+    - Function: The identifier is followed by an opening bracket, i.e "(".
+    - Otherwise, it remains an identifier.
+This means an identifier is only matched once by the regex engine, rather than being tried against a rule for each of these token types.
+
+CONSTRUCTOR PARAMETERS:
+    rules - Dictionary mapping a token type to a regular expression that recognizes text of that token type, ordered from highest to lowest precedence (See compileRules()).
+    regions - Dictionary mapping the token type of a rule that opens a region to a (tokenType, endRegex) tuple, 
+                where tokenType is the token type given to the text of a delimited region and endRegex is the regex that closes it.
+                For a continued region, endRegex is None, and tokenType is the token type given to the lines it continues onto (or None, for the token type of the rule that opens it).
+                (Optional; if omitted, the language has no regions).
+    keywords - frozenset of the language's keywords. (Optional; if omitted, the language has no keywords).
+
+ATTRIBUTES:
+    pattern - The master regular expression produced by compileRules().
+    regions - Dictionary mapping the token type of a rule that opens a region to a (state, tokenType, endPattern) tuple, where endPattern is the compiled endRegex (or None for a continued region).
+    states - Dictionary mapping a state to the (tokenType, endPattern) tuple of the region that the state represents.
+    keywords - frozenset of the language's keywords.
+"""
+class Lexer():
+
+
+    def __init__(self, rules, regions=None, keywords=frozenset()):
+
+        if regions is None:
+            regions = {}
+
+        self.pattern = compileRules(rules)
+        self.keywords = keywords
+
+        self.regions = {}
+        self.states = {}
+
+        for state, (opener, (tokenType, endRegex)) in enumerate(regions.items(), start=1):
+
+            if endRegex is None:
+                endPattern = None
+                if tokenType is None:
+                    tokenType = opener
+            else:
+                endPattern = re.compile(endRegex)
+
+            self.regions[opener] = (state, tokenType, endPattern)
+            self.states[state] = (tokenType, endPattern)
+
+
+"""
+Splits a line of text into tokens using a Lexer.
+The text is scanned from left to right by a scanner of the lexer's master regex (which matches 1 token after another, each starting where the last one ended), so no copies of the text are made whilst scanning.
+
+PARAMETERS:
+    text - The line of text to tokenize (Must not contain newline characters).
+    lexer - The Lexer for the language of the text.
+    state - The state at the end of the previous line (0 for the first line of a document).
+
+RETURNS:
+    A (spans, state) tuple:
+        spans - List of (start, length, tokenType) tuples, one for each token found, in order of their occurence in the text.
+        state - The state at the end of this line, to be passed to tokenize() for the next line.
+"""
+def tokenize(text, lexer, state=0):
+
+    pattern = lexer.pattern
+    regions = lexer.regions
+    keywords = lexer.keywords
+    end = len(text)
+    spans = []
+
+    pos = 0
+    continued = 0 # State of the continued region opened on the line (0 if none)
+
+    # Finish any region left open by the previous line
+    if state != 0:
+
+        tokenType, endPattern = lexer.states[state]
+
+        if endPattern is None: # The whole line is within the continued region (e.g the body of a C macro)
+            if end != 0:
+                spans.append((0, end, tokenType))
+            return spans, state if text.endswith("\\") else 0
+
+        closeMatch = endPattern.search(text)
+
+        if closeMatch is None: # Whole line is within the region
+            if end != 0:
+                spans.append((0, end, tokenType))
+            return spans, state
+
+        pos = closeMatch.end()
+        if pos != 0:
+            spans.append((0, pos, tokenType))
+
+    while pos < end:
+
+        skip = True # Whether the scanner below stops because it reaches text that none of the rules recognize
+
+        # The scanner matches tokens one after another starting from pos, without having to be passed the position each time.
+        for tokenMatch in iter(pattern.scanner(text, pos, end).match, None):
+
+            tokenType = tokenMatch.lastgroup
+            matchEnd = tokenMatch.end()
+
+            if matchEnd == pos: # Rule matched an empty string
+                break
+
+            if tokenType == "identifier":
+
+                if text[matchEnd:matchEnd + 1] == "(":
+                    tokenType = "function"
+                elif tokenMatch.group() in keywords and (matchEnd == end or text[matchEnd].isspace() or text[matchEnd] == ":"):
+                    tokenType = "keyword"
+
+            elif tokenType in regions:
+
+                regionState, regionTokenType, endPattern = regions[tokenType]
+
+                if endPattern is None:
+                    continued = regionState
+
+                else:
+                    closeMatch = endPattern.search(text, matchEnd)
+
+                    if closeMatch is None: # Region continues onto the next line
+                        spans.append((pos, end - pos, regionTokenType))
+                        return spans, regionState
+
+                    # The scanner must be restarted after the end of the region
+                    spans.append((pos, closeMatch.end() - pos, regionTokenType))
+                    pos = closeMatch.end()
+                    skip = False
+                    break
+
+            spans.append((pos, matchEnd - pos, tokenType))
+            pos = matchEnd
+
+        # Text that none of the rules recognize (or that a rule matches with an empty string) is skipped 1 character at a time, so that scanning always progresses.
+        if skip and pos < end:
+            pos += 1
+
+    if continued != 0 and text.endswith("\\"):
+        return spans, continued
+
+    return spans, 0